@@ -0,0 +1,96 @@
+"""
+Synthetic Benchmark Pages
+Deterministic HTML documents of a given size and shape for the benchmark suite
+"""
+
+import random
+
+# Nesting depth of the 'deep' pages; lxml stops building the tree at 255 levels
+DEEP_NESTING = 200
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def _interactive(rng, index):
+    """One interactive element, cycling through the default roles"""
+    kind = index % 6
+    if kind == 0:
+        return f'<button id="btn-{index}" class="btn btn-primary">Action {index}</button>'
+    if kind == 1:
+        return f'<a href="/item/{index}" class="link">Item {index}</a>'
+    if kind == 2:
+        return f'<input type="text" name="field-{index}" placeholder="Field {index}">'
+    if kind == 3:
+        return f'<input type="submit" value="Submit {index}">'
+    if kind == 4:
+        return f'<select name="choice-{index}"><option>One</option><option>Two</option></select>'
+    return f'<div role="button" class="card-action" data-index="{rng.randint(0, 999)}">Open {index}</div>'
+
+
+def mixed_page(size, seed=0):
+    """Typical application page: sections of cards with text, links, buttons and form fields"""
+    rng = random.Random(seed)
+    parts = ['<html><head><title>Mixed benchmark page</title></head><body>',
+             '<nav><a href="/">Home</a><a href="/about">About</a></nav><main>']
+    nodes = 7
+    index = 0
+
+    while nodes < size:
+        parts.append(f'<section class="section-{index % 10}"><h2>Section {index}</h2>')
+        nodes += 2
+        for _ in range(rng.randint(3, 8)):
+            parts.append('<div class="card"><p>Some <span>descriptive</span> text</p>')
+            parts.append(_interactive(rng, index))
+            parts.append('</div>')
+            nodes += 5
+            index += 1
+        parts.append('</section>')
+
+    parts.append('</main></body></html>')
+    return ''.join(parts)
+
+
+def deep_page(size, seed=0):
+    """Chains of DEEP_NESTING nested divs, with an interactive element at every tenth level"""
+    rng = random.Random(seed)
+    parts = ['<html><head><title>Deep benchmark page</title></head><body>']
+    nodes = 4
+    index = 0
+
+    while nodes < size:
+        depth = min(DEEP_NESTING, size - nodes)
+        for level in range(depth):
+            parts.append(f'<div class="level-{level}">')
+            if level % 10 == 9:
+                parts.append(_interactive(rng, index))
+                index += 1
+                nodes += 1
+        parts.append('</div>' * depth)
+        nodes += depth
+
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def wide_page(size, seed=0):
+    """One list with every element a sibling of the others"""
+    rng = random.Random(seed)
+    parts = ['<html><head><title>Wide benchmark page</title></head><body><ul id="items">']
+    for index in range(max(size - 5, 1) // 2):
+        parts.append(f'<li>{_interactive(rng, index)}</li>')
+    parts.append('</ul></body></html>')
+    return ''.join(parts)
+
+
+PAGE_SHAPES = {
+    'mixed': mixed_page,
+    'deep': deep_page,
+    'wide': wide_page
+}
+
+
+def generate_page(shape, size, seed=0):
+    """HTML of a benchmark page with roughly size element nodes"""
+    if shape not in PAGE_SHAPES:
+        raise ValueError(f"Unknown page shape: {shape}")
+    return PAGE_SHAPES[shape](size, seed)
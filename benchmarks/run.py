@@ -0,0 +1,281 @@
+"""
+Benchmark Suite
+Time each phase of the extraction pipeline on synthetic pages and save the
+results as JSON, so runs of different versions can be compared.
+
+    python benchmarks/run.py --offline
+    python benchmarks/run.py --sizes 1000 10000 --output before.json
+    python benchmarks/run.py --offline --compare before.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Benchmark the working tree, not whatever version happens to be installed
+sys.path.insert(0, str(ROOT / 'src'))
+
+from pages import DEFAULT_SIZES, PAGE_SHAPES, generate_page  # noqa: E402
+
+RESULTS_VERSION = 1
+
+# Slowdown over the baseline reported as a regression by --compare
+DEFAULT_THRESHOLD = 1.2
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler that does not log every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    """Serve a directory over HTTP from a background thread; returns the server"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def count_nodes(html):
+    """Number of element nodes in a document"""
+    import lxml.html
+    return sum(1 for element in lxml.html.document_fromstring(html).iter() if isinstance(element.tag, str))
+
+
+def timed(timings, phase, function, *args, **kwargs):
+    """Call function, adding its wall time in seconds to timings[phase]"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings.setdefault(phase, []).append(time.perf_counter() - start)
+    return result
+
+
+def element_xpaths(root):
+    """XPath of every body element, built like the offline engine builds them while extracting"""
+    from raw_locator_generator.offline import element_xpath
+
+    body = root.find('body')
+    xpath_cache = {}
+    positions = {}
+    return [
+        element_xpath(element, body, xpath_cache, positions)
+        for element in (body.iter() if body is not None else ()) if isinstance(element.tag, str)
+    ]
+
+
+def run_offline_page(agent, html, url, title, output_dir, timings):
+    """One pass of the pipeline phases that need no browser"""
+    from raw_locator_generator.offline import (
+        extract_interactive_elements_from_html, parse_html, validate_locators_in_tree
+    )
+
+    root = timed(timings, 'parse_html', parse_html, html)
+    elements = timed(timings, 'extract_interactive_elements', extract_interactive_elements_from_html,
+                     root, url, agent.rules)
+    if agent.validate:
+        elements = timed(timings, 'validate_locators', validate_locators_in_tree, root, elements)
+    timed(timings, 'element_xpaths', element_xpaths, root)
+    timed(timings, 'extract_all_elements', agent.extract_all_elements, html)
+    timed(timings, 'generate_raw_script', agent.generate_raw_script, elements, 'all', url, title)
+
+    agent.page_url = url
+    agent.page_title = title
+    timed(timings, 'save_results', agent.save_results, elements, output_dir=output_dir)
+    return len(elements)
+
+
+def run_browser_page(agent, url, output_dir, timings):
+    """One pass of every pipeline phase against a page loaded in the browser
+
+    XPaths are built in the page during extraction, and during
+    extract_all_elements for the full DOM, so they have no phase of their own.
+    """
+    if not timed(timings, 'navigate_to_url', agent.navigate_to_url, url):
+        raise RuntimeError(f"Could not load {url}")
+    elements = timed(timings, 'extract_interactive_elements', agent.extract_interactive_elements)
+    if agent.validate:
+        elements = timed(timings, 'validate_locators', agent.validate_locators, elements)
+    page_source = timed(timings, 'page_source', lambda: agent.driver.page_source)
+    timed(timings, 'extract_all_elements', agent.extract_all_elements, page_source)
+    timed(timings, 'generate_raw_script', agent.generate_raw_script, elements)
+    timed(timings, 'save_results', agent.save_results, elements, output_dir=output_dir)
+    return len(elements)
+
+
+def summarize(timings):
+    """Min, median and max of every phase, in seconds"""
+    return {
+        phase: {
+            'min': min(values),
+            'median': statistics.median(values),
+            'max': max(values)
+        }
+        for phase, values in timings.items()
+    }
+
+
+def git_revision():
+    """Commit of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(shapes, sizes, repeat=3, offline=False, engine='script', validate=True):
+    """Run every shape and size; returns the list of benchmark results"""
+    from raw_locator_generator import DOMExtractorAgent
+
+    extractor = None
+    if engine == 'snapshot':
+        from raw_locator_generator.dom_snapshot import extract_with_dom_snapshot
+        extractor = extract_with_dom_snapshot
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='rlg-bench-') as workdir:
+        workdir = Path(workdir)
+        pages_dir = workdir / 'pages'
+        pages_dir.mkdir()
+
+        server = None
+        if not offline:
+            server = serve_directory(pages_dir)
+        agent = DOMExtractorAgent(validate=validate, extractor=extractor)
+
+        try:
+            for shape in shapes:
+                for size in sizes:
+                    html = generate_page(shape, size)
+                    name = f"{shape}_{size}.html"
+                    (pages_dir / name).write_text(html, encoding='utf-8')
+                    url = f"http://127.0.0.1:{server.server_port}/{name}" if server else f"https://bench.local/{name}"
+
+                    print(f"\n→ Benchmarking {shape} page with {size} nodes ({repeat} runs)")
+                    timings = {}
+                    for run in range(repeat):
+                        output_dir = workdir / 'output' / f"{shape}_{size}_{run}"
+                        start = time.perf_counter()
+                        if offline:
+                            count = run_offline_page(agent, html, url, f"{shape} {size}", output_dir, timings)
+                        else:
+                            count = run_browser_page(agent, url, output_dir, timings)
+                        timings.setdefault('total', []).append(time.perf_counter() - start)
+
+                    summary = summarize(timings)
+                    print(f"✓ {count} interactive elements, {summary['total']['median']:.3f}s per run")
+                    results.append({
+                        'shape': shape,
+                        'size': size,
+                        'nodes': count_nodes(html),
+                        'html_bytes': len(html.encode('utf-8')),
+                        'interactive_elements': count,
+                        'phases': summary
+                    })
+        finally:
+            agent.cleanup()
+            if server:
+                server.shutdown()
+
+    return results
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print the median of every phase against a baseline run; returns the regressions"""
+    previous = {(result['shape'], result['size']): result['phases'] for result in baseline['results']}
+    regressions = []
+
+    print(f"\n{'page':<16}{'phase':<30}{'baseline':>10}{'current':>10}{'ratio':>8}")
+    for result in current['results']:
+        phases = previous.get((result['shape'], result['size']))
+        if phases is None:
+            continue
+        page = f"{result['shape']} {result['size']}"
+        for phase, stats in result['phases'].items():
+            if phase not in phases:
+                continue
+            before = phases[phase]['median']
+            after = stats['median']
+            ratio = after / before if before else float('inf')
+            flag = ''
+            # Ignore sub-millisecond phases, their noise dwarfs any change
+            if ratio > threshold and after - before > 0.001:
+                flag = ' ⚠'
+                regressions.append((page, phase, ratio))
+            print(f"{page:<16}{phase:<30}{before:>10.4f}{after:>10.4f}{ratio:>7.2f}x{flag}")
+
+    return regressions
+
+
+def build_arg_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(description='Benchmark the extraction pipeline on synthetic pages')
+    parser.add_argument('--offline', action='store_true',
+                        help='Only benchmark the phases that need no browser')
+    parser.add_argument('--shapes', nargs='+', choices=sorted(PAGE_SHAPES), default=list(PAGE_SHAPES),
+                        help='Page shapes to generate (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='Approximate node counts (default: 1000 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per page (default: 3)')
+    parser.add_argument('--engine', choices=('script', 'snapshot'), default='script',
+                        help='Extraction engine for browser runs (default: script)')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help='Skip locator validation, which dominates on the largest pages')
+    parser.add_argument('--output', default=None,
+                        help='Results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='Baseline results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Slowdown ratio reported as a regression (default: 1.2)')
+    return parser
+
+
+def main(argv=None):
+    """Main entry point"""
+    args = build_arg_parser().parse_args(argv)
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created': time.time(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'mode': 'offline' if args.offline else 'browser',
+        'engine': None if args.offline else args.engine,
+        'repeat': args.repeat,
+        'validate': args.validate,
+        'results': run_benchmarks(args.shapes, args.sizes, args.repeat, args.offline, args.engine, args.validate)
+    }
+
+    output = Path(args.output) if args.output else (
+        ROOT / 'benchmarks' / 'results' / f"{time.strftime('%Y%m%d_%H%M%S')}_{results['mode']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results saved to: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} phase(s) slower than {args.threshold:.2f}x the baseline")
+            sys.exit(1)
+        print("\n✓ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,9 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "formats": ["msgpack>=1.0.0", "pyarrow>=12.0.0", "zstandard>=0.21.0"],
+    },
     entry_points={
         "console_scripts": [
             "raw-locator-generator=raw_locator_generator.dom_extractor_agent:main",
@@ -8,6 +8,26 @@ then generates raw scripts for multiple automation frameworks.
 __version__ = "1.0.0"
 __author__ = "Raw Locator Generator Team"
 
-from .dom_extractor_agent import DOMExtractorAgent
+__all__ = ["DOMExtractorAgent", "DOMElement", "WebDriverClosedError", "WebDriverSetupError"]
 
-__all__ = ["DOMExtractorAgent"]
+# Public names and the submodule defining them, imported on first access so
+# that importing the package stays fast
+_LAZY_IMPORTS = {
+    "DOMExtractorAgent": "dom_extractor_agent",
+    "WebDriverClosedError": "dom_extractor_agent",
+    "WebDriverSetupError": "dom_extractor_agent",
+    "DOMElement": "elements",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        from importlib import import_module
+        value = getattr(import_module(f".{_LAZY_IMPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
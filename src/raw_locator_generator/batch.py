@@ -0,0 +1,330 @@
+"""
+Batch Mode
+Process many URLs non-interactively with a pool of long-lived headless browsers
+"""
+
+import sys
+import json
+import re
+import threading
+import queue
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from .dom_extractor_agent import DOMExtractorAgent
+from .formats import write_manifest
+
+# Seconds before the first retry of a URL, doubled for every further one
+RETRY_BACKOFF = 1.0
+
+
+def read_urls(source):
+    """Read URLs from a file path, or from stdin when source is '-'"""
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    # Skip blank lines and comments
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def url_label(url, index):
+    """Build a short file-name-safe label for a URL"""
+    host = re.sub(r'^https?://', '', url).split('/')[0]
+    host = re.sub(r'[^A-Za-z0-9.-]+', '_', host)[:50]
+    return f"{index:05d}_{host}"
+
+
+class DriverPool:
+    """Pool of reusable DOMExtractorAgent instances shared by batch workers
+
+    With max_uses, a browser is quit and replaced after that many URLs, which
+    bounds the memory a long-lived Chrome accumulates.
+    """
+
+    def __init__(self, size, timeout=60, agent_factory=DOMExtractorAgent, max_uses=None):
+        self.size = size
+        self.timeout = timeout
+        self.agent_factory = agent_factory
+        self.max_uses = max_uses
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._uses = {}
+        self.recycled = 0
+
+    def _create_agent(self):
+        """Launch a new browser and apply the per-URL timeouts"""
+        agent = self.agent_factory()
+        # Accessing the driver starts the browser; WebDriverSetupError propagates to the caller
+        agent.driver.set_page_load_timeout(self.timeout)
+        agent.driver.set_script_timeout(self.timeout)
+        return agent
+
+    @property
+    def idle(self):
+        """Number of agents waiting in the pool"""
+        return self._idle.qsize()
+
+    def acquire(self):
+        """Get an idle agent, launching a new one while the pool is not full"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if not can_create:
+            return self._idle.get()
+
+        try:
+            return self._create_agent()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def release(self, agent):
+        """Return a healthy agent to the pool, or recycle it once it served max_uses URLs"""
+        with self._lock:
+            uses = self._uses[agent] = self._uses.get(agent, 0) + 1
+        if self.max_uses and uses >= self.max_uses:
+            self.discard(agent)
+        else:
+            self._idle.put(agent)
+
+    def discard(self, agent):
+        """Quit a crashed or stuck agent so a fresh one is launched in its place"""
+        try:
+            agent.cleanup()
+        except Exception:
+            pass
+        with self._lock:
+            self._uses.pop(agent, None)
+            self._created -= 1
+            self.recycled += 1
+
+    def close(self):
+        """Quit every idle agent"""
+        while True:
+            try:
+                agent = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                agent.cleanup()
+            except Exception:
+                pass
+            with self._lock:
+                self._uses.pop(agent, None)
+                self._created -= 1
+
+
+def is_driver_alive(agent):
+    """Check whether the agent's browser still answers commands"""
+    if not agent.driver_started:
+        return False
+    try:
+        agent.driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def process_with_pool(pool, url, index, timeout=60, retries=2, output_dir='output', incremental=False,
+                      on_page=None):
+    """Process one URL with an agent from the pool, retrying and recycling on failure
+
+    on_page(agent, page) is called after a successful attempt, while the page
+    is still loaded in the agent's browser.
+    """
+    def work(agent):
+        page = agent.process_url(url, output_dir=output_dir, label=url_label(url, index), incremental=incremental)
+        if page is not None and on_page is not None:
+            on_page(agent, page)
+        return page
+
+    return run_with_pool(pool, url, work, timeout, retries)
+
+
+def capture_with_pool(pool, url, index, timeout=60, retries=2, output_dir='output', incremental=False):
+    """Load and extract one URL with an agent from the pool, leaving the saving to a SaveStage
+
+    On success the result holds the page under 'capture' and its file label
+    under 'label'. Harvested pages are saved while scrolling, as in
+    process_with_pool.
+    """
+    label = url_label(url, index)
+
+    def work(agent):
+        if agent.harvest is not None:
+            return agent.process_url(url, output_dir=output_dir, label=label, incremental=incremental)
+        if not agent.navigate_to_url(url):
+            return None
+        return {'capture': agent.capture_page(output_dir, label, incremental), 'label': label}
+
+    return run_with_pool(pool, url, work, timeout, retries)
+
+
+def run_with_pool(pool, url, work, timeout=60, retries=2, backoff=RETRY_BACKOFF):
+    """Run work(agent) for one URL with an agent from the pool, retrying and recycling on failure
+
+    work returns a dict merged into the result, or None when the page could
+    not be loaded. Retries wait backoff seconds, doubled for each further one.
+    """
+    result = {'url': url, 'status': 'failed', 'attempts': 0, 'error': ''}
+    start = time.time()
+
+    for attempt in range(retries + 1):
+        if attempt and backoff:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        result['attempts'] = attempt + 1
+        try:
+            agent = pool.acquire()
+        except Exception as e:
+            result['error'] = str(e)
+            continue
+        driver = agent.driver if agent.driver_started else None
+
+        # Quit the browser if the URL runs past its deadline; the blocked
+        # WebDriver call then fails and the agent is recycled below
+        expired = threading.Event()
+
+        def expire(agent=agent):
+            expired.set()
+            agent.cleanup()
+
+        watchdog = threading.Timer(timeout * 2, expire)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            page = work(agent)
+        except Exception as e:
+            page = None
+            result['error'] = str(e)
+        finally:
+            watchdog.cancel()
+
+        # Whatever work returned after the watchdog fired came from a closed browser
+        if expired.is_set() or (agent.driver_started and agent.driver is not driver):
+            pool.discard(agent)
+            result['error'] = (
+                f"timed out after {timeout * 2:g}s" if expired.is_set() else 'browser replaced during the attempt'
+            )
+            continue
+
+        if page is not None and is_driver_alive(agent):
+            pool.release(agent)
+            result.update(page)
+            result['status'] = 'ok'
+            result['error'] = ''
+            break
+
+        if is_driver_alive(agent):
+            pool.release(agent)
+            result['error'] = result['error'] or 'navigation failed'
+        else:
+            pool.discard(agent)
+            result['error'] = result['error'] or 'browser crashed'
+
+    result['seconds'] = round(time.time() - start, 3)
+    return result
+
+
+def run_batch(urls, workers=4, timeout=60, retries=2, output_dir='output', incremental=False,
+              profiler=None, save_workers=0, save_queue=None, recycle_after=None, **agent_options):
+    """Process all URLs across a pool of headless browsers and write a batch report
+
+    agent_options are passed to every DOMExtractorAgent in the pool, whose
+    browsers are replaced after recycle_after URLs (see DriverPool); a
+    profiler (see profiling.create_profiler) also covers the worker threads.
+    With save_workers, pages are saved by a SaveStage of that many threads
+    with at most save_queue pages waiting, while the browsers load the next
+    URLs; otherwise every browser saves its own pages.
+    """
+    print("=" * 60)
+    print("DOM ELEMENT EXTRACTOR AGENT - BATCH MODE")
+    print("=" * 60)
+    print(f"\nURLs: {len(urls)} | Workers: {workers} | Timeout: {timeout}s | Retries: {retries}")
+
+    agent_factory = partial(DOMExtractorAgent, **agent_options)
+    pool = DriverPool(workers, timeout=timeout, agent_factory=agent_factory, max_uses=recycle_after)
+    stage = None
+    if save_workers:
+        from .pipeline import SaveStage
+
+        stage = SaveStage(agent_factory, save_workers, save_queue, output_dir, profiler)
+        print(f"Save workers: {stage.workers} | Save queue: {stage.queue_size}")
+    results = []
+    start = time.time()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if stage is None:
+                task = partial(profiler.run, process_with_pool) if profiler else process_with_pool
+                futures = [
+                    executor.submit(task, pool, url, index, timeout, retries, output_dir, incremental)
+                    for index, url in enumerate(urls, 1)
+                ]
+            else:
+                task = partial(profiler.run, capture_with_pool) if profiler else capture_with_pool
+                futures = [
+                    stage.submit(executor, task, pool, url, index, timeout, retries, output_dir, incremental)
+                    for index, url in enumerate(urls, 1)
+                ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                mark = '✓' if result['status'] == 'ok' else '✗'
+                print(f"{mark} [{len(results)}/{len(urls)}] {result['url']} ({result['seconds']}s)")
+    except KeyboardInterrupt:
+        print("\n\n✗ Batch cancelled by user")
+    finally:
+        pool.close()
+        if stage is not None:
+            stage.close()
+
+    elapsed = time.time() - start
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    cached = sum(1 for result in results if result.get('cached'))
+
+    # Save the batch report next to the generated files
+    report_dir = Path(output_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_file = report_dir / f"batch_report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'total': len(urls),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'cached': cached,
+            'browsers_recycled': pool.recycled,
+            'seconds': round(elapsed, 3),
+            **({'save_stage': stage.snapshot()} if stage is not None else {}),
+            'results': results
+        }, f, indent=2, ensure_ascii=False)
+    manifest_file = write_manifest(output_dir, results)
+
+    print(f"\n{'='*60}")
+    print("BATCH SUMMARY")
+    print(f"{'='*60}")
+    print(f"Succeeded: {succeeded}/{len(urls)}")
+    print(f"Served from cache: {cached}")
+    print(f"Browsers recycled: {pool.recycled}")
+    if stage is not None:
+        stats = stage.snapshot()
+        print(f"Browsers waited for the save stage {stats['blocked']} times ({stats['blocked_seconds']}s)")
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"✓ Report saved to: {report_file}")
+    print(f"✓ Manifest saved to: {manifest_file}")
+    print(f"{'='*60}\n")
+
+    return results
@@ -0,0 +1,155 @@
+"""
+Extraction Cache
+Content-addressed on-disk cache of extracted elements and generated scripts
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+
+from . import __version__
+
+# Bump when extraction or script generation output changes, so stale entries miss
+GENERATOR_VERSION = f"{__version__}-2"
+
+# Marker file whose modification time records the last eviction
+EVICT_MARKER = '.last_evict'
+
+
+def normalize_dom(page_source):
+    """Collapse insignificant whitespace so formatting-only differences hash the same"""
+    page_source = re.sub(r'>\s+<', '><', page_source)
+    return re.sub(r'\s+', ' ', page_source).strip()
+
+
+class ExtractionCache:
+    """On-disk cache keyed by URL, generator version and a hash of the normalized DOM
+
+    Eviction scans the whole cache directory, so it runs every evict_interval
+    puts of one instance, and on the first put when the last eviction (by any
+    instance, e.g. the copies offline worker processes get) is more than
+    evict_period seconds old.
+    """
+
+    def __init__(self, cache_dir='.locator_cache', max_entries=5000,
+                 max_size_mb=1024, max_age_hours=7 * 24, evict_interval=100, evict_period=3600):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_hours * 3600
+        self.evict_interval = evict_interval
+        self.evict_period = evict_period
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+    def key(self, url, page_source, variant=''):
+        """Build the cache key for a page; variant separates runs with different output options"""
+        digest = hashlib.sha256()
+        digest.update(GENERATOR_VERSION.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(variant.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(url.encode('utf-8'))
+        digest.update(b'\0')
+        if isinstance(page_source, bytes):
+            page_source = page_source.decode('utf-8', 'replace')
+        digest.update(normalize_dom(page_source).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached entry for a key, or None on a miss"""
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age:
+                path.unlink()
+                self.misses += 1
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            # Refresh the modification time so age and eviction count from the last use
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def put(self, key, url, elements, scripts, files=None, output_dir=None, data=None):
+        """Store extracted elements, generated scripts and the files they were saved to"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            'url': url,
+            'version': GENERATOR_VERSION,
+            'created': time.time(),
+            'elements': elements,
+            'scripts': scripts,
+            'files': files or [],
+            'output_dir': str(output_dir) if output_dir is not None else None,
+            'data': data
+        }
+
+        # Write atomically so concurrent workers never read a partial entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        self._puts += 1
+        if self._puts % self.evict_interval == 0 or (self._puts == 1 and self._eviction_due()):
+            self.evict()
+
+    def _eviction_due(self):
+        """Whether no eviction ran within evict_period, one stat instead of a directory scan"""
+        try:
+            return time.time() - (self.cache_dir / EVICT_MARKER).stat().st_mtime > self.evict_period
+        except OSError:
+            return True
+
+    def evict(self):
+        """Remove expired entries, then the least recently used ones over the size limits"""
+        entries = []
+        now = time.time()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / EVICT_MARKER).touch()
+
+        for path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+            removed += 1
+
+        return removed
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
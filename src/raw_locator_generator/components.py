@@ -0,0 +1,229 @@
+"""
+Shared Components
+Store the elements of components repeated across pages (headers, navigation,
+footers, design-system widgets) once per run, with their own scripts, and
+have every page refer to them instead of repeating their locators
+"""
+
+import os
+import re
+import json
+import threading
+
+from .formats import iter_elements
+
+# Fields that depend on the page a component is seen on, left out of its stored records
+PAGE_FIELDS = ('subtrees', 'component', 'geometry', 'actionable', 'locator_matches', 'preferred_locator')
+
+# Subtree hashes remembered while counting pages, least recently seen dropped first
+MAX_HASHES = 200000
+
+
+def component_id(tag, digest):
+    """Stable id of a component: its root tag and the hash of its subtree
+
+    The same component on two pages gets the same id, and so the same files.
+    """
+    return f"{re.sub(r'[^A-Za-z0-9-]', '', tag) or 'component'}-{digest[:10]}"
+
+
+def relative_xpath(xpath, root):
+    """XPath of an element below a component root, relative to that root ('./a[1]')"""
+    if xpath and xpath.startswith(root + '/'):
+        return '.' + xpath[len(root):]
+    # Anchored to an id inside the component, so it does not depend on the root
+    return xpath
+
+
+def absolute_xpath(xpath, root):
+    """Undo relative_xpath for the root a component has on one page"""
+    if xpath and xpath.startswith('./'):
+        return root + xpath[1:]
+    return xpath
+
+
+def component_elements(path, root):
+    """Read a component's stored elements with their XPaths below root, its place on one page"""
+    for elem in iter_elements(path):
+        elem['xpath'] = absolute_xpath(elem['xpath'], root)
+        yield elem
+
+
+class ComponentIndex:
+    """Components of a run by subtree hash, each saved once
+
+    Elements are tagged with the subtrees around them (see
+    DOMExtractorAgent.find_components). A subtree becomes a component once the
+    same hash has been seen on at least min_pages pages; every element is
+    grouped under the outermost one. Groups of at least min_elements elements
+    are written once to json_data/dom_elements_component_<id>.* with one
+    script per emitter and left out of the page data. Stored XPaths are
+    relative to the component root and page-specific fields (validation,
+    geometry) are left out; each page's reference holds its own root.
+
+    Pages are counted as they are saved, so the ones saved before a subtree
+    was seen elsewhere keep its elements, and at most max_hashes hashes are
+    remembered. preload counts every page of a run up front instead (offline
+    mode, whose worker processes each get a copy of the index). One index is
+    shared by every agent of a run. Components already on disk, from an
+    earlier run into the same output directory or another worker process,
+    are reused.
+    """
+
+    def __init__(self, min_elements=2, min_pages=2, max_hashes=MAX_HASHES):
+        self.min_elements = min_elements
+        self.min_pages = min_pages
+        self.max_hashes = max_hashes
+        self.components = {}
+        # Hash -> pages it was seen on, counted up to min_pages, in least recently seen order
+        self.pages = {}
+        # Hashes of the components of a preloaded run, or None while counting
+        self.shared = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.components)
+
+    def __getstate__(self):
+        # Offline worker processes get their own copy; the files on disk are shared
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def preload(self, pages):
+        """Count the subtree hashes of every page of a run, one iterable of hashes per page
+
+        Later splits use these counts and count nothing more, so copies of
+        the index in other processes agree on the components.
+        """
+        counts = {}
+        for digests in pages:
+            for digest in set(digests):
+                counts[digest] = counts.get(digest, 0) + 1
+        with self._lock:
+            self.shared = {digest for digest, count in counts.items() if count >= self.min_pages}
+            self.pages = {}
+
+    def seen(self, digests, page):
+        """Count the subtree hashes of a page and return the ones seen on min_pages pages"""
+        if self.shared is not None:
+            return self.shared & set(digests)
+        shared = set()
+        with self._lock:
+            for digest in digests:
+                # Moved to the end: the least recently seen hashes are dropped first
+                pages = self.pages.pop(digest, [])
+                self.pages[digest] = pages
+                if page not in pages and len(pages) < self.min_pages:
+                    pages.append(page)
+                if len(pages) >= self.min_pages:
+                    shared.add(digest)
+            while len(self.pages) > self.max_hashes:
+                del self.pages[next(iter(self.pages))]
+        return shared
+
+    def split(self, elements, page=None):
+        """Separate a page's elements into its own and the groups of each component
+
+        page identifies the page (its URL), so saving it again does not count
+        as another page. Returns (page_elements, groups) with groups mapping
+        (context, root, tag, hash) to the elements of that component, in page
+        order. 'subtrees' is left out of the returned records and 'component'
+        holds the root of the component holding the element, or None.
+        """
+        shared = self.seen({digest for elem in elements for _, _, digest in elem.get('subtrees') or ()}, page)
+        keys = []
+        records = []
+        for elem in elements:
+            root = next((entry for entry in elem.get('subtrees') or () if entry[2] in shared), None)
+            keys.append((json.dumps(elem.get('context')), *root) if root else None)
+            records.append({name: value for name, value in elem.items() if name != 'subtrees'})
+        groups = {}
+        for key, record in zip(keys, records):
+            if key is not None:
+                groups.setdefault(key, []).append(record)
+        groups = {key: members for key, members in groups.items() if len(members) >= self.min_elements}
+
+        page_elements = []
+        for key, record in zip(keys, records):
+            record['component'] = key[1] if key in groups else None
+            if key not in groups:
+                page_elements.append(record)
+        return page_elements, groups
+
+    def save(self, agent, elements, output_dir='output'):
+        """Split the components out of a page's elements, saving the ones not saved yet
+
+        Returns the page's own elements and a reference to each component on
+        it: its id, its root on this page, element count, data file entry and
+        script files.
+        """
+        page_elements, groups = self.split(elements, agent.current_url)
+        references = []
+        for (_, root, tag, digest), members in groups.items():
+            key = (str(output_dir), component_id(tag, digest))
+            # Components are small and written once, so one lock for all of them is enough
+            with self._lock:
+                reference = self.components.get(key)
+                if reference is None:
+                    records = [
+                        dict(
+                            {name: value for name, value in elem.items() if name not in PAGE_FIELDS},
+                            xpath=relative_xpath(elem['xpath'], root)
+                        )
+                        for elem in members
+                    ]
+                    reference = self._write(agent, key[1], records, output_dir)
+                    self.components[key] = reference
+            references.append(dict(reference, root=root))
+        return page_elements, references
+
+    def _write(self, agent, component, elements, output_dir):
+        """Write a component's data and scripts, or reuse them when already on disk"""
+        data_file, script_files = agent.output_paths(output_dir, f"component_{component}")
+        index_file = data_file.with_name(data_file.name + '.idx')
+        reference = {
+            'id': component,
+            'element_count': len(elements),
+            'data': {
+                'path': str(data_file),
+                'format': agent.output_format,
+                'compression': agent.compression,
+                'count': len(elements),
+                'index': str(index_file) if index_file.exists() else None
+            },
+            'files': [str(path) for path in script_files.values()]
+        }
+        if data_file.exists() and all(path.exists() for path in script_files.values()):
+            return reference
+
+        # Written under temporary names and moved into place, so concurrent
+        # processes saving the same component never leave a partial file
+        suffix = f".{os.getpid()}-{threading.get_ident()}.tmp"
+        temporary = {name: path.with_name(path.name + suffix) for name, path in script_files.items()}
+        data_temporary = data_file.with_name(data_file.name + suffix)
+        data = agent._write_outputs(
+            elements, data_temporary, agent.output_format, agent.compression, temporary,
+            url=agent.current_url, title=f"Component {component} (XPaths relative to its root)"
+        )
+        for name, path in temporary.items():
+            os.replace(path, script_files[name])
+        os.replace(data_temporary, data_file)
+        if data['index']:
+            os.replace(data['index'], index_file)
+            data['index'] = str(index_file)
+        data['path'] = str(data_file)
+        reference['data'] = data
+
+        print(f"  ✓ COMPONENT {component}: {len(elements)} elements")
+        agent.metrics.count('components_saved')
+        agent.metrics.count('files_written', 1 + len(script_files))
+        agent.metrics.count('bytes_written', sum(
+            os.path.getsize(path) for path in [data_file, *script_files.values()]
+        ))
+        return reference
+
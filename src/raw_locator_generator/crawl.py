@@ -0,0 +1,323 @@
+"""
+Crawl Mode
+Start from one URL and follow same-site links breadth-first across a pool of
+headless browsers, with the frontier kept in SQLite so interrupted crawls resume
+"""
+
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from .batch import DriverPool, process_with_pool
+from .dom_extractor_agent import DOMExtractorAgent
+from .formats import write_manifest
+from .page_scripts import COLLECT_LINKS
+
+FRONTIER_VERSION = 1
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Downloads, not pages; excluded unless the patterns are replaced
+DEFAULT_EXCLUDE = tuple(
+    f"*.{extension}$" for extension in (
+        'pdf', 'zip', 'gz', 'tar', 'exe', 'dmg', 'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp',
+        'mp3', 'mp4', 'webm', 'csv', 'xls', 'xlsx', 'doc', 'docx', 'ppt', 'pptx'
+    )
+)
+
+
+def normalize_url(url, base=None):
+    """Canonical form of an http(s) URL for deduplication, or None for other schemes
+
+    The fragment is dropped, scheme and host are lowercased, default ports
+    removed and query parameters sorted.
+    """
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if ':' in host:
+        host = f"[{host}]"
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def robots_pattern(pattern):
+    """Compile a robots.txt-style path pattern: a prefix match, '*' any run of characters, '$' the end"""
+    anchored = pattern.endswith('$')
+    if anchored:
+        pattern = pattern[:-1]
+    if not pattern.startswith(('/', '*')):
+        pattern = '/' + pattern
+    regex = '.*'.join(re.escape(part) for part in pattern.split('*'))
+    return re.compile(regex + ('$' if anchored else ''))
+
+
+class CrawlScope:
+    """Which URLs a crawl may visit
+
+    By default only URLs on the seed's origin (scheme, host and port) are
+    followed; path_prefix narrows that further. exclude holds robots.txt-style
+    patterns matched against the path and query, and robots additionally
+    obeys the Disallow rules of the site's robots.txt.
+    """
+
+    def __init__(self, seed, max_depth=3, max_pages=None, same_origin=True, path_prefix=None,
+                 exclude=DEFAULT_EXCLUDE, robots=False, user_agent='*'):
+        self.seed = normalize_url(seed)
+        if self.seed is None:
+            raise ValueError(f"Not an http(s) URL: {seed}")
+        parts = urlsplit(self.seed)
+        self.origin = (parts.scheme, parts.netloc)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_origin = same_origin
+        self.path_prefix = path_prefix
+        self.exclude = [robots_pattern(pattern) for pattern in exclude]
+        self.user_agent = user_agent
+        self.robots = self._load_robots() if robots else None
+
+    def _load_robots(self):
+        """Parse the seed origin's robots.txt; a missing file allows everything"""
+        from urllib.robotparser import RobotFileParser
+        parser = RobotFileParser(f"{self.origin[0]}://{self.origin[1]}/robots.txt")
+        try:
+            parser.read()
+        except Exception as e:
+            print(f"⚠ Could not read robots.txt ({e}), crawling without it")
+            return None
+        return parser
+
+    def allows(self, url, depth=0):
+        """Whether a normalized URL at this depth is in scope"""
+        if depth > self.max_depth:
+            return False
+        parts = urlsplit(url)
+        if self.same_origin and (parts.scheme, parts.netloc) != self.origin:
+            return False
+        if self.path_prefix and not parts.path.startswith(self.path_prefix):
+            return False
+        target = parts.path + (f"?{parts.query}" if parts.query else '')
+        if any(pattern.match(target) for pattern in self.exclude):
+            return False
+        if self.robots is not None and not self.robots.can_fetch(self.user_agent, url):
+            return False
+        return True
+
+
+class Frontier:
+    """Persistent, deduplicated crawl frontier in one SQLite file
+
+    Every URL ever discovered is stored once with its depth and status
+    (pending, active, done or failed). URLs left active by an interrupted
+    crawl are pending again when the frontier is reopened.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS urls ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE NOT NULL, depth INTEGER NOT NULL, '
+                "parent TEXT, status TEXT NOT NULL DEFAULT 'pending', added REAL NOT NULL, result TEXT)"
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS urls_pending ON urls (status, depth, id)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._db.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('version', ?)", (str(FRONTIER_VERSION),)
+            )
+            self.resumed = self._db.execute(
+                "UPDATE urls SET status = 'pending' WHERE status = 'active'"
+            ).rowcount
+
+    def add(self, urls, depth, parent=None):
+        """Add discovered URLs; returns how many were new"""
+        now = time.time()
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                'INSERT OR IGNORE INTO urls (url, depth, parent, added) VALUES (?, ?, ?, ?)',
+                [(url, depth, parent, now) for url in urls]
+            )
+            return self._db.total_changes - before
+
+    def claim(self, limit=1):
+        """Mark up to limit pending URLs active, shallowest first; returns (id, url, depth) tuples"""
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT id, url, depth FROM urls WHERE status = 'pending' ORDER BY depth, id LIMIT ?", (limit,)
+            ).fetchall()
+            self._db.executemany("UPDATE urls SET status = 'active' WHERE id = ?", [(row[0],) for row in rows])
+        return rows
+
+    def finish(self, url, result):
+        """Store the outcome of a visited URL"""
+        status = 'done' if result.get('status') == 'ok' else 'failed'
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE urls SET status = ?, result = ? WHERE url = ?',
+                (status, json.dumps(result, ensure_ascii=False), url)
+            )
+
+    def counts(self):
+        """Number of URLs in every status"""
+        with self._lock:
+            return dict(self._db.execute('SELECT status, COUNT(*) FROM urls GROUP BY status').fetchall())
+
+    def results(self):
+        """Stored results of every visited URL, in discovery order"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT result FROM urls WHERE status IN ('done', 'failed') ORDER BY id"
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        """Close the database; the frontier can be reopened to resume"""
+        with self._lock:
+            self._db.close()
+
+
+def collect_links(agent):
+    """Absolute URLs of every link on the agent's current page"""
+    try:
+        return agent.driver.execute_script(COLLECT_LINKS) or []
+    except Exception as e:
+        print(f"⚠ Could not collect links: {e}")
+        return []
+
+
+def expand(frontier, scope, url, depth, agent, page):
+    """Add the in-scope links of a visited page to the frontier; returns how many were new"""
+    if depth >= scope.max_depth:
+        return 0
+    # After a redirect, follow links only when the page landed in scope
+    base = normalize_url(page.get('url') or url) or url
+    if not scope.allows(base, depth):
+        return 0
+
+    links = set()
+    for link in collect_links(agent):
+        link = normalize_url(link, base)
+        if link and scope.allows(link, depth + 1):
+            links.add(link)
+    return frontier.add(sorted(links), depth + 1, url) if links else 0
+
+
+def run_crawl(seed, frontier_path=None, scope=None, workers=4, timeout=60, retries=2, output_dir='output',
+              incremental=False, profiler=None, recycle_after=None, **agent_options):
+    """Crawl from seed, processing at most workers pages at a time, and write a crawl report
+
+    scope is a CrawlScope (default: the seed's origin, depth 3). The frontier
+    defaults to <output_dir>/crawl_frontier.sqlite; reusing it resumes the
+    crawl. Browsers are replaced after recycle_after URLs (see DriverPool).
+    Returns the results of the pages visited by this run.
+    """
+    scope = scope or CrawlScope(seed)
+    frontier = Frontier(frontier_path or Path(output_dir) / 'crawl_frontier.sqlite')
+
+    print("=" * 60)
+    print("DOM ELEMENT EXTRACTOR AGENT - CRAWL MODE")
+    print("=" * 60)
+    added = frontier.add([scope.seed], 0)
+    counts = frontier.counts()
+    visited = counts.get('done', 0) + counts.get('failed', 0)
+    if not added:
+        print(f"\n→ Resuming crawl: {visited} visited, {counts.get('pending', 0)} pending "
+              f"({frontier.resumed} interrupted)")
+    print(f"\nSeed: {scope.seed} | Depth: {scope.max_depth} | Max pages: {scope.max_pages or 'unlimited'} "
+          f"| Workers: {workers}")
+
+    pool = DriverPool(
+        workers, timeout=timeout, agent_factory=partial(DOMExtractorAgent, **agent_options), max_uses=recycle_after
+    )
+    results = []
+    start = time.time()
+
+    def visit(index, url, depth):
+        on_page = lambda agent, page: expand(frontier, scope, url, depth, agent, page)
+        result = process_with_pool(pool, url, index, timeout, retries, output_dir, incremental, on_page)
+        result['depth'] = depth
+        frontier.finish(url, result)
+        return result
+
+    task = partial(profiler.run, visit) if profiler else visit
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running = set()
+            while True:
+                # Keep at most one page per browser in flight
+                free = workers - len(running)
+                if scope.max_pages is not None:
+                    free = min(free, scope.max_pages - visited - len(running))
+                if free > 0:
+                    for index, url, depth in frontier.claim(free):
+                        running.add(executor.submit(task, index, url, depth))
+                if not running:
+                    break
+
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results.append(result)
+                    visited += 1
+                    mark = '✓' if result['status'] == 'ok' else '✗'
+                    print(f"{mark} [{visited}] depth {result['depth']} {result['url']} ({result['seconds']}s)")
+    except KeyboardInterrupt:
+        print("\n\n✗ Crawl interrupted, run the same command again to resume")
+    finally:
+        pool.close()
+
+    elapsed = time.time() - start
+    counts = frontier.counts()
+    all_results = frontier.results()
+    frontier.close()
+
+    # The report and manifest cover the whole crawl, including earlier runs
+    report_dir = Path(output_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_file = report_dir / f"crawl_report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'seed': scope.seed,
+            'frontier': str(frontier.path),
+            'status': counts,
+            'browsers_recycled': pool.recycled,
+            'seconds': round(elapsed, 3),
+            'results': all_results
+        }, f, indent=2, ensure_ascii=False)
+    manifest_file = write_manifest(output_dir, all_results)
+
+    print(f"\n{'='*60}")
+    print("CRAWL SUMMARY")
+    print(f"{'='*60}")
+    print(f"Visited this run: {len(results)} ({sum(1 for result in results if result['status'] == 'ok')} succeeded)")
+    print(f"Frontier: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, "
+          f"{counts.get('pending', 0) + counts.get('active', 0)} pending")
+    print(f"Browsers recycled: {pool.recycled}")
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"✓ Report saved to: {report_file}")
+    print(f"✓ Manifest saved to: {manifest_file}")
+    print(f"{'='*60}\n")
+
+    return results
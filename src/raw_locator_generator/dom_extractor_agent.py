@@ -7,23 +7,160 @@ Assist mode: User provides URL, agent navigates and extracts DOM elements
 import sys
 import json
 import os
+import argparse
+from contextlib import ExitStack
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import time
 
+# Selenium and BeautifulSoup are imported where they are used, so importing the
+# package and generation-only or offline work never pay for them
+
+from .elements import DOMElement
+from .fast_load import DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_URLS, RESOURCE_TYPE_EXTENSIONS, FastLoadProfile
+from .formats import COMPRESSIONS, OUTPUT_FORMATS, data_filename, element_writer, write_manifest
+from .generation import EMITTERS, SCRIPT_ELEMENT_LIMIT, generate_script_texts, generate_scripts
+from .locators import locator_candidates, rank_locators
+from .metrics import METRICS_FORMATS, Metrics, timed_phase
+from .page_scripts import (
+    COLLECT_NESTED_ROOTS, EXTRACT_INTERACTIVE_ELEMENTS, FIND_COMPONENTS, MEASURE_ELEMENTS, VALIDATE_LOCATORS
+)
+from .profiling import PROFILERS, create_profiler, profile_call
+from .readiness import READY_STRATEGIES, drain_performance_log, wait_for_ready
+from .roles import DEFAULT_ROLE_RULES, parse_role, role_rules, union_query
+
+
+# Extraction backends selectable from the command line
+EXTRACTION_ENGINES = ('script', 'snapshot')
+
+
+class WebDriverSetupError(RuntimeError):
+    """The browser could not be started"""
+
+
+class WebDriverClosedError(RuntimeError):
+    """The browser was quit by cleanup; only setup_driver starts another one"""
+
+
 class DOMExtractorAgent:
-    def __init__(self):
-        """Initialize the agent with Chrome webdriver"""
-        self.driver = None
-        self.setup_driver()
+    def __init__(self, cache=None, validate=True, readiness='body', ready_timeout=10,
+                 quiet_ms=500, fast_load=None, driver=None, driver_factory=None, extractor=None,
+                 script_limit=SCRIPT_ELEMENT_LIMIT, output_format='json', compression=None, rules=None,
+                 metrics=None, pierce=False, geometry=False, actionable_only=False, harvest=None,
+                 components=None):
+        """Initialize the agent; the browser is only started when a page needs it
+        
+        driver is an already running WebDriver to use, driver_factory a callable
+        returning one instead of the default headless Chrome, and extractor a
+        callable(agent) returning the interactive elements of the current page.
+        rules maps role names to XPath predicates (see roles.role_rules), and
+        metrics a Metrics collector, which several agents may share. pierce
+        also extracts from open shadow roots and same-origin frames. geometry
+        tags elements with their geometry and an 'actionable' flag, and
+        actionable_only drops the elements that are not actionable. harvest is
+        a HarvestProfile scrolling through infinite or virtualized lists.
+        components is a ComponentIndex, shared by the agents of a run, storing
+        headers, navigation and other repeated components once.
+        """
+        # Phase timings and counters, including every WebDriver command
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._driver = self.metrics.instrument_driver(driver)
+        # Set by cleanup: a call still running on the old browser must fail, not launch a new one
+        self._closed = False
+        self.driver_factory = driver_factory
+        self.extractor = extractor
+        self.rules = dict(rules or DEFAULT_ROLE_RULES)
+        self.pierce = pierce
+        self.geometry = geometry or actionable_only
+        self.actionable_only = actionable_only
+        
+        # Optional HarvestProfile: scroll the page and extract as content appears
+        self.harvest = harvest
+        
+        # Optional ComponentIndex: repeated components are saved once and referenced
+        self.components = components
+        self.last_components = []
+        
+        # How navigate_to_url decides the page is ready: a READY_STRATEGIES
+        # name or a predicate(driver), bounded by ready_timeout seconds
+        self.readiness = readiness
+        self.ready_timeout = ready_timeout
+        self.quiet_ms = quiet_ms
+        self.last_ready_time = None
+        
+        # Optional FastLoadProfile blocking images, media, fonts and trackers
+        self.fast_load = fast_load
+        
+        # Optional ExtractionCache used by extract_and_save
+        self.cache = cache
+        
+        # Check locator uniqueness on the page before generating scripts
+        self.validate = validate
+        
+        # Elements per framework script; None includes every element
+        self.script_limit = script_limit
+        
+        # Element data file format (formats.OUTPUT_FORMATS) and optional gzip/zstd compression
+        self.output_format = output_format
+        self.compression = compression
+        self.last_data = None
+        
+        # Set when working from saved HTML instead of a live browser
+        self.page_url = None
+        self.page_title = None
+    
+    @property
+    def driver(self):
+        """WebDriver of this agent, started on first use
+        
+        Raises WebDriverClosedError after cleanup until setup_driver is called.
+        """
+        if self._driver is None:
+            if self._closed:
+                raise WebDriverClosedError("The browser of this agent was closed")
+            self.setup_driver()
+        return self._driver
     
+    @driver.setter
+    def driver(self, driver):
+        self._driver = self.metrics.instrument_driver(driver)
+        self._closed = False
+    
+    @property
+    def driver_started(self):
+        """Whether a browser is running, without starting one"""
+        return self._driver is not None
+    
+    @property
+    def current_url(self):
+        """URL of the page being processed"""
+        if self.page_url is not None:
+            return self.page_url
+        return self.driver.current_url
+    
+    @property
+    def title(self):
+        """Title of the page being processed"""
+        if self.page_title is not None:
+            return self.page_title
+        return self.driver.title
+    
+    @timed_phase('setup_driver')
     def setup_driver(self):
         """Setup Chrome driver with headless options"""
+        self._closed = False
+        if self.driver_factory is not None:
+            try:
+                self._driver = self.metrics.instrument_driver(self.driver_factory())
+            except Exception as e:
+                print(f"✗ Error initializing WebDriver: {e}")
+                raise WebDriverSetupError(str(e)) from e
+            if self.fast_load:
+                self.fast_load.apply_driver(self._driver)
+            return self._driver
+        
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        
         chrome_options = Options()
         chrome_options.add_argument('--headless')
         chrome_options.add_argument('--no-sandbox')
@@ -40,13 +177,28 @@ class DOMExtractorAgent:
         chrome_options.add_argument('--disable-extensions')
         chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
 
+        # Network idle detection reads request events from the performance log
+        if self.readiness == 'network-idle':
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+        if self.fast_load:
+            self.fast_load.apply_options(chrome_options)
+
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self._driver = self.metrics.instrument_driver(webdriver.Chrome(options=chrome_options))
             print("✓ WebDriver initialized successfully")
         except Exception as e:
             print(f"✗ Error initializing WebDriver: {e}")
-            sys.exit(1)
+            raise WebDriverSetupError(str(e)) from e
+        
+        if self.fast_load:
+            if self.fast_load.apply_driver(self._driver):
+                print("✓ Fast-load profile active")
+            else:
+                print("⚠ Resource blocking is not supported by this browser")
+        return self._driver
     
+    @timed_phase('navigate_to_url')
     def navigate_to_url(self, url):
         """Navigate to the provided URL"""
         try:
@@ -54,86 +206,163 @@ class DOMExtractorAgent:
                 url = 'https://' + url
             
             print(f"\n→ Navigating to: {url}")
+            self.page_url = None
+            self.page_title = None
+            if self.readiness == 'network-idle':
+                drain_performance_log(self.driver)
+            start = time.time()
             self.driver.get(url)
             
             # Wait for page to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            ready = wait_for_ready(self.driver, self.readiness, self.ready_timeout, self.quiet_ms)
+            self.last_ready_time = time.time() - start
+            strategy = getattr(self.readiness, '__name__', self.readiness)
+            if ready:
+                print(f"✓ Page ready in {self.last_ready_time:.2f}s ({strategy})")
+            else:
+                print(f"⚠ Page not settled after {self.last_ready_time:.2f}s ({strategy}), extracting anyway")
             
-            print(f"✓ Successfully loaded: {self.driver.title}")
+            print(f"✓ Successfully loaded: {self.title}")
             return True
             
+        except WebDriverSetupError:
+            raise
         except Exception as e:
             print(f"✗ Error navigating to URL: {e}")
             return False
     
-    def extract_all_elements(self):
-        """Extract all DOM elements from the page"""
+    @timed_phase('extract_all_elements', counter='elements_all')
+    def extract_all_elements(self, page_source=None, parser='html.parser'):
+        """Extract all DOM elements from the page, or from the given HTML source
+        
+        parser is the BeautifulSoup tree builder; 'lxml' is faster but repairs
+        malformed markup differently, which changes some XPaths and texts.
+        """
         try:
-            # Get page source
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            elements_data = []
-            
-            # Extract all elements with their attributes
-            for element in soup.find_all(True):  # True finds all tags
-                element_info = {
-                    'tag': element.name,
-                    'id': element.get('id', ''),
-                    'classes': element.get('class', []),
-                    'attributes': dict(element.attrs),
-                    'text': element.get_text(strip=True)[:100] if element.get_text(strip=True) else '',
-                    'xpath': self._generate_xpath(element)
-                }
-                elements_data.append(element_info)
-            
-            return elements_data
+            return [element.to_dict() for element in self.iter_all_elements(page_source, parser)]
             
         except Exception as e:
             print(f"✗ Error extracting elements: {e}")
             return []
     
+    def iter_all_elements(self, page_source=None, parser='html.parser'):
+        """Yield a compact DOMElement for every tag of the page, in document order
+        
+        With pierce, the elements of every open shadow root and same-origin
+        frame of the live page follow, each tagged with its context. parser
+        is as for extract_all_elements.
+        """
+        nested_roots = []
+        # Get page source
+        if page_source is None:
+            page_source = self.driver.page_source
+            if self.pierce:
+                nested_roots = json.loads(self.driver.execute_script(COLLECT_NESTED_ROOTS))
+        
+        yield from self._iter_source_elements(page_source, parser)
+        for context, kind, html in nested_roots:
+            # Shadow root markup is a fragment, and XPath cannot address it
+            if kind == 'frame':
+                yield from self._iter_source_elements(html, parser, context)
+            else:
+                yield from self._iter_source_elements(html, 'html.parser', context, xpaths=False)
+    
+    def _iter_source_elements(self, page_source, parser='html.parser', context=None, xpaths=True):
+        """Yield a DOMElement for every tag of one document or fragment"""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(page_source, parser)
+        
+        texts = self._generate_texts(soup)
+        subtree_keys = {}
+        stack = [(soup, '')]
+        
+        while stack:
+            element, xpath = stack.pop()
+            if element is not soup:
+                yield DOMElement(
+                    element.name,
+                    element.get('id', ''),
+                    element.get('class', []),
+                    tuple(element.attrs.items()),
+                    texts.pop(id(element)),
+                    xpath if xpaths else '',
+                    context
+                )
+            
+            # Push children in reverse so they come out in document order
+            children = self._xpath_components(element, subtree_keys)
+            stack.extend((child, f"{xpath}/{component}") for child, component in reversed(children))
+    
+    # Number of elements the framework-specific scripts include by default
+    SCRIPT_ELEMENT_LIMIT = SCRIPT_ELEMENT_LIMIT
+    
+    @timed_phase('extract_interactive_elements', counter='elements_interactive')
     def extract_interactive_elements(self):
         """Extract interactive elements (buttons, links, inputs, etc.)"""
+        if self.extractor is not None:
+            try:
+                return self.extractor(self)
+            except Exception as e:
+                name = getattr(self.extractor, '__name__', 'Custom extractor')
+                print(f"✗ {name} failed ({e}), falling back to in-page extraction")
+        
         try:
-            interactive_elements = []
-            
-            # Find all interactive elements using Selenium
-            selectors = {
-                'buttons': "//button | //input[@type='button'] | //input[@type='submit']",
-                'links': "//a[@href]",
-                'inputs': "//input | //textarea | //select",
-                'clickable': "//*[@onclick or @role='button']"
-            }
-            
-            for element_type, xpath in selectors.items():
-                elements = self.driver.find_elements(By.XPATH, xpath)
-                
-                for element in elements:
-                    try:
-                        element_info = {
-                            'type': element_type,
-                            'tag': element.tag_name,
-                            'id': element.get_attribute('id') or '',
-                            'class': element.get_attribute('class') or '',
-                            'name': element.get_attribute('name') or '',
-                            'text': element.text[:100] if element.text else '',
-                            'href': element.get_attribute('href') if element.tag_name == 'a' else '',
-                            'xpath': self._get_element_xpath(element),
-                            'css_selector': self._get_css_selector(element)
-                        }
-                        interactive_elements.append(element_info)
-                    except:
-                        continue
-            
-            return interactive_elements
-            
+            # Collect everything with one injected script per page
+            return self._extract_interactive_elements_in_page()
+        except Exception as e:
+            print(f"✗ In-page extraction failed ({e}), falling back to per-element extraction")
+        
+        try:
+            return self._extract_interactive_elements_per_element()
         except Exception as e:
             print(f"✗ Error extracting interactive elements: {e}")
             return []
     
+    def _extract_interactive_elements_in_page(self):
+        """Extract interactive elements with a single execute_script round-trip"""
+        payload = self.driver.execute_script(
+            EXTRACT_INTERACTIVE_ELEMENTS, list(self.rules.items()), self.pierce, self.geometry
+        )
+        interactive_elements = json.loads(payload)
+        
+        for element_info in interactive_elements:
+            element_info['text'] = element_info['text'][:100]
+        
+        return interactive_elements
+    
+    def _extract_interactive_elements_per_element(self):
+        """Extract interactive elements with WebDriver calls for each element (top document only)"""
+        from selenium.webdriver.common.by import By
+        
+        interactive_elements = []
+        
+        # One search per rule to learn the roles, then every element is read once
+        role_members = {
+            role: {element.id for element in self.driver.find_elements(By.XPATH, f"//*[{predicate}]")}
+            for role, predicate in self.rules.items()
+        }
+        
+        for element in self.driver.find_elements(By.XPATH, union_query(self.rules)):
+            try:
+                roles = [role for role, members in role_members.items() if element.id in members]
+                element_info = {
+                    'type': roles[0],
+                    'roles': roles,
+                    'tag': element.tag_name,
+                    'id': element.get_attribute('id') or '',
+                    'class': element.get_attribute('class') or '',
+                    'name': element.get_attribute('name') or '',
+                    'text': element.text[:100] if element.text else '',
+                    'href': element.get_attribute('href') if element.tag_name == 'a' else '',
+                    'xpath': self._get_element_xpath(element),
+                    'css_selector': self._get_css_selector(element)
+                }
+                interactive_elements.append(element_info)
+            except:
+                continue
+        
+        return interactive_elements
+    
     def _get_element_xpath(self, element):
         """Generate XPath for a Selenium element"""
         try:
@@ -172,304 +401,477 @@ class DOMExtractorAgent:
         except:
             return ""
     
-    def _generate_xpath(self, soup_element):
-        """Generate XPath for a BeautifulSoup element"""
-        components = []
-        child = soup_element if soup_element.name else soup_element.parent
+    @timed_phase('measure_elements')
+    def measure_elements(self, elements, remeasure=False):
+        """Tag elements with 'geometry' and 'actionable' in one in-page pass
         
-        for parent in child.parents:
-            siblings = parent.find_all(child.name, recursive=False)
-            components.append(
-                child.name if len(siblings) == 1 
-                else f"{child.name}[{siblings.index(child) + 1}]"
-            )
-            child = parent
+        Elements measured during extraction are not measured again unless
+        remeasure is set. With actionable_only the non-actionable elements are
+        dropped; elements that could not be found on the page are kept.
+        """
+        pending = [elem for elem in elements if remeasure or 'actionable' not in elem]
+        if pending:
+            try:
+                targets = [[elem.get('context'), elem['xpath'], elem['css_selector']] for elem in pending]
+                measured = json.loads(self.driver.execute_script(MEASURE_ELEMENTS, targets))
+            except Exception as e:
+                print(f"✗ Error measuring elements: {e}")
+                measured = [None] * len(pending)
+            for elem, measurement in zip(pending, measured):
+                elem['geometry'] = measurement['geometry'] if measurement else None
+                elem['actionable'] = measurement['actionable'] if measurement else None
         
-        components.reverse()
-        return '/' + '/'.join(components) if components else ''
+        hidden = sum(1 for elem in elements if elem['actionable'] is False)
+        self.metrics.count('elements_not_actionable', hidden)
+        if self.actionable_only:
+            print(f"✓ Dropped {hidden} non-actionable elements")
+            return [elem for elem in elements if elem['actionable'] is not False]
+        print(f"✓ Measured elements ({hidden} not actionable)")
+        return elements
     
-    def generate_raw_script(self, elements, framework='all'):
-        """Generate framework-agnostic raw scripts that can be used with any automation framework"""
-        
-        scripts = {}
+    @timed_phase('validate_locators')
+    def validate_locators(self, elements, quiet=False):
+        """Count matches for every candidate locator in one in-page evaluation and rank them
         
-        # Generate raw element data script (framework-agnostic)
-        scripts['raw_elements'] = self._generate_raw_elements_script(elements)
+        Each element gets 'locator_matches' and a 'preferred_locator' that matches
+        exactly one element, which the script generators use when present.
+        quiet skips the summary line, e.g. for the batches of a harvest.
+        """
+        try:
+            candidates = [locator_candidates(elem) for elem in elements]
+            contexts = [elem.get('context') for elem in elements]
+            counts = json.loads(self.driver.execute_script(
+                VALIDATE_LOCATORS, candidates, contexts if any(contexts) else None
+            ))
+        except Exception as e:
+            print(f"✗ Error validating locators: {e}")
+            return elements
         
-        # Generate framework-specific scripts
-        if framework in ['all', 'selenium']:
-            scripts['selenium'] = self._generate_selenium_script(elements)
+        rank_locators(elements, candidates, counts)
+        ambiguous = sum(1 for elem in elements if not elem['preferred_locator'])
+        if not quiet:
+            print(f"✓ Validated locators ({ambiguous} elements without a unique locator)")
+        return elements
+    
+    @timed_phase('find_components')
+    def find_components(self, elements):
+        """Tag elements with the subtrees around them in one in-page pass
         
-        if framework in ['all', 'playwright']:
-            scripts['playwright'] = self._generate_playwright_script(elements)
+        'subtrees' lists the [xpath, tag, hash] of every ancestor below the
+        body, outermost first, with a hash of the whole subtree (see
+        page_scripts.FIND_COMPONENTS). The ComponentIndex splits out the ones
+        seen on several pages.
+        """
+        try:
+            targets = [[elem.get('context'), elem['xpath'], elem['css_selector']] for elem in elements]
+            found = json.loads(self.driver.execute_script(FIND_COMPONENTS, targets))
+            chains = [[found['subtrees'][index] for index in chain] for chain in found['chains']]
+        except Exception as e:
+            print(f"✗ Error finding components: {e}")
+            chains = [[] for _ in elements]
+        for elem, subtrees in zip(elements, chains):
+            elem['subtrees'] = subtrees
+        return elements
+    
+    def _xpath_components(self, parent, subtree_keys):
+        """Return (child, XPath step) for each child tag, computing sibling positions once"""
+        from bs4 import Tag
         
-        if framework in ['all', 'puppeteer']:
-            scripts['puppeteer'] = self._generate_puppeteer_script(elements)
+        children = [child for child in parent.contents if isinstance(child, Tag)]
         
-        if framework in ['all', 'cypress']:
-            scripts['cypress'] = self._generate_cypress_script(elements)
+        counts = {}
+        for child in children:
+            counts[child.name] = counts.get(child.name, 0) + 1
         
-        if framework in ['all', 'robot']:
-            scripts['robot_framework'] = self._generate_robot_framework_script(elements)
+        components = []
+        positions = {}
+        seen = {}
+        for child in children:
+            position = positions[child.name] = positions.get(child.name, 0) + 1
+            if counts[child.name] == 1:
+                components.append((child, child.name))
+                continue
+            
+            # XPaths were first built with list.index(), which returns the first sibling
+            # that compares equal, so structurally identical siblings share a position
+            key = (child.name, self._subtree_key(child, subtree_keys))
+            for candidate, candidate_position in seen.get(key, ()):
+                if candidate == child:
+                    position = candidate_position
+                    break
+            else:
+                seen.setdefault(key, []).append((child, position))
+            components.append((child, f"{child.name}[{position}]"))
         
-        return scripts
+        return components
     
-    def _generate_raw_elements_script(self, elements):
-        """Generate raw element locators in a framework-agnostic format"""
-        script = []
-        script.append("# RAW ELEMENT LOCATORS - Framework Agnostic")
-        script.append("# ==========================================")
-        script.append("# Use these locators with any automation framework\n")
-        script.append(f"# URL: {self.driver.current_url}")
-        script.append(f"# Page Title: {self.driver.title}\n")
+    def _generate_texts(self, soup, limit=100):
+        """Compute get_text(strip=True)[:limit] for every tag bottom-up, keyed by id(tag)
         
-        script.append("# ELEMENT LOCATORS")
-        script.append("# ================\n")
+        Each subtree is visited once and only a limit-sized prefix is kept per node,
+        instead of calling get_text() per tag, which re-walks the subtree every time.
+        """
+        from bs4 import Tag
         
-        for i, elem in enumerate(elements, 1):
-            script.append(f"# Element {i}: {elem['type'].upper()}")
-            script.append(f"# Description: {elem['text'][:80] if elem['text'] else 'No text'}")
-            script.append(f"# Tag: {elem['tag']}")
-            
-            # Provide all possible locator strategies
-            if elem['id']:
-                script.append(f"ID = '{elem['id']}'")
-            if elem['name']:
-                script.append(f"NAME = '{elem['name']}'")
-            if elem['class']:
-                script.append(f"CLASS = '{elem['class']}'")
-            if elem['xpath']:
-                script.append(f"XPATH = '{elem['xpath']}'")
-            if elem['css_selector']:
-                script.append(f"CSS = '{elem['css_selector']}'")
-            if elem['href']:
-                script.append(f"HREF = '{elem['href']}'")
-            
-            script.append("")
-        
-        return '\n'.join(script)
-    
-    def _generate_selenium_script(self, elements):
-        """Generate Selenium-specific script"""
-        script = []
-        script.append("# SELENIUM AUTOMATION SCRIPT")
-        script.append("# ==========================\n")
-        script.append("from selenium import webdriver")
-        script.append("from selenium.webdriver.common.by import By")
-        script.append("from selenium.webdriver.support.ui import WebDriverWait")
-        script.append("from selenium.webdriver.support import expected_conditions as EC")
-        script.append("from selenium.webdriver.common.keys import Keys\n")
-        script.append("# Setup")
-        script.append("driver = webdriver.Chrome()")
-        script.append(f"driver.get('{self.driver.current_url}')\n")
-        
-        for i, elem in enumerate(elements[:15], 1):
-            script.append(f"# {elem['type'].upper()}: {elem['text'][:50]}")
-            
-            if elem['id']:
-                locator = f"driver.find_element(By.ID, '{elem['id']}')"
-            elif elem['name']:
-                locator = f"driver.find_element(By.NAME, '{elem['name']}')"
-            elif elem['xpath']:
-                locator = f"driver.find_element(By.XPATH, '{elem['xpath']}')"
-            else:
-                locator = f"driver.find_element(By.CSS_SELECTOR, '{elem['css_selector']}')"
-            
-            if elem['type'] in ['buttons', 'links']:
-                script.append(f"# {locator}.click()")
-            elif elem['type'] == 'inputs':
-                script.append(f"# {locator}.send_keys('your_value')")
-            
-            script.append("")
-        
-        script.append("# driver.quit()")
-        return '\n'.join(script)
-    
-    def _generate_playwright_script(self, elements):
-        """Generate Playwright-specific script"""
-        script = []
-        script.append("# PLAYWRIGHT AUTOMATION SCRIPT")
-        script.append("# ============================\n")
-        script.append("from playwright.sync_api import sync_playwright\n")
-        script.append("with sync_playwright() as p:")
-        script.append("    browser = p.chromium.launch()")
-        script.append("    page = browser.new_page()")
-        script.append(f"    page.goto('{self.driver.current_url}')\n")
-        
-        for i, elem in enumerate(elements[:15], 1):
-            script.append(f"    # {elem['type'].upper()}: {elem['text'][:50]}")
-            
-            if elem['id']:
-                locator = f"page.locator('#{elem['id']}')"
-            elif elem['xpath']:
-                locator = f"page.locator('xpath={elem['xpath']}')"
-            elif elem['css_selector']:
-                locator = f"page.locator('{elem['css_selector']}')"
-            else:
-                locator = f"page.locator('text={elem['text'][:30]}')"
-            
-            if elem['type'] in ['buttons', 'links']:
-                script.append(f"    # {locator}.click()")
-            elif elem['type'] == 'inputs':
-                script.append(f"    # {locator}.fill('your_value')")
-            
-            script.append("")
-        
-        script.append("    # browser.close()")
-        return '\n'.join(script)
-    
-    def _generate_puppeteer_script(self, elements):
-        """Generate Puppeteer-specific script"""
-        script = []
-        script.append("// PUPPETEER AUTOMATION SCRIPT")
-        script.append("// ============================\n")
-        script.append("const puppeteer = require('puppeteer');\n")
-        script.append("(async () => {")
-        script.append("  const browser = await puppeteer.launch();")
-        script.append("  const page = await browser.newPage();")
-        script.append(f"  await page.goto('{self.driver.current_url}');\n")
-        
-        for i, elem in enumerate(elements[:15], 1):
-            script.append(f"  // {elem['type'].upper()}: {elem['text'][:50]}")
+        order = []
+        type_sets = []
+        node_types = {}
+        stack = [soup]
+        
+        # get_text() only joins strings whose exact type is one of the tag's
+        # interesting string types (e.g. <script> keeps Script strings)
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            types = node.interesting_string_types
+            if types is None:
+                types = node.MAIN_CONTENT_STRING_TYPES
+            types = frozenset([types]) if isinstance(types, type) else frozenset(types)
+            if types not in type_sets:
+                type_sets.append(types)
+            node_types[id(node)] = type_sets.index(types)
+            stack.extend(child for child in node.contents if isinstance(child, Tag))
+        
+        texts = {}
+        prefixes = {}
+        for node in reversed(order):
+            node_prefixes = []
+            for index, types in enumerate(type_sets):
+                parts = []
+                length = 0
+                for child in node.contents:
+                    if isinstance(child, Tag):
+                        piece = prefixes[id(child)][index]
+                    elif type(child) in types:
+                        piece = child.strip()
+                    else:
+                        continue
+                    if piece:
+                        parts.append(piece)
+                        length += len(piece)
+                        if length >= limit:
+                            break
+                node_prefixes.append(''.join(parts)[:limit])
             
-            if elem['id']:
-                selector = f"'#{elem['id']}'"
-            elif elem['xpath']:
-                selector = f"'xpath/{elem['xpath']}'"
-            elif elem['css_selector']:
-                selector = f"'{elem['css_selector']}'"
-            else:
+            for child in node.contents:
+                if isinstance(child, Tag):
+                    del prefixes[id(child)]
+            prefixes[id(node)] = node_prefixes
+            texts[id(node)] = node_prefixes[node_types[id(node)]]
+        
+        return texts
+    
+    def _subtree_key(self, element, keys):
+        """Hash a subtree so that tags comparing equal with == get the same key"""
+        from bs4 import Tag
+        
+        stack = [(element, False)]
+        
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in keys:
                 continue
-            
-            if elem['type'] in ['buttons', 'links']:
-                script.append(f"  // await page.click({selector});")
-            elif elem['type'] == 'inputs':
-                script.append(f"  // await page.type({selector}, 'your_value');")
-            
-            script.append("")
-        
-        script.append("  // await browser.close();")
-        script.append("})();")
-        return '\n'.join(script)
-    
-    def _generate_cypress_script(self, elements):
-        """Generate Cypress-specific script"""
-        script = []
-        script.append("// CYPRESS AUTOMATION SCRIPT")
-        script.append("// =========================\n")
-        script.append("describe('Automated Test', () => {")
-        script.append("  it('should perform actions', () => {")
-        script.append(f"    cy.visit('{self.driver.current_url}');\n")
-        
-        for i, elem in enumerate(elements[:15], 1):
-            script.append(f"    // {elem['type'].upper()}: {elem['text'][:50]}")
-            
-            if elem['id']:
-                selector = f"'#{elem['id']}'"
-            elif elem['xpath']:
-                selector = f"'xpath={elem['xpath']}'"  # Note: Cypress needs xpath plugin
-            elif elem['css_selector']:
-                selector = f"'{elem['css_selector']}'"
-            else:
+            children = [child for child in node.contents if isinstance(child, Tag)]
+            if not expanded and children:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children if id(child) not in keys)
                 continue
             
-            if elem['type'] in ['buttons', 'links']:
-                script.append(f"    // cy.get({selector}).click();")
-            elif elem['type'] == 'inputs':
-                script.append(f"    // cy.get({selector}).type('your_value');")
-            
-            script.append("")
-        
-        script.append("  });")
-        script.append("});")
-        return '\n'.join(script)
-    
-    def _generate_robot_framework_script(self, elements):
-        """Generate Robot Framework-specific script"""
-        script = []
-        script.append("# ROBOT FRAMEWORK AUTOMATION SCRIPT")
-        script.append("# ==================================\n")
-        script.append("*** Settings ***")
-        script.append("Library    SeleniumLibrary\n")
-        script.append("*** Variables ***")
-        script.append(f"${{URL}}    {self.driver.current_url}\n")
-        
-        # Add element locators as variables
-        for i, elem in enumerate(elements[:15], 1):
-            if elem['id']:
-                script.append(f"${{ELEMENT_{i}}}    id:{elem['id']}")
-            elif elem['xpath']:
-                script.append(f"${{ELEMENT_{i}}}    xpath:{elem['xpath']}")
-        
-        script.append("\n*** Test Cases ***")
-        script.append("Automated Test Scenario")
-        script.append("    Open Browser    ${URL}    chrome")
-        
-        for i, elem in enumerate(elements[:15], 1):
-            if elem['id'] or elem['xpath']:
-                script.append(f"    # {elem['type'].upper()}: {elem['text'][:50]}")
-                if elem['type'] in ['buttons', 'links']:
-                    script.append(f"    # Click Element    ${{ELEMENT_{i}}}")
-                elif elem['type'] == 'inputs':
-                    script.append(f"    # Input Text    ${{ELEMENT_{i}}}    your_value")
-        
-        script.append("    # Close Browser")
-        return '\n'.join(script)
-    
-    def save_results(self, elements, output_format='json'):
-        """Save extracted elements and generate scripts for all frameworks"""
+            attrs = tuple(sorted(
+                (name, tuple(value) if isinstance(value, list) else value)
+                for name, value in node.attrs.items()
+            ))
+            contents = tuple(
+                keys[id(child)] if isinstance(child, Tag) else str(child)
+                for child in node.contents
+            )
+            keys[id(node)] = hash((node.name, attrs, contents))
+        
+        return keys[id(element)]
+    
+    @timed_phase('generate_raw_script')
+    def generate_raw_script(self, elements, framework='all', url=None, title=None):
+        """Generate framework-agnostic raw scripts that can be used with any automation framework
+        
+        Returns a dict of emitter name to script text; url and title default to the current page.
+        """
+        return generate_script_texts(
+            elements,
+            framework,
+            self.current_url if url is None else url,
+            self.title if title is None else title,
+            self.script_limit
+        )
+    
+    @timed_phase('save_results')
+    def save_results(self, elements, output_format=None, output_dir='output', label=None, scripts=None,
+                     compression=None):
+        """Save extracted elements and generate scripts for all frameworks
+        
+        elements may be a list or any iterator (e.g. iter_all_elements); it is
+        consumed once while the element data and every script are written.
+        output_format and compression default to the agent's settings; the
+        manifest entry of the data file is kept in last_data. With a
+        ComponentIndex, the elements of shared components in a list are
+        saved once per run instead, and referenced in last_components.
+        """
+        output_format = output_format or self.output_format
+        compression = compression or self.compression
         timestamp = time.strftime("%Y%m%d_%H%M%S")
+        if label:
+            # Keep file names unique when several pages are saved in the same second
+            timestamp = f"{timestamp}_{label}"
         saved_files = []
+        data_file, script_files = self.output_paths(output_dir, timestamp, output_format, compression)
 
-        # Create organized folder structure
-        output_base = Path("output")
-        folders = {
-            'json_data': output_base / 'json_data',
-            'raw_elements': output_base / 'raw_elements',
-            'selenium': output_base / 'selenium',
-            'playwright': output_base / 'playwright',
-            'puppeteer': output_base / 'puppeteer',
-            'cypress': output_base / 'cypress',
-            'robot_framework': output_base / 'robot_framework'
-        }
+        self.last_components = []
+        if self.components is not None and isinstance(elements, list):
+            elements, self.last_components = self.components.save(self, elements, output_dir)
+            # Scripts generated for the whole page would repeat the components
+            scripts = None
+            shared = sum(reference['element_count'] for reference in self.last_components)
+            print(f"✓ {shared} elements in {len(self.last_components)} shared components")
+
+        if scripts is None:
+            print("\n→ Generating framework-specific scripts...")
+            self.last_data = self._write_outputs(
+                elements, data_file, output_format, compression, script_files, components=self.last_components
+            )
+        else:
+            writer = element_writer(data_file, output_format, compression)
+            writer.write_all(elements)
+            self.last_data = writer.close()
+            print("\n→ Writing framework-specific scripts...")
+            for name, script_content in scripts.items():
+                if name in script_files:
+                    with open(script_files[name], 'w', encoding='utf-8') as f:
+                        f.write(script_content)
+            script_files = {name: path for name, path in script_files.items() if name in scripts}
+
+        print(f"✓ Elements saved to: {data_file}")
+        saved_files.append(str(data_file))
+
+        for name, filepath in script_files.items():
+            print(f"  ✓ {name.upper()}: {filepath}")
+            saved_files.append(str(filepath))
+
+        self.metrics.count('files_written', len(saved_files))
+        self.metrics.count('bytes_written', sum(os.path.getsize(path) for path in saved_files))
+        return saved_files
+    
+    def output_paths(self, output_dir, timestamp, output_format=None, compression=None):
+        """Data file and script file per emitter for a timestamp, creating their folders"""
+        # Create organized folder structure, one folder per registered emitter
+        output_base = Path(output_dir)
+        folders = {'json_data': output_base / 'json_data'}
+        for name, emitter_class in EMITTERS.items():
+            folders[name] = output_base / emitter_class.folder
 
         # Create all folders
         for folder in folders.values():
             folder.mkdir(parents=True, exist_ok=True)
 
-        # Save JSON data
-        if output_format == 'json':
-            filename = folders['json_data'] / f"dom_elements_{timestamp}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(elements, f, indent=2, ensure_ascii=False)
-            print(f"\n✓ Elements saved to: {filename}")
-            saved_files.append(str(filename))
-
-        # Generate scripts for all frameworks
-        print("\n→ Generating framework-specific scripts...")
-        scripts = self.generate_raw_script(elements, framework='all')
-
-        # Save each framework script in its respective folder
-        framework_mapping = {
-            'raw_elements': (folders['raw_elements'], f"raw_elements_{timestamp}.txt"),
-            'selenium': (folders['selenium'], f"selenium_script_{timestamp}.py"),
-            'playwright': (folders['playwright'], f"playwright_script_{timestamp}.py"),
-            'puppeteer': (folders['puppeteer'], f"puppeteer_script_{timestamp}.js"),
-            'cypress': (folders['cypress'], f"cypress_script_{timestamp}.js"),
-            'robot_framework': (folders['robot_framework'], f"robot_framework_script_{timestamp}.robot")
+        data_file = folders['json_data'] / data_filename(
+            timestamp, output_format or self.output_format, compression or self.compression
+        )
+        script_files = {
+            name: folders[name] / emitter_class.filename.format(timestamp=timestamp)
+            for name, emitter_class in EMITTERS.items()
         }
-
-        for framework_name, script_content in scripts.items():
-            if framework_name in framework_mapping:
-                folder, filename = framework_mapping[framework_name]
-                filepath = folder / filename
-
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(script_content)
-                print(f"  ✓ {framework_name.upper()}: {filepath}")
-                saved_files.append(str(filepath))
-
-        return saved_files
+        return data_file, script_files
+    
+    def _write_outputs(self, elements, data_file, output_format, compression, script_files, url=None, title=None,
+                       components=None):
+        """Write the element data and every script in a single pass over the elements
+        
+        url and title default to the current page; components are the
+        references to the shared components the scripts point to.
+        """
+        # Opened first, so a missing optional dependency fails before any file is created
+        writer = element_writer(data_file, output_format, compression)
+        with ExitStack() as stack:
+            outputs = {
+                EMITTERS[name](): stack.enter_context(open(path, 'w', encoding='utf-8'))
+                for name, path in script_files.items()
+            }
+            
+            if isinstance(elements, (list, tuple)):
+                # Already in memory, and plain JSON is much faster written in one go
+                writer.write_all(elements)
+                observe = None
+            else:
+                # An iterator is written out as it is consumed, so it is never held in memory
+                observe = writer.write
+            
+            generate_scripts(
+                elements, outputs,
+                self.current_url if url is None else url,
+                self.title if title is None else title,
+                self.script_limit, observe, components
+            )
+            return writer.close()
+    
+    @timed_phase('process_url')
+    def process_url(self, url, output_dir='output', label=None, incremental=False):
+        """Navigate to a URL, extract interactive elements and save all outputs"""
+        if not self.navigate_to_url(url):
+            return None
+        
+        if self.harvest is not None:
+            return self._harvest_url(output_dir, label)
+        
+        return self.save_capture(self.capture_page(output_dir, label, incremental), output_dir, label)
+    
+    def capture_page(self, output_dir='output', label=None, incremental=False):
+        """Extract the interactive elements of the loaded page, everything that needs the browser
+        
+        Returns the capture save_capture writes out: the page URL, title and
+        elements, or the cache entry serving them.
+        """
+        extract = self.extract_interactive_elements
+        page_source = None
+        if incremental:
+            # Diff the page source against the previous snapshot in output/json_data
+            from .incremental import extract_incremental
+            
+            page_source = self.driver.page_source
+            page_url = self.current_url
+            extract = lambda: extract_incremental(page_source, page_url, output_dir, label, self.rules)
+        
+        if self.geometry:
+            # Before validation, so dropped elements are never validated
+            extract_unmeasured = extract
+            extract = lambda: self.measure_elements(extract_unmeasured(), remeasure=incremental)
+        
+        if self.validate:
+            extract_elements = extract
+            extract = lambda: self.validate_locators(extract_elements())
+        
+        if self.components is not None:
+            extract_ungrouped = extract
+            extract = lambda: self.find_components(extract_ungrouped())
+        
+        elements, key, entry = self.extract_cached(extract, page_source)
+        return {
+            'url': self.current_url,
+            'title': self.title,
+            'ready_seconds': round(self.last_ready_time, 3),
+            'elements': elements,
+            'cache_key': key,
+            'cache_entry': entry
+        }
+    
+    def save_capture(self, capture, output_dir='output', label=None):
+        """Save a page returned by capture_page and return its result
+        
+        Only the capture is used, so an agent without a browser can save the
+        page while the one that captured it loads the next.
+        """
+        self.page_url = capture['url']
+        self.page_title = capture['title']
+        interactive_elements = capture['elements']
+        saved_files, cached = self.save_extracted(
+            interactive_elements, capture['cache_key'], capture['cache_entry'], output_dir, label
+        )
+        print(f"✓ Found {len(interactive_elements)} interactive elements")
+        
+        result = {
+            'url': capture['url'],
+            'title': capture['title'],
+            'element_count': len(interactive_elements),
+            'files': saved_files,
+            'cached': cached,
+            'data': self.last_data,
+            'ready_seconds': capture['ready_seconds']
+        }
+        if self.components is not None:
+            result['components'] = self.last_components
+        return result
+    
+    def _harvest_url(self, output_dir, label):
+        """Scroll through the loaded page, streaming the harvested elements to disk
+        
+        The page keeps changing while it is scrolled, so the cache and
+        incremental snapshots do not apply.
+        """
+        from .harvest import harvest_elements
+        
+        stats = {}
+        saved_files = self.save_results(
+            harvest_elements(self, self.harvest, stats), output_dir=output_dir, label=label
+        )
+        print(f"✓ Harvested {stats['elements']} interactive elements in {stats['steps']} scroll steps "
+              f"({stats['duplicates']} duplicates, stopped on {stats['stop_reason']})")
+        
+        result = {
+            'url': self.current_url,
+            'title': self.title,
+            'element_count': stats['elements'],
+            'files': saved_files,
+            'cached': False,
+            'data': self.last_data,
+            'ready_seconds': round(self.last_ready_time, 3),
+            'harvest': stats
+        }
+        if self.components is not None:
+            # Streamed elements are not grouped into components
+            result['components'] = self.last_components
+        return result
+    
+    def extract_and_save(self, extract, page_source=None, output_dir='output', label=None):
+        """Run extract() and save the results, serving unchanged pages from the cache
+        
+        Returns (elements, saved_files, cached).
+        """
+        elements, key, entry = self.extract_cached(extract, page_source)
+        files, cached = self.save_extracted(elements, key, entry, output_dir, label)
+        return elements, files, cached
+    
+    def extract_cached(self, extract, page_source=None):
+        """Run extract(), unless the cache holds the page
+        
+        Returns (elements, key, entry): the cache key, None without a cache,
+        and the cache entry the elements came from, None when extracted.
+        """
+        if self.cache is None:
+            return extract(), None, None
+        
+        if page_source is None:
+            page_source = self.driver.page_source
+        key = self.cache.key(
+            self.current_url, page_source, variant=(f"validate={self.validate};limit={self.script_limit};"
+                     f"format={self.output_format};compression={self.compression};"
+                     f"rules={json.dumps(self.rules, sort_keys=True)};"
+                     f"extractor={getattr(self.extractor, '__name__', None)};pierce={self.pierce};"
+                     f"geometry={self.geometry};actionable_only={self.actionable_only};"
+                     f"components={self.components is not None}")
+        )
+        entry = self.cache.get(key)
+        if entry is not None:
+            print("✓ Page unchanged since the last run, using cached results")
+            return entry['elements'], key, entry
+        return extract(), key, None
+    
+    def save_extracted(self, elements, key=None, entry=None, output_dir='output', label=None):
+        """Save the results of extract_cached and update the cache; returns (saved_files, cached)"""
+        if entry is not None:
+            files = entry['files']
+            # Component references are not cached, so those pages are saved again
+            if (files and entry.get('output_dir') == str(output_dir) and self.components is None
+                    and all(os.path.exists(path) for path in files)):
+                # Outputs from the last run are still on disk
+                self.last_data = entry.get('data')
+                return files, True
+            
+            files = self.save_results(elements, output_dir=output_dir, label=label, scripts=entry['scripts'])
+            self.cache.put(key, self.current_url, elements, entry['scripts'], files, output_dir, self.last_data)
+            return files, True
+        
+        scripts = self.generate_raw_script(elements, framework='all') if key and self.components is None else None
+        files = self.save_results(elements, output_dir=output_dir, label=label, scripts=scripts)
+        if key:
+            self.cache.put(key, self.current_url, elements, scripts, files, output_dir, self.last_data)
+        return files, False
     
     def print_summary(self, elements):
         """Print a summary of extracted elements"""
@@ -515,11 +917,25 @@ class DOMExtractorAgent:
             interactive_elements = self.extract_interactive_elements()
             print(f"✓ Found {len(interactive_elements)} interactive elements")
             
+            if self.geometry:
+                interactive_elements = self.measure_elements(interactive_elements)
+            
+            if self.validate:
+                self.validate_locators(interactive_elements)
+            
             # Print summary
             self.print_summary(interactive_elements)
             
             # Save results and generate all framework scripts
             saved_files = self.save_results(interactive_elements)
+            manifest_file = write_manifest('output', [{
+                'url': self.current_url,
+                'title': self.title,
+                'element_count': len(interactive_elements),
+                'data': self.last_data,
+                'files': saved_files
+            }])
+            print(f"✓ Manifest saved to: {manifest_file}")
             
             # Show sample of extracted elements
             print("\nSample of extracted elements (first 5):")
@@ -538,6 +954,8 @@ class DOMExtractorAgent:
             
         except KeyboardInterrupt:
             print("\n\n✗ Operation cancelled by user")
+        except WebDriverSetupError:
+            raise
         except Exception as e:
             print(f"\n✗ An error occurred: {e}")
         finally:
@@ -545,15 +963,360 @@ class DOMExtractorAgent:
     
     def cleanup(self):
         """Cleanup resources"""
-        if self.driver:
-            self.driver.quit()
+        self._closed = True
+        driver, self._driver = self._driver, None
+        if driver:
+            driver.quit()
             print("\n✓ WebDriver closed")
 
 
-def main():
+def add_pipeline_arguments(parser):
+    """Add the options shared by the non-interactive commands"""
+    parser.add_argument('--incremental', action='store_true',
+                        help='Diff each page against its previous snapshot and write a change report')
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help='Skip checking that generated locators match exactly one element')
+    parser.add_argument('--extra-roles', action='store_true',
+                        help='Also extract ARIA widgets, focusable (tabindex) and contenteditable elements')
+    parser.add_argument('--role', action='append', default=[], type=parse_role, metavar='NAME=XPATH',
+                        help="Extra role rule, e.g. --role \"menus=@aria-haspopup='true'\" (repeatable)")
+    parser.add_argument('--geometry', action='store_true',
+                        help="Tag elements with their geometry and an 'actionable' flag")
+    parser.add_argument('--actionable-only', action='store_true',
+                        help='Drop hidden, zero-size, off-page and disabled elements before saving')
+    parser.add_argument('--components', action='store_true',
+                        help='Save headers, navigation, footers and widgets repeated across pages once '
+                             'and refer to them from every page')
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='json',
+                        help='Element data format; msgpack and parquet need optional packages (default: json)')
+    parser.add_argument('--compress', dest='compression', choices=COMPRESSIONS, default=None,
+                        help='Compress the element data; zstd needs the zstandard package')
+    parser.add_argument('--script-limit', type=int, default=SCRIPT_ELEMENT_LIMIT,
+                        help=f'Elements per framework script, 0 for all (default: {SCRIPT_ELEMENT_LIMIT})')
+    add_run_arguments(parser)
+    add_cache_arguments(parser)
+
+
+def add_run_arguments(parser):
+    """Add the metrics and profiling options every non-interactive command has"""
+    parser.add_argument('--metrics', default=None, metavar='PATH',
+                        help='Save per-phase timings, WebDriver command counts, bytes written and peak memory')
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS, default=None,
+                        help='Metrics file format (default: prometheus for .prom files, json otherwise)')
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help='Profile the whole run and save the result to PATH')
+    parser.add_argument('--profiler', choices=PROFILERS, default='cprofile',
+                        help='cprofile writes pstats data, sampling writes collapsed stacks (default: cprofile)')
+
+
+def add_browser_arguments(parser):
+    """Add the options of the commands that extract with a pool of browsers"""
+    add_loading_arguments(parser)
+    parser.add_argument('--engine', choices=EXTRACTION_ENGINES, default='script',
+                        help='script runs the extraction inside the page, snapshot decodes one CDP '
+                             'DOMSnapshot per page (default: script)')
+    parser.add_argument('--harvest', action='store_true',
+                        help='Scroll infinite and virtualized lists, extracting rows as they appear')
+    parser.add_argument('--harvest-max-elements', type=int, default=None,
+                        help='Stop harvesting after this many elements per page')
+    parser.add_argument('--harvest-seconds', type=float, default=None,
+                        help='Stop harvesting a page after this many seconds (default: the --timeout)')
+    parser.add_argument('--harvest-memory-mb', type=float, default=None,
+                        help='Stop harvesting once this process uses this much resident memory')
+    parser.add_argument('--scroll-target', default=None,
+                        help='CSS selector of the scrolling container (default: detected)')
+
+
+def add_loading_arguments(parser):
+    """Add the options of the commands that load pages in a pool of browsers"""
+    parser.add_argument('--workers', type=int, default=4, help='Number of browsers in the pool (default: 4)')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-URL timeout in seconds (default: 60)')
+    parser.add_argument('--retries', type=int, default=2, help='Retries per URL after a failure (default: 2)')
+    parser.add_argument('--recycle-after', type=int, default=0,
+                        help='Replace each browser after this many URLs (default: 0, never)')
+    parser.add_argument('--output-dir', default='output', help='Directory for generated files (default: output)')
+    parser.add_argument('--wait', choices=READY_STRATEGIES, default='body',
+                        help='How to decide a page is ready to extract (default: body)')
+    parser.add_argument('--wait-timeout', type=float, default=10,
+                        help='Upper bound in seconds for the readiness wait (default: 10)')
+    parser.add_argument('--quiet-ms', type=int, default=500,
+                        help='Quiet period for dom-quiet and network-idle in ms (default: 500)')
+    parser.add_argument('--fast-load', action='store_true',
+                        help='Block images, media, fonts and trackers and return at DOMContentLoaded')
+    parser.add_argument('--block', action='append', choices=sorted(RESOURCE_TYPE_EXTENSIONS),
+                        help='Resource type to block with --fast-load (repeatable, default: image, media, font)')
+    parser.add_argument('--block-url', action='append', default=[],
+                        help='Extra URL pattern to block with --fast-load, e.g. *ads.example.com* (repeatable)')
+    parser.add_argument('--allow-css', action='append', default=[],
+                        help='Stylesheet URL pattern that still loads when stylesheets are blocked (repeatable)')
+    parser.add_argument('--pierce', action='store_true',
+                        help='Also extract from open shadow roots and same-origin iframes')
+
+
+def add_cache_arguments(parser):
+    """Add the extraction cache options to a command parser"""
+    parser.add_argument('--cache-dir', default=None,
+                        help='Cache extracted elements and scripts here; unchanged pages are served from it')
+    parser.add_argument('--cache-max-age', type=float, default=7 * 24,
+                        help='Hours an unused cache entry is kept (default: 168)')
+    parser.add_argument('--cache-max-size', type=float, default=1024,
+                        help='Maximum cache size in MB (default: 1024)')
+
+
+def build_cache(args):
+    """Create the ExtractionCache requested on the command line, if any"""
+    if not args.cache_dir:
+        return None
+    from .cache import ExtractionCache
+    return ExtractionCache(args.cache_dir, max_size_mb=args.cache_max_size, max_age_hours=args.cache_max_age)
+
+
+def build_fast_load(args):
+    """Create the FastLoadProfile selected on the command line, or None"""
+    if not args.fast_load:
+        return None
+    return FastLoadProfile(
+        blocked_types=args.block or DEFAULT_BLOCKED_TYPES,
+        blocked_urls=DEFAULT_BLOCKED_URLS + tuple(args.block_url),
+        css_allowlist=args.allow_css
+    )
+
+
+def build_harvest(args):
+    """Create the HarvestProfile selected on the command line, or None"""
+    if not args.harvest:
+        return None
+    from .harvest import HarvestProfile
+    return HarvestProfile(
+        max_elements=args.harvest_max_elements,
+        # The batch watchdog stops a page after twice the timeout, leave room to save
+        max_seconds=args.harvest_seconds if args.harvest_seconds is not None else args.timeout,
+        max_memory_mb=args.harvest_memory_mb,
+        quiet_ms=args.quiet_ms,
+        scroll_target=args.scroll_target
+    )
+
+
+def build_components(args):
+    """Create the ComponentIndex shared by the agents of a run, or None"""
+    if not args.components:
+        return None
+    from .components import ComponentIndex
+    return ComponentIndex()
+
+
+def build_extractor(engine):
+    """Extractor backend for an --engine choice, None for the in-page script"""
+    if engine == 'snapshot':
+        from .dom_snapshot import extract_with_dom_snapshot
+        return extract_with_dom_snapshot
+    return None
+
+
+def build_arg_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        prog='raw-locator-generator',
+        description='Extract DOM elements and generate scripts for multiple automation frameworks. '
+                    'Runs the interactive assist mode when no command is given.'
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    
+    batch = subparsers.add_parser('batch', help='Process a list of URLs with a pool of headless browsers')
+    batch.add_argument('source', help="File with one URL per line, or '-' to read from stdin")
+    batch.add_argument('--save-workers', type=int, default=0,
+                       help='Threads generating scripts and writing files while the browsers load the next '
+                            'URLs; 0 saves in the browser workers (default: 0)')
+    batch.add_argument('--save-queue', type=int, default=None,
+                       help='Pages that may wait for a save worker before the browsers pause '
+                            '(default: twice --save-workers)')
+    add_browser_arguments(batch)
+    add_pipeline_arguments(batch)
+    
+    crawl = subparsers.add_parser('crawl', help='Follow same-site links from a seed URL with a pool of browsers')
+    crawl.add_argument('seed', help='URL to start from')
+    crawl.add_argument('--max-depth', type=int, default=3,
+                       help='Links to follow from the seed to reach a page (default: 3)')
+    crawl.add_argument('--max-pages', type=int, default=None,
+                       help='Stop after visiting this many pages in total, including resumed runs')
+    crawl.add_argument('--path-prefix', default=None,
+                       help='Only follow URLs whose path starts with this prefix')
+    crawl.add_argument('--any-origin', dest='same_origin', action='store_false',
+                       help='Follow links to other hosts too')
+    crawl.add_argument('--exclude', action='append', default=[],
+                       help='robots.txt-style path pattern to skip, e.g. /admin or /*?sort=* (repeatable)')
+    crawl.add_argument('--robots', action='store_true', help="Obey the site's robots.txt Disallow rules")
+    crawl.add_argument('--frontier', default=None,
+                       help='SQLite frontier file; reuse it to resume (default: <output-dir>/crawl_frontier.sqlite)')
+    add_browser_arguments(crawl)
+    add_pipeline_arguments(crawl)
+    
+    serve = subparsers.add_parser('serve', help='Serve extractions over local HTTP with a pool of warm browsers')
+    serve.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    serve.add_argument('--socket', default=None, help='Listen on this Unix socket instead of a TCP port')
+    serve.add_argument('--queue-size', type=int, default=16,
+                       help='Requests that may wait for a browser; more are rejected with 503 (default: 16)')
+    add_browser_arguments(serve)
+    add_pipeline_arguments(serve)
+    
+    verify = subparsers.add_parser('verify', help='Check which stored locators still resolve on the live pages')
+    verify.add_argument('sources', nargs='+',
+                        help='Run manifests, output directories or element data files to verify')
+    verify.add_argument('--url', default=None, help='Page of the data files given without a manifest')
+    verify.add_argument('--no-suggest', dest='suggest', action='store_false',
+                        help='Do not re-extract pages to suggest replacements for broken locators')
+    verify.add_argument('--strict', action='store_true',
+                        help='Exit with an error when any stored locator is broken')
+    verify.add_argument('--batch-size', type=int, default=0,
+                        help='Stored elements re-resolved per in-page evaluation, 0 for all of a page at once '
+                             '(default: 0)')
+    add_loading_arguments(verify)
+    add_run_arguments(verify)
+    
+    offline = subparsers.add_parser('offline', help='Process saved HTML files without a browser')
+    offline.add_argument('sources', nargs='+', help="HTML files or directories, or '-' to read one document from stdin")
+    offline.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    offline.add_argument('--base-url', default=None, help='URL used for the generated scripts and to resolve links')
+    offline.add_argument('--output-dir', default='output', help='Directory for generated files (default: output)')
+    add_pipeline_arguments(offline)
+    
+    return parser
+
+
+def main(argv=None):
     """Main entry point"""
+    args = build_arg_parser().parse_args(argv)
+    
+    if args.command in ('batch', 'crawl', 'serve', 'verify', 'offline'):
+        metrics = Metrics() if args.metrics else None
+        # Everything but offline works on pool threads, each profiled on its own
+        threaded = args.command != 'offline'
+        profiler = create_profiler(args.profiler, threaded) if args.profile else None
+        
+        if profiler is not None:
+            results = profile_call(profiler, args.profile, run_command, args, metrics, profiler, threaded=threaded)
+        else:
+            results = run_command(args, metrics)
+        
+        if metrics is not None:
+            metrics.print_summary()
+            print(f"✓ Metrics saved to: {metrics.write(args.metrics, args.metrics_format)}")
+        if any(result['status'] != 'ok' for result in results):
+            sys.exit(1)
+        return
+    
     agent = DOMExtractorAgent()
-    agent.run_assist_mode()
+    try:
+        agent.run_assist_mode()
+    except WebDriverSetupError:
+        sys.exit(1)
+
+
+def run_command(args, metrics=None, profiler=None):
+    """Run a non-interactive command; returns the per-page results"""
+    if args.command == 'verify':
+        from .verify import load_pages, run_verify
+        
+        # Stored elements are only re-resolved, so only page loading is configurable
+        return run_verify(
+            load_pages(args.sources, args.url),
+            workers=args.workers,
+            timeout=args.timeout,
+            retries=args.retries,
+            recycle_after=args.recycle_after or None,
+            output_dir=args.output_dir,
+            suggest=args.suggest,
+            strict=args.strict,
+            batch_size=args.batch_size or None,
+            profiler=profiler,
+            metrics=metrics,
+            readiness=args.wait,
+            ready_timeout=args.wait_timeout,
+            quiet_ms=args.quiet_ms,
+            fast_load=build_fast_load(args),
+            pierce=args.pierce
+        )
+    
+    agent_options = dict(
+        cache=build_cache(args),
+        validate=args.validate,
+        script_limit=args.script_limit or None,
+        output_format=args.output_format,
+        compression=args.compression,
+        rules=role_rules(args.extra_roles, dict(args.role)),
+        metrics=metrics,
+        geometry=args.geometry,
+        actionable_only=args.actionable_only,
+        components=build_components(args)
+    )
+    
+    if args.command in ('batch', 'crawl', 'serve'):
+        engine = args.engine
+        if args.pierce and engine == 'snapshot':
+            print("⚠ --pierce needs the in-page script, ignoring --engine snapshot")
+            engine = 'script'
+        agent_options.update(
+            readiness=args.wait,
+            ready_timeout=args.wait_timeout,
+            quiet_ms=args.quiet_ms,
+            fast_load=build_fast_load(args),
+            extractor=build_extractor(engine),
+            pierce=args.pierce,
+            harvest=build_harvest(args)
+        )
+        pool_options = dict(
+            workers=args.workers,
+            timeout=args.timeout,
+            retries=args.retries,
+            recycle_after=args.recycle_after or None,
+            output_dir=args.output_dir,
+            incremental=args.incremental,
+            profiler=profiler
+        )
+    
+    if args.command == 'batch':
+        from .batch import read_urls, run_batch
+        
+        return run_batch(
+            read_urls(args.source), save_workers=args.save_workers, save_queue=args.save_queue,
+            **pool_options, **agent_options
+        )
+    
+    if args.command == 'crawl':
+        from .crawl import DEFAULT_EXCLUDE, CrawlScope, run_crawl
+        
+        scope = CrawlScope(
+            args.seed,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            same_origin=args.same_origin,
+            path_prefix=args.path_prefix,
+            exclude=DEFAULT_EXCLUDE + tuple(args.exclude),
+            robots=args.robots
+        )
+        return run_crawl(args.seed, args.frontier, scope, **pool_options, **agent_options)
+    
+    if args.command == 'serve':
+        from .service import serve
+        
+        return serve(args.host, args.port, args.socket, args.queue_size, **pool_options, **agent_options)
+    
+    from .offline import run_offline
+    
+    workers = args.workers
+    if profiler is not None and workers != 1:
+        # Worker processes are invisible to the profiler
+        print("→ Profiling processes documents in-process (--workers 1)")
+        workers = 1
+    return run_offline(
+        args.sources,
+        workers=workers,
+        output_dir=args.output_dir,
+        base_url=args.base_url,
+        incremental=args.incremental,
+        **agent_options
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,242 @@
+"""
+DOMSnapshot Engine
+Extract interactive elements from one CDP DOMSnapshot.captureSnapshot call
+
+The snapshot holds the flattened DOM as parallel arrays with every string
+interned once, plus the layout tree. It is decoded into an lxml tree so the
+offline engine's role rules, XPath and CSS generation apply unchanged, while
+text comes from the layout tree, i.e. only from nodes that are rendered.
+With geometry, the layout bounds and styles also give every element the
+geometry and 'actionable' flag MEASURE_ELEMENTS would, without running it.
+"""
+
+from lxml import etree
+
+from .offline import classify_elements, element_record
+
+# Computed styles requested per layout node, in this order
+SNAPSHOT_STYLES = ['visibility', 'opacity', 'pointer-events']
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+DOCUMENT_FRAGMENT_NODE = 11
+
+
+def capture_snapshot(driver, geometry=False):
+    """Run DOMSnapshot.captureSnapshot through Selenium's CDP bridge
+
+    geometry also requests the client rects, which give the viewport size.
+    """
+    return driver.execute_cdp_cmd('DOMSnapshot.captureSnapshot', {
+        'computedStyles': SNAPSHOT_STYLES,
+        'includeDOMRects': geometry
+    })
+
+
+def _make_element(tag, attributes):
+    """Create an lxml element, skipping names lxml does not accept (e.g. Vue's @click)"""
+    try:
+        element = etree.Element(tag)
+    except ValueError:
+        element = etree.Element('unknown')
+    for name, value in attributes:
+        try:
+            element.set(name, value)
+        except ValueError:
+            continue
+    return element
+
+
+class SnapshotDocument:
+    """One decoded document of a DOMSnapshot"""
+
+    def __init__(self, snapshot, index=0):
+        strings = snapshot['strings']
+        document = snapshot['documents'][index]
+        nodes = document['nodes']
+        layout = document['layout']
+
+        def string(i):
+            return strings[i] if i is not None and i >= 0 else ''
+
+        self.string = string
+        self.url = string(document.get('documentURL'))
+        self.base_url = string(document.get('baseURL')) or self.url
+        self.title = string(document.get('title'))
+
+        # Layout nodes are the rendered ones; visibility:hidden text is not part of innerText
+        self.rendered = set()
+        visibility = SNAPSHOT_STYLES.index('visibility')
+        for node_index, styles in zip(layout['nodeIndex'], layout['styles']):
+            if string(styles[visibility] if len(styles) > visibility else -1) not in ('hidden', 'collapse'):
+                self.rendered.add(node_index)
+        self.laid_out = set(layout['nodeIndex'])
+
+        # First layout box of every node, its bounds and styles, for measure
+        self.boxes = {}
+        for box, node_index in enumerate(layout['nodeIndex']):
+            self.boxes.setdefault(node_index, box)
+        self.bounds = layout.get('bounds', [])
+        self.styles = layout['styles']
+        self.client_rects = layout.get('clientRects', [])
+        self.scroll = (document.get('scrollOffsetX', 0), document.get('scrollOffsetY', 0))
+        self.content_size = (document.get('contentWidth', 0), document.get('contentHeight', 0))
+
+        parents = nodes['parentIndex']
+        types = nodes['nodeType']
+        names = nodes['nodeName']
+        values = nodes.get('nodeValue', [])
+        attributes = nodes.get('attributes', [])
+
+        # Build the lxml tree. Nodes come in document order, parents first;
+        # shadow roots, template contents and pseudo elements are not part of it
+        self.elements = {}
+        self.nodes = {}
+        self.children = {}
+        self.text_values = {}
+        self.root = None
+        skipped = set()
+
+        for i, node_type in enumerate(types):
+            parent = parents[i]
+            if parent in skipped:
+                skipped.add(i)
+                continue
+
+            if node_type == ELEMENT_NODE:
+                tag = string(names[i]).lower()
+                if tag.startswith('::'):
+                    skipped.add(i)
+                    continue
+                flat = attributes[i] if i < len(attributes) else []
+                element = _make_element(tag, [
+                    (string(flat[k]), string(flat[k + 1])) for k in range(0, len(flat) - 1, 2)
+                ])
+                if parent in self.elements:
+                    self.elements[parent].append(element)
+                elif self.root is None:
+                    self.root = element
+                else:
+                    skipped.add(i)
+                    continue
+                self.elements[i] = element
+                self.nodes[element] = i
+                self.children.setdefault(parent, []).append(i)
+
+            elif node_type == TEXT_NODE and parent in self.elements:
+                value = string(values[i] if i < len(values) else -1)
+                self.text_values[i] = value
+                self.children.setdefault(parent, []).append(i)
+                parent_element = self.elements[parent]
+                if len(parent_element):
+                    last = parent_element[-1]
+                    last.tail = (last.tail or '') + value
+                else:
+                    parent_element.text = (parent_element.text or '') + value
+
+            elif node_type == DOCUMENT_FRAGMENT_NODE:
+                # Shadow roots and template contents
+                skipped.add(i)
+
+        if self.root is None:
+            self.root = etree.Element('html')
+        if self.root.find('body') is None:
+            self.root.append(etree.Element('body'))
+
+    def text(self, element, limit=100):
+        """Rendered text of an element, empty when it has no layout box like WebElement.text"""
+        node = self.nodes[element]
+        if node not in self.laid_out:
+            return ''
+
+        parts = []
+        length = 0
+        stack = [node]
+        while stack and length <= limit * 2:
+            current = stack.pop()
+            if current in self.text_values:
+                if current in self.rendered:
+                    parts.append(self.text_values[current])
+                    length += len(self.text_values[current])
+                continue
+            stack.extend(reversed(self.children.get(current, ())))
+
+        return ' '.join(''.join(parts).split())[:limit]
+
+    def _style(self, box, name):
+        styles = self.styles[box] if box < len(self.styles) else []
+        position = SNAPSHOT_STYLES.index(name)
+        return self.string(styles[position] if len(styles) > position else -1)
+
+    def viewport(self):
+        """Viewport size: the client rect of the document element, else the content size"""
+        box = self.boxes.get(self.nodes.get(self.root))
+        if box is not None and box < len(self.client_rects) and len(self.client_rects[box]) == 4:
+            return self.client_rects[box][2], self.client_rects[box][3]
+        return self.content_size
+
+    def measure(self, element, viewport):
+        """Geometry and 'actionable' flag of an element, like the in-page measureElement"""
+        box = self.boxes.get(self.nodes[element])
+        x, y, width, height = self.bounds[box] if box is not None and box < len(self.bounds) else (0, 0, 0, 0)
+        view_width, view_height = viewport
+        left, top = x - self.scroll[0], y - self.scroll[1]
+
+        sized = width > 0 and height > 0
+        on_page = (x + width > 0 and y + height > 0
+                   and x < max(self.content_size[0], view_width) and y < max(self.content_size[1], view_height))
+        in_viewport = sized and top + height > 0 and left + width > 0 and top < view_height and left < view_width
+
+        # Opacity is not inherited, so every ancestor with a box has to be opaque
+        visible = box is not None and self._style(box, 'visibility') == 'visible'
+        node = element
+        while visible and node is not None:
+            ancestor_box = self.boxes.get(self.nodes.get(node))
+            if ancestor_box is not None and self._style(ancestor_box, 'opacity') in ('0', '0.0'):
+                visible = False
+            node = node.getparent()
+
+        return {
+            'geometry': {
+                'x': round(x),
+                'y': round(y),
+                'width': round(width),
+                'height': round(height),
+                'in_viewport': in_viewport
+            },
+            'actionable': (sized and on_page and visible and box is not None
+                           and self._style(box, 'pointer-events') != 'none' and element.get('disabled') is None)
+        }
+
+
+def extract_from_snapshot(snapshot, rules=None, index=0, geometry=False):
+    """Decode a captured snapshot into interactive element records
+
+    geometry tags every element with 'geometry' and 'actionable' from the
+    layout, so DOMExtractorAgent.measure_elements has nothing left to measure.
+    """
+    document = SnapshotDocument(snapshot, index)
+    body = document.root.find('body')
+    xpath_cache = {}
+    positions = {}
+    viewport = document.viewport() if geometry else None
+
+    elements = []
+    for element, roles in classify_elements(document.root, rules):
+        record = element_record(
+            element, roles, body, xpath_cache, positions, document.base_url, document.text(element)
+        )
+        if geometry:
+            record.update(document.measure(element, viewport))
+        elements.append(record)
+    return elements
+
+
+def extract_with_dom_snapshot(agent):
+    """Extractor backend for DOMExtractorAgent(extractor=...) using one CDP call per page
+
+    Only the top document is decoded; shadow roots and frames (pierce) need
+    the in-page script. With agent.geometry the layout is measured from the
+    same snapshot.
+    """
+    return extract_from_snapshot(capture_snapshot(agent.driver, agent.geometry), agent.rules, geometry=agent.geometry)
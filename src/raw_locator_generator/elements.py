@@ -0,0 +1,84 @@
+"""
+Compact element records produced by the streaming extraction engine
+"""
+
+
+class DOMElement:
+    """A single DOM element from full-page extraction
+
+    Uses __slots__ and keeps attributes as a tuple of (name, value) pairs so a
+    record costs far less than the dict extract_all_elements builds. Records
+    also answer the keys the script generators read (type, name, class, href,
+    css_selector), so a stream of them can be passed straight to save_results.
+    Elements of shadow roots and frames carry their context hops.
+    """
+
+    __slots__ = ('tag', 'id', 'classes', 'attributes', 'text', 'xpath', 'context')
+
+    element_type = 'elements'
+
+    def __init__(self, tag, id, classes, attributes, text, xpath, context=None):
+        self.tag = tag
+        self.id = id
+        self.classes = classes
+        self.attributes = attributes
+        self.text = text
+        self.xpath = xpath
+        self.context = context
+
+    def get_attribute(self, name, default=''):
+        """Return an attribute value, or default when it is missing"""
+        for key, value in self.attributes:
+            if key == name:
+                return value
+        return default
+
+    @property
+    def css_selector(self):
+        """CSS selector built the same way as the interactive element extractor"""
+        css = self.tag
+        if self.id:
+            css += f"#{self.id}"
+        elif self.classes:
+            css += '.' + '.'.join(self.classes[:2])  # Limit to first 2 classes
+        return css
+
+    def to_dict(self):
+        """Return the dict extract_all_elements produces for this element"""
+        data = {
+            'tag': self.tag,
+            'id': self.id,
+            'classes': self.classes,
+            'attributes': dict(self.attributes),
+            'text': self.text,
+            'xpath': self.xpath
+        }
+        if self.context:
+            data['context'] = self.context
+        return data
+
+    def __getitem__(self, key):
+        if key == 'type':
+            return self.element_type
+        if key == 'class':
+            return ' '.join(self.classes)
+        if key == 'name':
+            return self.get_attribute('name')
+        if key == 'href':
+            return self.get_attribute('href')
+        if key == 'css_selector':
+            return self.css_selector
+        if key == 'attributes':
+            return dict(self.attributes)
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"DOMElement({self.xpath!r})"
@@ -0,0 +1,110 @@
+"""
+Fast-load Browser Profile
+Skip downloads that never affect locator extraction (images, media, fonts,
+trackers) so navigation only waits for the markup and scripts
+"""
+
+# Resource types that can be blocked, as URL patterns for Network.setBlockedURLs
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp'),
+    'media': ('mp4', 'webm', 'ogg', 'ogv', 'mp3', 'wav', 'm4a', 'mov', 'm3u8', 'mpd'),
+    'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'stylesheet': ('css',)
+}
+
+DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+
+# Third-party analytics and ad hosts
+DEFAULT_BLOCKED_URLS = (
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*connect.facebook.net*',
+    '*hotjar.com*',
+    '*segment.io*',
+    '*cdn.segment.com*',
+    '*mixpanel.com*',
+    '*newrelic.com*',
+    '*nr-data.net*',
+    '*clarity.ms*',
+    '*optimizely.com*'
+)
+
+
+def type_patterns(resource_type):
+    """URL patterns matching one resource type, with and without a query string"""
+    patterns = []
+    for extension in RESOURCE_TYPE_EXTENSIONS[resource_type]:
+        patterns.append(f"*.{extension}")
+        patterns.append(f"*.{extension}?*")
+    return patterns
+
+
+class FastLoadProfile:
+    """Opt-in browser profile that blocks resources irrelevant to locator extraction
+
+    css_allowlist lists URL patterns of stylesheets that must still load
+    (for example the ones that hide or show elements) when 'stylesheet' is
+    blocked.
+    """
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_urls=DEFAULT_BLOCKED_URLS,
+                 css_allowlist=(), eager=True):
+        unknown = set(blocked_types) - set(RESOURCE_TYPE_EXTENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown resource types: {', '.join(sorted(unknown))}")
+        self.blocked_types = tuple(blocked_types)
+        self.blocked_urls = tuple(blocked_urls)
+        self.css_allowlist = tuple(css_allowlist)
+        self.eager = eager
+
+    def blocked_patterns(self):
+        """Every URL pattern to block, in a stable order"""
+        patterns = list(self.blocked_urls)
+        for resource_type in self.blocked_types:
+            patterns.extend(type_patterns(resource_type))
+        return patterns
+
+    def apply_options(self, chrome_options):
+        """Configure Chrome options before the browser starts"""
+        if self.eager:
+            # Return from get() at DOMContentLoaded instead of waiting for every subresource
+            chrome_options.page_load_strategy = 'eager'
+        if 'image' in self.blocked_types:
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_experimental_option(
+                'prefs', {'profile.managed_default_content_settings.images': 2}
+            )
+
+    def apply_driver(self, driver):
+        """Install the URL blocklist in a running browser over CDP
+
+        Returns False when the browser does not support it, so pages still
+        load, just without the saving.
+        """
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+        except Exception:
+            return False
+
+        blocked = self.blocked_patterns()
+        allowed = list(self.css_allowlist)
+
+        # Newer Chrome takes ordered allow/block rules where the first match wins
+        if allowed:
+            rules = [{'urlPattern': pattern, 'block': False} for pattern in allowed]
+            rules += [{'urlPattern': pattern, 'block': True} for pattern in blocked]
+            try:
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urlPatterns': rules})
+                return True
+            except Exception:
+                # Older Chrome cannot express exceptions: keep stylesheets loading
+                css = set(type_patterns('stylesheet'))
+                blocked = [pattern for pattern in blocked if pattern not in css]
+
+        try:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,383 @@
+"""
+Output Formats
+Element data writers used by save_results, the per-run manifest and readers for both
+"""
+
+import io
+import os
+import sys
+import gzip
+import json
+import mmap
+import time
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+
+from .elements import DOMElement
+
+OUTPUT_FORMATS = ('json', 'jsonl', 'msgpack', 'parquet')
+COMPRESSIONS = ('gzip', 'zstd')
+
+EXTENSIONS = {'json': '.json', 'jsonl': '.jsonl', 'msgpack': '.msgpack', 'parquet': '.parquet'}
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+MANIFEST_VERSION = 1
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_SIZE = 4096
+
+
+def _plain(elem):
+    """Element as a plain dict"""
+    return elem.to_dict() if isinstance(elem, DOMElement) else elem
+
+
+def _require(module, package):
+    """Import an optional dependency, explaining how to install it when missing"""
+    try:
+        return __import__(module, fromlist=['_'])
+    except ImportError:
+        raise RuntimeError(f"This output option needs the {package} package: pip install {package}") from None
+
+
+def data_filename(timestamp, output_format='json', compression=None):
+    """File name of the element data saved for one page"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    suffix = COMPRESSION_SUFFIXES[compression] if compression and output_format != 'parquet' else ''
+    return f"dom_elements_{timestamp}{EXTENSIONS[output_format]}{suffix}"
+
+
+def open_binary(path, mode='rb', compression=None):
+    """Open a data file, transparently (de)compressing gzip or zstd"""
+    if compression is None:
+        return open(path, mode)
+    if compression == 'gzip':
+        return gzip.open(path, mode)
+    if compression == 'zstd':
+        zstandard = _require('zstandard', 'zstandard')
+        if mode == 'wb':
+            return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def compression_of(path):
+    """Compression of a data file, from its suffix"""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if str(path).endswith(suffix):
+            return compression
+    return None
+
+
+def format_of(path):
+    """Output format of a data file, from its suffix"""
+    name = str(path)
+    compression = compression_of(path)
+    if compression:
+        name = name[:-len(COMPRESSION_SUFFIXES[compression])]
+    for output_format, extension in EXTENSIONS.items():
+        if name.endswith(extension):
+            return output_format
+    raise ValueError(f"Unknown data file type: {path}")
+
+
+class ElementWriter(ABC):
+    """Writes elements to a data file one at a time
+
+    Formats with one record per element also write an .idx file next to the
+    data: little-endian uint64 offsets of every record in the uncompressed
+    stream, plus the end offset, so a single element can be read without
+    parsing the others.
+    """
+
+    output_format = None
+    indexed = False
+
+    def __init__(self, path, compression=None):
+        self.path = Path(path)
+        self.compression = compression
+        self.count = 0
+        self.position = 0
+        self.offsets = array('Q') if self.indexed else None
+        self.f = self._open()
+
+    def _open(self):
+        return open_binary(self.path, 'wb', self.compression)
+
+    def _write_record(self, data):
+        self.offsets.append(self.position)
+        self.f.write(data)
+        self.position += len(data)
+
+    @abstractmethod
+    def write(self, elem):
+        """Write one element"""
+
+    def write_all(self, elements):
+        """Write every element of an iterable"""
+        for elem in elements:
+            self.write(elem)
+
+    def _finish(self):
+        self.f.close()
+
+    def close(self):
+        """Finish the file and return its manifest entry"""
+        self._finish()
+        entry = {
+            'path': str(self.path),
+            'format': self.output_format,
+            'compression': self.compression,
+            'count': self.count,
+            'index': None
+        }
+        if self.offsets is not None:
+            self.offsets.append(self.position)
+            offsets = array('Q', self.offsets)
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            index_path = self.path.with_name(self.path.name + '.idx')
+            with open(index_path, 'wb') as f:
+                offsets.tofile(f)
+            entry['index'] = str(index_path)
+        return entry
+
+
+class JSONWriter(ElementWriter):
+    """JSON array with the same layout as json.dump(elements, f, indent=2)"""
+
+    output_format = 'json'
+    dumped = False
+
+    def _open(self):
+        return io.TextIOWrapper(super()._open(), encoding='utf-8')
+
+    def write(self, elem):
+        item = json.dumps([elem], indent=2, ensure_ascii=False, default=DOMElement.to_dict)[2:-2]
+        self.f.write(('[\n' if self.count == 0 else ',\n') + item)
+        self.count += 1
+
+    def write_all(self, elements):
+        if self.count == 0 and isinstance(elements, (list, tuple)):
+            json.dump(elements, self.f, indent=2, ensure_ascii=False, default=DOMElement.to_dict)
+            self.count = len(elements)
+            self.dumped = True
+        else:
+            super().write_all(elements)
+
+    def _finish(self):
+        if not self.dumped:
+            self.f.write('\n]' if self.count else '[]')
+        self.f.close()
+
+
+class JSONLinesWriter(ElementWriter):
+    """One compact JSON object per line, written as elements arrive"""
+
+    output_format = 'jsonl'
+    indexed = True
+
+    def write(self, elem):
+        line = json.dumps(elem, ensure_ascii=False, separators=(',', ':'), default=DOMElement.to_dict)
+        self._write_record((line + '\n').encode('utf-8'))
+        self.count += 1
+
+
+class MessagePackWriter(ElementWriter):
+    """A stream of MessagePack maps, one per element (needs msgpack)"""
+
+    output_format = 'msgpack'
+    indexed = True
+
+    def __init__(self, path, compression=None):
+        self.packer = _require('msgpack', 'msgpack').Packer()
+        super().__init__(path, compression)
+
+    def write(self, elem):
+        self._write_record(self.packer.pack(_plain(elem)))
+        self.count += 1
+
+
+class ParquetWriter(ElementWriter):
+    """Columnar Parquet file written in row groups (needs pyarrow)
+
+    Columns come from the first row group. Columns holding only strings
+    there are stored as text, the others as JSON strings; their names are
+    kept in the schema metadata under 'json_columns'. Keys a row lacks are
+    null. Keys first seen later, and values a text column cannot hold, go
+    to the 'extra' column as JSON.
+    """
+
+    output_format = 'parquet'
+
+    def __init__(self, path, compression=None):
+        self.pa = _require('pyarrow', 'pyarrow')
+        self.pq = _require('pyarrow.parquet', 'pyarrow')
+        self.rows = []
+        self.columns = None
+        self.json_columns = None
+        self.writer = None
+        super().__init__(path, compression)
+
+    def _open(self):
+        return None
+
+    def write(self, elem):
+        self.rows.append(_plain(elem))
+        self.count += 1
+        if len(self.rows) >= PARQUET_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self.columns is None:
+            self.columns = list(dict.fromkeys(key for row in self.rows for key in row))
+            self.json_columns = {
+                column for column in self.columns
+                if any(column in row and not isinstance(row[column], str) for row in self.rows)
+            }
+            schema = self.pa.schema(
+                [(column, self.pa.string()) for column in self.columns + ['extra']],
+                metadata={'json_columns': json.dumps(sorted(self.json_columns))}
+            )
+            self.writer = self.pq.ParquetWriter(str(self.path), schema, compression=self.compression or 'none')
+
+        known = set(self.columns)
+        data = {column: [] for column in self.columns}
+        data['extra'] = []
+        for row in self.rows:
+            extra = {key: value for key, value in row.items() if key not in known}
+            for column in self.columns:
+                value = row.get(column)
+                if column not in row:
+                    cell = None
+                elif column in self.json_columns:
+                    cell = json.dumps(value, ensure_ascii=False)
+                elif isinstance(value, str):
+                    cell = value
+                else:
+                    # A text column cannot tell this value from a string or a missing key
+                    cell = None
+                    extra[column] = value
+                data[column].append(cell)
+            data['extra'].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        self.writer.write_table(self.pa.table(data, schema=self.writer.schema))
+        self.rows = []
+
+    def _finish(self):
+        if self.rows or self.writer is None:
+            self._flush()
+        self.writer.close()
+
+
+WRITERS = {
+    'json': JSONWriter,
+    'jsonl': JSONLinesWriter,
+    'msgpack': MessagePackWriter,
+    'parquet': ParquetWriter
+}
+
+
+def element_writer(path, output_format='json', compression=None):
+    """Open the writer for an output format"""
+    return WRITERS[output_format](path, compression)
+
+
+def iter_elements(path):
+    """Stream the elements of a data file in any output format"""
+    output_format = format_of(path)
+    compression = compression_of(path)
+
+    if output_format == 'parquet':
+        pq = _require('pyarrow.parquet', 'pyarrow')
+        parquet_file = pq.ParquetFile(str(path))
+        json_columns = set(json.loads((parquet_file.schema_arrow.metadata or {}).get(b'json_columns', b'[]')))
+        for batch in parquet_file.iter_batches():
+            for row in batch.to_pylist():
+                extra = row.pop('extra', None)
+                # Null cells are keys the row did not have
+                row = {
+                    key: json.loads(value) if key in json_columns else value
+                    for key, value in row.items() if value is not None
+                }
+                yield dict(row, **json.loads(extra)) if extra else row
+        return
+
+    with open_binary(path, 'rb', compression) as f:
+        if output_format == 'json':
+            yield from json.load(io.TextIOWrapper(f, encoding='utf-8'))
+        elif output_format == 'jsonl':
+            for line in io.TextIOWrapper(f, encoding='utf-8'):
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _require('msgpack', 'msgpack').Unpacker(f, raw=False)
+
+
+def read_element(path, index):
+    """Read one element of an uncompressed JSONL or MessagePack file through its .idx file"""
+    path = Path(path)
+    offsets = array('Q')
+    with open(path.with_name(path.name + '.idx'), 'rb') as f:
+        offsets.frombytes(f.read())
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    if not 0 <= index < len(offsets) - 1:
+        raise IndexError(index)
+    if compression_of(path):
+        raise ValueError("Random access needs an uncompressed data file")
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        record = data[offsets[index]:offsets[index + 1]]
+    if format_of(path) == 'msgpack':
+        return _require('msgpack', 'msgpack').unpackb(record, raw=False)
+    return json.loads(record)
+
+
+def write_manifest(output_dir, results):
+    """Write the manifest of a run: for every page its URL, data file, format and index
+
+    Shared components (see components.ComponentIndex) are listed once under
+    'components' and referenced by id and root from the pages holding them.
+    """
+    pages = []
+    components = {}
+    for result in results:
+        if result.get('status', 'ok') != 'ok' or not result.get('data'):
+            continue
+        page = {
+            'url': result.get('url'),
+            'title': result.get('title'),
+            'source': result.get('source'),
+            'element_count': result.get('element_count'),
+            'data': result['data'],
+            'files': result.get('files', [])
+        }
+        if 'components' in result:
+            # Shared components are listed once, pages refer to them by id and their own root
+            page['components'] = [
+                {'id': reference['id'], 'root': reference['root']} for reference in result['components']
+            ]
+            for reference in result['components']:
+                components.setdefault(
+                    reference['id'], {key: value for key, value in reference.items() if key != 'root'}
+                )
+        pages.append(page)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Microseconds and the process id keep runs finishing in the same second apart
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{int(now % 1 * 1e6):06d}_{os.getpid()}"
+    manifest_file = output_dir / f"manifest_{stamp}.json"
+    with open(manifest_file, 'x', encoding='utf-8') as f:
+        json.dump({
+            'version': MANIFEST_VERSION,
+            'created': time.time(),
+            'pages': pages,
+            **({'components': components} if components else {})
+        }, f, indent=2, ensure_ascii=False)
+    return manifest_file
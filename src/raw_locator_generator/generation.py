@@ -0,0 +1,460 @@
+"""
+Script Generation
+Walk the elements once and stream every framework's script through registered emitters
+"""
+
+import io
+
+from .locators import SELENIUM_BY, css_locator, element_context, preferred_locator
+
+# Number of elements the framework-specific scripts include by default; None for no limit
+SCRIPT_ELEMENT_LIMIT = 15
+
+# Registered emitter classes by name, in output order
+EMITTERS = {}
+
+
+def register_emitter(emitter_class):
+    """Register a ScriptEmitter subclass; usable as a class decorator"""
+    if not emitter_class.name:
+        raise ValueError("Emitters need a name")
+    EMITTERS[emitter_class.name] = emitter_class
+    return emitter_class
+
+
+def emitters_for(framework='all'):
+    """Emitter classes producing the scripts for a framework name, alias or 'all'"""
+    # The framework-agnostic raw locators are always included
+    return [
+        emitter_class for emitter_class in EMITTERS.values()
+        if emitter_class is RawElementsEmitter
+        or framework in ('all', emitter_class.name) or framework in emitter_class.aliases
+    ]
+
+
+def _literal(value):
+    """Escape a validated locator for a single-quoted Python or JavaScript string"""
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class LineWriter:
+    """Write lines to a file the way '\\n'.join(lines) would, without building the list"""
+
+    def __init__(self, f):
+        self.f = f
+        self.first = True
+
+    def __call__(self, line):
+        if self.first:
+            self.first = False
+            self.f.write(line)
+        else:
+            self.f.write('\n' + line)
+
+
+class ScriptEmitter:
+    """Writes one framework's script while the elements are walked
+
+    Subclasses set name, folder and filename (with a {timestamp} placeholder)
+    and override begin, element and end. Each call receives write(line).
+    Emitters with limited set only see the first script_limit elements.
+    comment starts a comment line in the script's language.
+    """
+
+    name = None
+    aliases = ()
+    folder = None
+    filename = None
+    limited = True
+    comment = '#'
+
+    def begin(self, write, page):
+        """Write the script header; page has 'url', 'title' and 'components'"""
+
+    def components(self, write, components):
+        """Point to the scripts of the shared components the page holds, after the header"""
+        write(f"{self.comment} SHARED COMPONENTS (saved once per run)")
+        for reference in components:
+            filename = self.filename.format(timestamp=f"component_{reference['id']}")
+            write(f"{self.comment} {reference['id']}: {reference['element_count']} elements in {filename}, "
+                  f"XPaths relative to {reference['root']}")
+        write("")
+
+    def element(self, write, index, elem, preferred):
+        """Write one element; preferred is its validated (strategy, value) or None"""
+
+    def end(self, write):
+        """Write the script footer"""
+
+
+@register_emitter
+class RawElementsEmitter(ScriptEmitter):
+    """Framework-agnostic list of every locator of every element"""
+
+    name = 'raw_elements'
+    folder = 'raw_elements'
+    filename = 'raw_elements_{timestamp}.txt'
+    limited = False
+
+    def begin(self, write, page):
+        write("# RAW ELEMENT LOCATORS - Framework Agnostic")
+        write("# ==========================================")
+        write("# Use these locators with any automation framework\n")
+        write(f"# URL: {page['url']}")
+        write(f"# Page Title: {page['title']}\n")
+        write("# ELEMENT LOCATORS")
+        write("# ================\n")
+
+    def element(self, write, index, elem, preferred):
+        write(f"# Element {index}: {elem['type'].upper()}")
+        write(f"# Description: {elem['text'][:80] if elem['text'] else 'No text'}")
+        write(f"# Tag: {elem['tag']}")
+
+        context = element_context(elem)
+        if context:
+            write(f"CONTEXT = '{' > '.join(f'{kind}:{selector}' for kind, selector in context)}'")
+
+        # Provide all possible locator strategies
+        if elem['id']:
+            write(f"ID = '{elem['id']}'")
+        if elem['name']:
+            write(f"NAME = '{elem['name']}'")
+        if elem['class']:
+            write(f"CLASS = '{elem['class']}'")
+        if elem['xpath']:
+            write(f"XPATH = '{elem['xpath']}'")
+        if elem['css_selector']:
+            write(f"CSS = '{elem['css_selector']}'")
+        if elem['href']:
+            write(f"HREF = '{elem['href']}'")
+        if elem.get('actionable') is False:
+            write("# Not actionable: hidden, zero-size, off-page or disabled")
+
+        # Results of validate_locators, when it ran
+        if elem.get('locator_matches'):
+            matches = ', '.join(f"{strategy.upper()}={count}" for strategy, count in elem['locator_matches'].items())
+            write(f"# Matches: {matches}")
+        if preferred:
+            write(f"PREFERRED = '{preferred[0]}:{preferred[1]}'")
+
+        write("")
+
+
+@register_emitter
+class SeleniumEmitter(ScriptEmitter):
+    name = 'selenium'
+    folder = 'selenium'
+    filename = 'selenium_script_{timestamp}.py'
+
+    def begin(self, write, page):
+        write("# SELENIUM AUTOMATION SCRIPT")
+        write("# ==========================\n")
+        write("from selenium import webdriver")
+        write("from selenium.webdriver.common.by import By")
+        write("from selenium.webdriver.support.ui import WebDriverWait")
+        write("from selenium.webdriver.support import expected_conditions as EC")
+        write("from selenium.webdriver.common.keys import Keys\n")
+        write("# Setup")
+        write("driver = webdriver.Chrome()")
+        write(f"driver.get('{page['url']}')\n")
+
+    def element(self, write, index, elem, preferred):
+        write(f"# {elem['type'].upper()}: {elem['text'][:50]}")
+
+        # Switch into frames and search from shadow roots on the way to the element
+        scope = 'driver'
+        context = element_context(elem)
+        for kind, selector in context:
+            host = f"{scope}.find_element(By.CSS_SELECTOR, '{selector}')"
+            if kind == 'frame':
+                write(f"# driver.switch_to.frame({host})")
+                scope = 'driver'
+            else:
+                scope = f"{host}.shadow_root"
+
+        if preferred:
+            locator = f"{scope}.find_element({SELENIUM_BY[preferred[0]]}, '{_literal(preferred[1])}')"
+        elif elem['id']:
+            locator = f"{scope}.find_element(By.ID, '{elem['id']}')"
+        elif elem['name']:
+            locator = f"{scope}.find_element(By.NAME, '{elem['name']}')"
+        elif elem['xpath']:
+            locator = f"{scope}.find_element(By.XPATH, '{elem['xpath']}')"
+        else:
+            locator = f"{scope}.find_element(By.CSS_SELECTOR, '{elem['css_selector']}')"
+
+        if elem['type'] in ['buttons', 'links']:
+            write(f"# {locator}.click()")
+        elif elem['type'] == 'inputs':
+            write(f"# {locator}.send_keys('your_value')")
+        if any(kind == 'frame' for kind, _ in context):
+            write("# driver.switch_to.default_content()")
+
+        write("")
+
+    def end(self, write):
+        write("# driver.quit()")
+
+
+@register_emitter
+class PlaywrightEmitter(ScriptEmitter):
+    name = 'playwright'
+    folder = 'playwright'
+    filename = 'playwright_script_{timestamp}.py'
+
+    def begin(self, write, page):
+        write("# PLAYWRIGHT AUTOMATION SCRIPT")
+        write("# ============================\n")
+        write("from playwright.sync_api import sync_playwright\n")
+        write("with sync_playwright() as p:")
+        write("    browser = p.chromium.launch()")
+        write("    page = browser.new_page()")
+        write(f"    page.goto('{page['url']}')\n")
+
+    def element(self, write, index, elem, preferred):
+        write(f"    # {elem['type'].upper()}: {elem['text'][:50]}")
+
+        # Playwright's CSS engine pierces open shadow roots; frames need a frame locator
+        scope = 'page'
+        for kind, selector in element_context(elem):
+            if kind == 'frame':
+                scope = f"{scope}.frame_locator('{selector}')"
+            else:
+                scope = f"{scope}.locator('{selector}')"
+
+        if preferred and preferred[0] == 'xpath':
+            locator = f"{scope}.locator('xpath={_literal(preferred[1])}')"
+        elif preferred:
+            locator = f"{scope}.locator('{_literal(css_locator(*preferred))}')"
+        elif elem['id']:
+            locator = f"{scope}.locator('#{elem['id']}')"
+        elif elem['xpath']:
+            locator = f"{scope}.locator('xpath={elem['xpath']}')"
+        elif elem['css_selector']:
+            locator = f"{scope}.locator('{elem['css_selector']}')"
+        else:
+            locator = f"{scope}.locator('text={elem['text'][:30]}')"
+
+        if elem['type'] in ['buttons', 'links']:
+            write(f"    # {locator}.click()")
+        elif elem['type'] == 'inputs':
+            write(f"    # {locator}.fill('your_value')")
+
+        write("")
+
+    def end(self, write):
+        write("    # browser.close()")
+
+
+@register_emitter
+class PuppeteerEmitter(ScriptEmitter):
+    name = 'puppeteer'
+    folder = 'puppeteer'
+    filename = 'puppeteer_script_{timestamp}.js'
+    comment = '//'
+
+    def begin(self, write, page):
+        write("// PUPPETEER AUTOMATION SCRIPT")
+        write("// ============================\n")
+        write("const puppeteer = require('puppeteer');\n")
+        write("(async () => {")
+        write("  const browser = await puppeteer.launch();")
+        write("  const page = await browser.newPage();")
+        write(f"  await page.goto('{page['url']}');\n")
+
+    def element(self, write, index, elem, preferred):
+        if preferred and preferred[0] == 'xpath':
+            selector = f"xpath/{_literal(preferred[1])}"
+        elif preferred:
+            selector = _literal(css_locator(*preferred))
+        elif elem['id']:
+            selector = f"#{elem['id']}"
+        elif elem['xpath']:
+            selector = f"xpath/{elem['xpath']}"
+        elif elem['css_selector']:
+            selector = elem['css_selector']
+        else:
+            selector = None
+
+        write(f"  // {elem['type'].upper()}: {elem['text'][:50]}")
+        if selector is None:
+            return
+
+        # Shadow hosts are chained with the >>> deep combinator, frames through their handles
+        scope = 'page'
+        hosts = []
+        for hop, (kind, host) in enumerate(element_context(elem), 1):
+            if kind == 'frame':
+                frame = f"frame{index}_{hop}"
+                write(f"  // const {frame} = await (await {scope}.$('{' >>> '.join(hosts + [host])}')).contentFrame();")
+                scope = frame
+                hosts = []
+            else:
+                hosts.append(host)
+        selector = f"'{' >>> '.join(hosts + [selector])}'"
+
+        if elem['type'] in ['buttons', 'links']:
+            write(f"  // await {scope}.click({selector});")
+        elif elem['type'] == 'inputs':
+            write(f"  // await {scope}.type({selector}, 'your_value');")
+
+        write("")
+
+    def end(self, write):
+        write("  // await browser.close();")
+        write("})();")
+
+
+@register_emitter
+class CypressEmitter(ScriptEmitter):
+    name = 'cypress'
+    folder = 'cypress'
+    filename = 'cypress_script_{timestamp}.js'
+    comment = '//'
+
+    def begin(self, write, page):
+        write("// CYPRESS AUTOMATION SCRIPT")
+        write("// =========================\n")
+        write("describe('Automated Test', () => {")
+        write("  it('should perform actions', () => {")
+        write(f"    cy.visit('{page['url']}');\n")
+
+    def element(self, write, index, elem, preferred):
+        if preferred and preferred[0] == 'xpath':
+            selector = f"'xpath={_literal(preferred[1])}'"  # Note: Cypress needs xpath plugin
+        elif preferred:
+            selector = f"'{_literal(css_locator(*preferred))}'"
+        elif elem['id']:
+            selector = f"'#{elem['id']}'"
+        elif elem['xpath']:
+            selector = f"'xpath={elem['xpath']}'"  # Note: Cypress needs xpath plugin
+        elif elem['css_selector']:
+            selector = f"'{elem['css_selector']}'"
+        else:
+            selector = None
+
+        write(f"    // {elem['type'].upper()}: {elem['text'][:50]}")
+        if selector is None:
+            return
+
+        # Step into shadow roots with .shadow() and into frames through their document body
+        chain = None
+        for kind, host in element_context(elem):
+            chain = f"cy.get('{host}')" if chain is None else f"{chain}.find('{host}')"
+            if kind == 'frame':
+                chain += ".its('0.contentDocument.body').then(cy.wrap)"
+            else:
+                chain += ".shadow()"
+        target = f"cy.get({selector})" if chain is None else f"{chain}.find({selector})"
+
+        if elem['type'] in ['buttons', 'links']:
+            write(f"    // {target}.click();")
+        elif elem['type'] == 'inputs':
+            write(f"    // {target}.type('your_value');")
+
+        write("")
+
+    def end(self, write):
+        write("  });")
+        write("});")
+
+
+@register_emitter
+class RobotFrameworkEmitter(ScriptEmitter):
+    name = 'robot_framework'
+    aliases = ('robot',)
+    folder = 'robot_framework'
+    filename = 'robot_framework_script_{timestamp}.robot'
+
+    def begin(self, write, page):
+        write("# ROBOT FRAMEWORK AUTOMATION SCRIPT")
+        write("# ==================================\n")
+        write("*** Settings ***")
+        write("Library    SeleniumLibrary\n")
+        write("*** Variables ***")
+        write(f"${{URL}}    {page['url']}\n")
+
+        # Test case steps follow all variables, so they are held until the end
+        self.steps = []
+
+    def element(self, write, index, elem, preferred):
+        # Add element locators as variables
+        if preferred:
+            write(f"${{ELEMENT_{index}}}    {preferred[0]}:{preferred[1]}")
+        elif elem['id']:
+            write(f"${{ELEMENT_{index}}}    id:{elem['id']}")
+        elif elem['xpath']:
+            write(f"${{ELEMENT_{index}}}    xpath:{elem['xpath']}")
+        else:
+            return
+
+        self.steps.append(f"    # {elem['type'].upper()}: {elem['text'][:50]}")
+        context = element_context(elem)
+        if any(kind == 'shadow' for kind, _ in context):
+            # SeleniumLibrary locators cannot reach into shadow roots
+            hosts = ' > '.join(f"{kind}:{selector}" for kind, selector in context)
+            self.steps.append(f"    # ${{ELEMENT_{index}}} is inside a shadow root ({hosts})")
+            return
+
+        for _, selector in context:
+            self.steps.append(f"    # Select Frame    css:{selector}")
+        if elem['type'] in ['buttons', 'links']:
+            self.steps.append(f"    # Click Element    ${{ELEMENT_{index}}}")
+        elif elem['type'] == 'inputs':
+            self.steps.append(f"    # Input Text    ${{ELEMENT_{index}}}    your_value")
+        if context:
+            self.steps.append("    # Unselect Frame")
+
+    def end(self, write):
+        write("\n*** Test Cases ***")
+        write("Automated Test Scenario")
+        write("    Open Browser    ${URL}    chrome")
+        for step in self.steps:
+            write(step)
+        write("    # Close Browser")
+
+
+def generate_scripts(elements, outputs, url='', title='', limit=SCRIPT_ELEMENT_LIMIT, observe=None,
+                     components=None):
+    """Walk elements once and stream them to emitters
+
+    outputs maps emitter instances to open text files. observe(elem), when
+    given, is called for every element, e.g. to write the JSON data in the
+    same pass. components are references to the shared components of the
+    page (see components.ComponentIndex). Returns the number of elements.
+    """
+    page = {'url': url, 'title': title, 'components': components or []}
+    writers = [(emitter, LineWriter(f)) for emitter, f in outputs.items()]
+    for emitter, write in writers:
+        emitter.begin(write, page)
+        if page['components']:
+            emitter.components(write, page['components'])
+
+    active = writers
+    unlimited = [(emitter, write) for emitter, write in writers if not emitter.limited]
+    count = 0
+    for index, elem in enumerate(elements, 1):
+        if limit is not None and index > limit and active is not unlimited:
+            active = unlimited
+            if not active and observe is None:
+                break
+        count = index
+        if observe is not None:
+            observe(elem)
+
+        # Resolved once and shared by every emitter
+        preferred = preferred_locator(elem)
+        for emitter, write in active:
+            emitter.element(write, index, elem, preferred)
+
+    for emitter, write in writers:
+        emitter.end(write)
+
+    return count
+
+
+def generate_script_texts(elements, framework='all', url='', title='', limit=SCRIPT_ELEMENT_LIMIT):
+    """Generate scripts in memory, returned as a dict of emitter name to text"""
+    buffers = {emitter_class(): io.StringIO() for emitter_class in emitters_for(framework)}
+    generate_scripts(elements, buffers, url, title, limit)
+    return {emitter.name: buffer.getvalue() for emitter, buffer in buffers.items()}
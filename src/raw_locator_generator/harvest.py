@@ -0,0 +1,180 @@
+"""
+Scroll Harvesting
+Extract pages with infinite scroll or virtualized lists: scroll step by step,
+extract only the nodes attached or changed since the last step, and drop the
+records already seen through a fingerprint index
+"""
+
+import json
+import time
+import hashlib
+
+from .metrics import current_memory_bytes
+from .page_scripts import HARVEST_START, HARVEST_STEP, HARVEST_STOP
+
+# Attributes identifying one element record across scroll steps
+FINGERPRINT_FIELDS = ('context', 'tag', 'id', 'name', 'class', 'text', 'href', 'xpath')
+
+
+class HarvestProfile:
+    """Opt-in scroll harvesting and the budgets that end it
+
+    step is the scroll distance in pixels (0 scrolls 90% of the container).
+    Harvesting stops after idle_steps steps at the end of the container with
+    nothing new, or once max_elements, max_seconds, max_steps or max_memory_mb
+    (resident memory of this process) is reached. scroll_target is a CSS
+    selector of the scrolling container, detected when None.
+    """
+
+    def __init__(self, step=0, max_elements=None, max_seconds=120, max_steps=None, max_memory_mb=None,
+                 idle_steps=3, quiet_ms=500, step_timeout=10, scroll_target=None):
+        if idle_steps < 1:
+            raise ValueError("idle_steps must be at least 1")
+        self.step = step
+        self.max_elements = max_elements
+        self.max_seconds = max_seconds
+        self.max_steps = max_steps
+        self.max_memory_mb = max_memory_mb
+        self.idle_steps = idle_steps
+        self.quiet_ms = quiet_ms
+        self.step_timeout = step_timeout
+        self.scroll_target = scroll_target
+
+    def budget_exceeded(self, stats, started):
+        """Name of the first budget used up, or None"""
+        if self.max_elements is not None and stats['elements'] >= self.max_elements:
+            return 'element budget'
+        if self.max_seconds is not None and time.time() - started >= self.max_seconds:
+            return 'time budget'
+        if self.max_steps is not None and stats['steps'] >= self.max_steps:
+            return 'step budget'
+        if self.max_memory_mb is not None:
+            memory = current_memory_bytes()
+            if memory is not None and memory >= self.max_memory_mb * 2 ** 20:
+                return 'memory budget'
+        return None
+
+
+def element_fingerprint(elem):
+    """64-bit fingerprint of the identifying fields of an element record"""
+    data = json.dumps([elem.get(field) for field in FINGERPRINT_FIELDS], separators=(',', ':'))
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class FingerprintIndex:
+    """Fingerprints of every element record seen, without keeping the records
+
+    Memory grows by a fixed few dozen bytes per distinct element, so 100k+
+    rows stay cheap while the records themselves are streamed to disk.
+    """
+
+    def __init__(self):
+        self.fingerprints = set()
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, elem):
+        """Remember an element record; returns False when it was already seen"""
+        fingerprint = element_fingerprint(elem)
+        if fingerprint in self.fingerprints:
+            return False
+        self.fingerprints.add(fingerprint)
+        return True
+
+
+def _run_step(driver, profile):
+    """Scroll once and return the step result, allowing the async script its whole bound"""
+    previous = None
+    try:
+        previous = driver.timeouts.script
+        if previous < profile.step_timeout + 5:
+            driver.set_script_timeout(profile.step_timeout + 5)
+    except Exception:
+        previous = None
+
+    try:
+        result = json.loads(driver.execute_async_script(
+            HARVEST_STEP, profile.step, profile.quiet_ms, int(profile.step_timeout * 1000)
+        ))
+    finally:
+        if previous is not None:
+            driver.set_script_timeout(previous)
+
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+
+def harvest_elements(agent, profile, stats=None):
+    """Yield the interactive elements of the current page while scrolling through it
+
+    Elements are extracted, measured and validated one scroll step at a time,
+    so the caller can stream them to disk. stats, when given, is filled with
+    the steps, elements, duplicates and stop_reason of the run.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(steps=0, elements=0, duplicates=0, target=None, stop_reason=None)
+    driver = agent.driver
+    started = time.time()
+    index = FingerprintIndex()
+
+    start = json.loads(driver.execute_script(
+        HARVEST_START, list(agent.rules.items()), agent.geometry, profile.scroll_target
+    ))
+    stats['target'] = start['target']
+    print(f"→ Harvesting by scrolling {start['target']}")
+
+    records = start['records']
+    moved = True
+    idle = 0
+    try:
+        while True:
+            new = [elem for elem in records if index.add(elem)]
+            stats['duplicates'] += len(records) - len(new)
+
+            # Only count idle steps at the end, where lazy loading may still add rows
+            idle = idle + 1 if not new and not moved else 0
+            if idle >= profile.idle_steps:
+                stats['stop_reason'] = 'no new content'
+                break
+
+            for elem in new:
+                elem['text'] = elem['text'][:100]
+            if agent.actionable_only:
+                new = [elem for elem in new if elem['actionable'] is not False]
+            if new and agent.validate:
+                new = agent.validate_locators(new, quiet=True)
+
+            if profile.max_elements is not None:
+                new = new[:profile.max_elements - stats['elements']]
+            for elem in new:
+                yield elem
+            stats['elements'] += len(new)
+            agent.metrics.count('elements_interactive', len(new))
+
+            stats['stop_reason'] = profile.budget_exceeded(stats, started)
+            if stats['stop_reason']:
+                break
+
+            try:
+                with agent.metrics.phase('harvest_step'):
+                    step = _run_step(driver, profile)
+            except Exception as e:
+                # Keep what was harvested so far
+                print(f"✗ Scroll step failed: {e}")
+                stats['stop_reason'] = 'error'
+                break
+            stats['steps'] += 1
+            records = step['records']
+            moved = step['moved']
+            if stats['steps'] % 10 == 0:
+                print(f"  → {stats['steps']} steps, {stats['elements']} elements "
+                      f"({stats['duplicates']} duplicates)")
+    finally:
+        try:
+            driver.execute_script(HARVEST_STOP)
+        except Exception:
+            pass
+        agent.metrics.count('harvest_steps', stats['steps'])
+        agent.metrics.count('harvest_duplicates', stats['duplicates'])
@@ -0,0 +1,301 @@
+"""
+Incremental Re-extraction
+Diff the current DOM against the previous snapshot by subtree hash and only
+rebuild locators for the subtrees that changed
+"""
+
+import json
+import time
+import hashlib
+from bisect import bisect_left
+from pathlib import Path
+
+from .offline import classify_elements, element_record, element_xpath, hides_subtree, parse_html, sibling_position
+from .roles import DEFAULT_ROLE_RULES
+
+SNAPSHOT_VERSION = 3
+
+
+def subtree_hashes(root):
+    """Hash every element from its tag, attributes, text and child hashes, bottom-up"""
+    hashes = {}
+
+    # Reversed document order visits every element after all of its descendants
+    for node in reversed(list(root.iter())):
+        if not isinstance(node.tag, str):
+            continue
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(node.tag.encode('utf-8'))
+        for name, value in sorted(node.attrib.items()):
+            digest.update(f"\0{name}={value}".encode('utf-8'))
+        digest.update(f"\1{node.text or ''}".encode('utf-8'))
+        for child in node:
+            if isinstance(child.tag, str):
+                digest.update(hashes[child])
+            digest.update(f"\1{child.tail or ''}".encode('utf-8'))
+        hashes[node] = digest.digest()
+
+    return hashes
+
+
+def snapshot_path(output_dir, url):
+    """Location of the incremental snapshot for a URL inside output/json_data"""
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return Path(output_dir) / 'json_data' / f"snapshot_{key}.json"
+
+
+def load_snapshot(output_dir, url, rules=None):
+    """Load the previous snapshot for a URL, or None when there is none or it used other rules"""
+    path = snapshot_path(output_dir, url)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('url') != url:
+        return None
+    if snapshot.get('rules') != (rules or DEFAULT_ROLE_RULES):
+        return None
+    return snapshot
+
+
+def _paths_below(paths, path):
+    """Paths strictly inside the subtree rooted at path, from a sorted list"""
+    prefix = path + '/'
+    start = bisect_left(paths, prefix)
+    while start < len(paths) and paths[start].startswith(prefix):
+        yield paths[start]
+        start += 1
+
+
+def _rebase(xpath, old_prefix, new_prefix):
+    """Move an XPath from one subtree root to another"""
+    if xpath == old_prefix:
+        return new_prefix
+    if xpath.startswith(old_prefix + '/'):
+        return new_prefix + xpath[len(old_prefix):]
+    # Anchored to an id inside the subtree, so it does not depend on the root
+    return xpath
+
+
+class IncrementalExtractor:
+    """Extract interactive elements, reusing records from the previous snapshot
+
+    The snapshot keeps, per element position, the subtree hash, the XPath
+    and whether an ancestor hides the subtree, since the text of the records
+    inside depends on it. An unchanged subtree under equally hidden
+    ancestors reuses its records and snapshot entries, rebased onto its new
+    position, without visiting its descendants.
+    """
+
+    def __init__(self, html, url, previous=None, rules=None):
+        self.root = parse_html(html) if isinstance(html, (str, bytes)) else html
+        self.url = url
+        self.previous = previous
+        self.rules = dict(rules or DEFAULT_ROLE_RULES)
+        self.body = self.root.find('body')
+        self.xpath_cache = {}
+        self.positions = {}
+
+        # Roles of every interactive element
+        self.roles = dict(classify_elements(self.root, self.rules))
+
+    def _previous_index(self):
+        """Index the previous snapshot by position path and by subtree hash"""
+        subtrees = self.previous['subtrees'] if self.previous else {}
+        records = self.previous['elements'] if self.previous else []
+        records.sort(key=lambda record: record['path'])
+
+        by_hash = {}
+        for path, (digest, xpath, hidden) in subtrees.items():
+            by_hash.setdefault(digest, []).append(path)
+
+        return subtrees, sorted(subtrees), records, [record['path'] for record in records], by_hash
+
+    def _records_under(self, records, record_paths, path):
+        """Previous records inside the subtree rooted at path"""
+        found = []
+        start = bisect_left(record_paths, path)
+        while start < len(records) and record_paths[start] == path:
+            found.append(records[start])
+            start += 1
+        start = bisect_left(record_paths, path + '/')
+        while start < len(records) and record_paths[start].startswith(path + '/'):
+            found.append(records[start])
+            start += 1
+        return found
+
+    def extract(self):
+        """Return (elements, snapshot, report)"""
+        hashes = subtree_hashes(self.root)
+        old_subtrees, old_subtree_paths, old_records, old_paths, old_by_hash = self._previous_index()
+        used_paths = set()
+        consumed = set()
+
+        new_subtrees = {}
+        new_records = []
+        report = {'added': [], 'removed': [], 'moved': [], 'modified': [], 'unchanged': 0, 'reused_subtrees': 0}
+        order = 0
+
+        # Each node comes with whether an ancestor hides it
+        stack = [(self.root, f"/{self.root.tag}[1]", False)]
+        while stack:
+            node, path, hidden = stack.pop()
+            order += 1
+            digest = hashes[node].hex()
+            xpath = element_xpath(node, self.body, self.xpath_cache, self.positions)
+
+            reused = self._reuse(path, digest, xpath, hidden, old_subtrees, old_records,
+                                 old_paths, old_by_hash, used_paths, consumed, report)
+            if reused is not None:
+                # The whole subtree is unchanged: keep its records and skip its descendants
+                old_path, records = reused
+                for old_order, record in records:
+                    new_records.append(((order, old_order), record))
+                self._copy_subtrees(old_subtrees, old_subtree_paths, old_path, path, xpath, new_subtrees)
+                continue
+
+            new_subtrees[path] = [digest, xpath, hidden]
+            if node in self.roles:
+                record = element_record(node, self.roles[node], self.body, self.xpath_cache, self.positions, self.url)
+                record['path'] = path
+                new_records.append(((order, 0), record))
+
+            hidden = hidden or hides_subtree(node)
+            children = [child for child in node if isinstance(child.tag, str)]
+            for child in reversed(children):
+                stack.append((child, f"{path}/{child.tag}[{sibling_position(child, self.positions)}]", hidden))
+
+        new_records.sort(key=lambda item: item[0])
+        records = [record for _, record in new_records]
+        self._classify(records, old_records, consumed, report)
+
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'url': self.url,
+            'rules': self.rules,
+            'created': time.time(),
+            'subtrees': new_subtrees,
+            'elements': [dict(record, order=index) for index, record in enumerate(records)]
+        }
+        elements = [{key: value for key, value in record.items() if key != 'path'} for record in records]
+        return elements, snapshot, report
+
+    def _reuse(self, path, digest, xpath, hidden, old_subtrees, old_records, old_paths,
+               old_by_hash, used_paths, consumed, report):
+        """Return the previous path and records of an unchanged subtree, or None when it changed"""
+        if not self.previous:
+            return None
+
+        old_path = None
+        old = old_subtrees.get(path)
+        if old and old[0] == digest and old[2] == hidden and path not in used_paths:
+            old_path = path
+        else:
+            for candidate in old_by_hash.get(digest, ()):
+                if candidate not in used_paths and old_subtrees[candidate][2] == hidden:
+                    old_path = candidate
+                    break
+        if old_path is None:
+            return None
+
+        old_xpath = old_subtrees[old_path][1]
+        used_paths.add(old_path)
+        report['reused_subtrees'] += 1
+
+        reused = []
+        for record in self._records_under(old_records, old_paths, old_path):
+            consumed.add(id(record))
+            record = dict(record)
+            record['_from'] = record['xpath']
+            record['xpath'] = _rebase(record['xpath'], old_xpath, xpath)
+            record['path'] = path + record['path'][len(old_path):]
+            reused.append((record.pop('order', 0), record))
+        return old_path, reused
+
+    def _copy_subtrees(self, old_subtrees, old_subtree_paths, old_path, path, xpath, new_subtrees):
+        """Carry the snapshot entries of a reused subtree over, rebased onto its new position"""
+        digest, old_xpath, hidden = old_subtrees[old_path]
+        new_subtrees[path] = [digest, xpath, hidden]
+        for old in _paths_below(old_subtree_paths, old_path):
+            digest, old_child_xpath, hidden = old_subtrees[old]
+            new_subtrees[path + old[len(old_path):]] = [digest, _rebase(old_child_xpath, old_xpath, xpath), hidden]
+
+    def _classify(self, records, old_records, consumed, report):
+        """Sort every record into unchanged, moved, modified or added, and collect removed ones"""
+        old_by_key = {
+            record['path']: record
+            for record in old_records if id(record) not in consumed
+        }
+        matched = set()
+
+        for record in records:
+            moved_from = record.pop('_from', None)
+            if moved_from is not None:
+                # Reused from an unchanged subtree
+                if moved_from != record['xpath']:
+                    report['moved'].append({'from': moved_from, 'to': record['xpath'], 'element': _public(record)})
+                else:
+                    report['unchanged'] += 1
+                continue
+
+            old = old_by_key.get(record['path'])
+            if old is None:
+                report['added'].append(_public(record))
+                continue
+            matched.add(id(old))
+            if _public(old) == _public(record):
+                report['unchanged'] += 1
+            else:
+                report['modified'].append({'before': _public(old), 'after': _public(record)})
+
+        for old in old_records:
+            if id(old) not in consumed and id(old) not in matched:
+                report['removed'].append(_public(old))
+
+
+def _public(record):
+    """Strip internal snapshot fields from a record"""
+    return {key: value for key, value in record.items() if key not in ('path', 'order', '_from')}
+
+
+def extract_incremental(html, url, output_dir='output', label=None, rules=None):
+    """Extract interactive elements incrementally and write the snapshot and change report"""
+    previous = load_snapshot(output_dir, url, rules)
+    elements, snapshot, report = IncrementalExtractor(html, url, previous, rules).extract()
+
+    path = snapshot_path(output_dir, url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    if label:
+        timestamp = f"{timestamp}_{label}"
+    report_file = path.parent / f"changes_{timestamp}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'url': url,
+            'previous_snapshot': previous['created'] if previous else None,
+            'counts': {
+                'added': len(report['added']),
+                'removed': len(report['removed']),
+                'moved': len(report['moved']),
+                'modified': len(report['modified']),
+                'unchanged': report['unchanged'],
+                'reused_subtrees': report['reused_subtrees']
+            },
+            'added': report['added'],
+            'removed': report['removed'],
+            'moved': report['moved'],
+            'modified': report['modified']
+        }, f, indent=2, ensure_ascii=False)
+
+    if previous is None:
+        print(f"✓ No previous snapshot, extracted {len(elements)} elements")
+    else:
+        print(f"✓ Changes since last run: {len(report['added'])} added, {len(report['removed'])} removed, "
+              f"{len(report['moved'])} moved, {len(report['modified'])} modified, {report['unchanged']} unchanged")
+    print(f"✓ Change report saved to: {report_file}")
+
+    return elements
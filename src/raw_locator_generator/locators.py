@@ -0,0 +1,85 @@
+"""
+Locator validation and ranking
+Pick the shortest, most stable locator that matches exactly one element
+"""
+
+# Locator strategies in order of stability, most stable first
+LOCATOR_STRATEGIES = ('id', 'name', 'css', 'xpath')
+
+# Selenium By constant for each strategy
+SELENIUM_BY = {
+    'id': 'By.ID',
+    'name': 'By.NAME',
+    'css': 'By.CSS_SELECTOR',
+    'xpath': 'By.XPATH'
+}
+
+
+def locator_candidates(elem):
+    """Candidate locators of an element as [strategy, value] pairs"""
+    candidates = []
+    if elem['id']:
+        candidates.append(['id', elem['id']])
+    if elem['name']:
+        candidates.append(['name', elem['name']])
+    if elem['css_selector']:
+        candidates.append(['css', elem['css_selector']])
+    if elem['xpath']:
+        candidates.append(['xpath', elem['xpath']])
+    return candidates
+
+
+def rank_locators(elements, candidates, counts):
+    """Record match counts and the preferred unique locator on every element"""
+    for elem, elem_candidates, elem_counts in zip(elements, candidates, counts):
+        elem['locator_matches'] = {
+            strategy: count for (strategy, _), count in zip(elem_candidates, elem_counts)
+        }
+
+        unique = [
+            (LOCATOR_STRATEGIES.index(strategy), len(value), strategy, value)
+            for (strategy, value), count in zip(elem_candidates, elem_counts)
+            if count == 1
+        ]
+        if unique:
+            _, _, strategy, value = min(unique)
+            elem['preferred_locator'] = {'strategy': strategy, 'value': value}
+        else:
+            elem['preferred_locator'] = None
+
+    return elements
+
+
+def preferred_locator(elem):
+    """Return the validated (strategy, value) of an element, or None when it was not validated"""
+    preferred = elem.get('preferred_locator')
+    if not preferred:
+        return None
+    return preferred['strategy'], preferred['value']
+
+
+def element_context(elem):
+    """Hops from the top document to the root holding an element, as (kind, css selector) pairs
+
+    kind is 'frame' for an iframe whose document holds the element, or
+    'shadow' for a shadow host; elements of the top document have none.
+    """
+    return [tuple(hop) for hop in elem.get('context') or ()]
+
+
+def css_string(value):
+    """Quote a value for a CSS attribute selector"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def css_locator(strategy, value):
+    """CSS selector for an id, name or css locator
+
+    The same attribute selectors validate_locators counted, so ids that
+    are not CSS identifiers (1abc, a.b) still give a valid selector.
+    """
+    if strategy == 'id':
+        return f"[id={css_string(value)}]"
+    if strategy == 'name':
+        return f"[name={css_string(value)}]"
+    return value
@@ -0,0 +1,244 @@
+"""
+Run Metrics
+Per-phase wall and CPU time, counters (WebDriver commands, elements, bytes
+written) and peak memory, reported to hooks and saved as JSON or Prometheus text
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+METRICS_FORMATS = ('json', 'prometheus')
+
+METRICS_VERSION = 1
+
+# Prefix of every Prometheus metric name
+PROMETHEUS_PREFIX = 'raw_locator_generator'
+
+
+def peak_memory_bytes():
+    """Peak resident memory of this process, or None where the platform does not report it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_memory_bytes():
+    """Resident memory of this process now, falling back to the peak where it is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError, IndexError):
+        return peak_memory_bytes()
+
+
+class Metrics:
+    """Thread-safe collector shared by one or more DOMExtractorAgent instances
+
+    Hooks are callables receiving an event dict for every finished phase
+    ({'kind': 'phase', 'name', 'wall', 'cpu'}) and counter update
+    ({'kind': 'count', 'name', 'label', 'value'}). A Metrics pickled to a
+    worker process starts empty there; merge() adds its to_dict() back.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.phases = {}
+        self.counters = {}
+        self.peaks = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (Metrics, ())
+
+    def add_hook(self, hook):
+        """Register a callable(event); returns it so it can be used as a decorator"""
+        self.hooks.append(hook)
+        return hook
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                print(f"⚠ Metrics hook failed: {e}")
+
+    def record_phase(self, name, wall, cpu):
+        """Add one timed call of a phase"""
+        with self._lock:
+            phase = self.phases.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'max_wall': 0.0})
+            phase['calls'] += 1
+            phase['wall'] += wall
+            phase['cpu'] += cpu
+            phase['max_wall'] = max(phase['max_wall'], wall)
+        if self.hooks:
+            self._emit({'kind': 'phase', 'name': name, 'wall': wall, 'cpu': cpu})
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as one call of a phase; CPU time is the calling thread's"""
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+    def count(self, name, value=1, label=None):
+        """Add to a counter, optionally broken down by one label (e.g. the WebDriver command)"""
+        with self._lock:
+            self.counters[(name, label)] = self.counters.get((name, label), 0) + value
+        if self.hooks:
+            self._emit({'kind': 'count', 'name': name, 'label': label, 'value': value})
+
+    def instrument_driver(self, driver):
+        """Count and time every WebDriver command by wrapping driver.execute"""
+        execute = getattr(driver, 'execute', None)
+        if execute is None or getattr(execute, 'metrics', None) is self:
+            return driver
+
+        @wraps(execute)
+        def counted_execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self.count('webdriver_commands', 1, driver_command)
+                self.count('webdriver_seconds', time.perf_counter() - start, driver_command)
+
+        counted_execute.metrics = self
+        driver.execute = counted_execute
+        return driver
+
+    def merge(self, data):
+        """Add the to_dict() of another Metrics, e.g. from a worker process"""
+        with self._lock:
+            for name, stats in data.get('phases', {}).items():
+                phase = self.phases.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'max_wall': 0.0})
+                phase['calls'] += stats['calls']
+                phase['wall'] += stats['wall']
+                phase['cpu'] += stats['cpu']
+                phase['max_wall'] = max(phase['max_wall'], stats['max_wall'])
+            for name, values in data.get('counters', {}).items():
+                for label, value in values.items():
+                    key = (name, None if label == '' else label)
+                    self.counters[key] = self.counters.get(key, 0) + value
+            peak = data.get('peak_memory_bytes')
+            if peak:
+                self.peaks['worker_peak_memory_bytes'] = max(self.peaks.get('worker_peak_memory_bytes', 0), peak)
+
+    def to_dict(self):
+        """Snapshot of every metric; unlabelled counters are stored under the label ''"""
+        with self._lock:
+            counters = {}
+            for (name, label), value in sorted(self.counters.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                counters.setdefault(name, {})[label or ''] = value
+            data = {
+                'version': METRICS_VERSION,
+                'started': self.started,
+                'seconds': time.time() - self.started,
+                'phases': {name: dict(stats) for name, stats in self.phases.items()},
+                'counters': counters,
+                'peak_memory_bytes': peak_memory_bytes()
+            }
+            data.update(self.peaks)
+        return data
+
+    def to_prometheus(self):
+        """Every metric in the Prometheus text exposition format"""
+        data = self.to_dict()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            full_name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        phases = data['phases']
+        metric('phase_calls_total', 'counter', 'Calls of each pipeline phase',
+               [({'phase': name}, stats['calls']) for name, stats in phases.items()])
+        metric('phase_wall_seconds_total', 'counter', 'Wall time spent in each pipeline phase',
+               [({'phase': name}, stats['wall']) for name, stats in phases.items()])
+        metric('phase_cpu_seconds_total', 'counter', 'CPU time spent in each pipeline phase',
+               [({'phase': name}, stats['cpu']) for name, stats in phases.items()])
+
+        for name, values in data['counters'].items():
+            label_name = 'command' if name.startswith('webdriver_') else 'label'
+            metric(f"{name}_total", 'counter', f"Total {name.replace('_', ' ')}",
+                   [({label_name: label} if label else {}, value) for label, value in values.items()])
+
+        for name in ('peak_memory_bytes', 'worker_peak_memory_bytes'):
+            if data.get(name) is not None:
+                metric(name, 'gauge', f"{name.replace('_', ' ').capitalize()}", [({}, data[name])])
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, metrics_format=None):
+        """Save the metrics; the format defaults to Prometheus for .prom files and JSON otherwise"""
+        path = Path(path)
+        if metrics_format is None:
+            metrics_format = 'prometheus' if path.suffix == '.prom' else 'json'
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format: {metrics_format}")
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            if metrics_format == 'prometheus':
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    def print_summary(self):
+        """Print the time spent in every phase and the WebDriver command counts"""
+        data = self.to_dict()
+        print(f"\n{'='*60}")
+        print("METRICS")
+        print(f"{'='*60}")
+        for name, stats in sorted(data['phases'].items(), key=lambda item: -item[1]['wall']):
+            print(f"  {name:<32}{stats['calls']:>6} calls {stats['wall']:>9.3f}s wall {stats['cpu']:>9.3f}s cpu")
+        commands = data['counters'].get('webdriver_commands', {})
+        if commands:
+            print(f"  WebDriver commands: {sum(commands.values())} "
+                  f"({', '.join(f'{name} {count}' for name, count in sorted(commands.items(), key=lambda item: -item[1]))})")
+        for name in ('elements_interactive', 'elements_all', 'bytes_written', 'files_written'):
+            if name in data['counters']:
+                print(f"  {name.replace('_', ' ').capitalize()}: {sum(data['counters'][name].values())}")
+        if data['peak_memory_bytes']:
+            print(f"  Peak memory: {data['peak_memory_bytes'] / 2 ** 20:.1f} MB")
+        print(f"{'='*60}\n")
+
+
+def _escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def timed_phase(name, counter=None):
+    """Method decorator timing each call into self.metrics
+
+    counter also adds the length of the returned list to that counter.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.phase(name):
+                result = method(self, *args, **kwargs)
+            if counter is not None and isinstance(result, list):
+                self.metrics.count(counter, len(result))
+            return result
+        return wrapper
+    return decorator
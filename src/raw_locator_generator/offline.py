@@ -0,0 +1,598 @@
+"""
+Offline Mode
+Extract interactive elements from saved HTML snapshots with lxml, without a browser
+"""
+
+import sys
+import os
+import re
+import json
+import time
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import lxml.html
+from lxml import etree
+
+from .dom_extractor_agent import DOMExtractorAgent
+from .formats import write_manifest
+from .locators import locator_candidates, rank_locators
+from .roles import DEFAULT_ROLE_RULES, union_query
+
+# Elements whose content is never rendered, so it never shows up in WebElement.text
+NON_RENDERED_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title'}
+
+HTML_SUFFIXES = ('.html', '.htm')
+
+# The tag, tag#id and tag.class1.class2 selectors built by css_selector
+SIMPLE_CSS = re.compile(r'^([A-Za-z][\w-]*)(?:#([^\s.#\[\]\'"]+)|((?:\.[^\s.#\[\]\'"]+)+))?$')
+
+# The same selectors when every id and class is a plain CSS identifier, counted by LocatorIndex
+PLAIN_CSS = re.compile(r'^([A-Za-z][\w-]*)(?:#(-?[^\W\d][\w-]*)|((?:\.-?[^\W\d][\w-]*)+))?$')
+
+# The XPaths built by element_xpath: an id or /html/body anchor and positional steps
+GENERATED_XPATH = re.compile(r'^(?://\*\[@id="([^"]*)"\]|(/html/body))((?:/[A-Za-z][\w-]*\[\d+\])*)$')
+XPATH_STEP = re.compile(r'/([A-Za-z][\w-]*)\[(\d+)\]')
+
+
+def parse_html(html):
+    """Parse an HTML document (str or bytes) into an lxml tree root"""
+    if isinstance(html, bytes) and not html.strip():
+        html = b'<html><body></body></html>'
+    elif isinstance(html, str) and not html.strip():
+        html = '<html><body></body></html>'
+    return lxml.html.document_fromstring(html)
+
+
+def page_metadata(root):
+    """Read the page title and canonical URL from a parsed document"""
+    title = (root.findtext('.//title') or '').strip()
+
+    url = ''
+    for xpath in ('//link[@rel="canonical"]/@href', '//base/@href'):
+        found = root.xpath(xpath)
+        if found and found[0].strip():
+            url = found[0].strip()
+            break
+
+    return title, url
+
+
+def hides_subtree(node):
+    """Check whether the markup of an element hides it and everything inside it"""
+    if node.get('hidden') is not None:
+        return True
+    style = (node.get('style') or '').replace(' ', '').lower()
+    return 'display:none' in style or 'visibility:hidden' in style
+
+
+def _is_hidden(element):
+    """Check whether an element or one of its ancestors is hidden by markup"""
+    if element.tag == 'input' and (element.get('type') or '').lower() == 'hidden':
+        return True
+    node = element
+    while node is not None:
+        if hides_subtree(node):
+            return True
+        node = node.getparent()
+    return False
+
+
+def element_text(element, limit=100):
+    """Approximate the rendered text of an element the way WebElement.text reads it"""
+    if _is_hidden(element):
+        return ''
+
+    parts = []
+    length = 0
+    stack = [element]
+
+    # Walk the subtree in document order, stopping once enough text is collected
+    while stack and length <= limit * 2:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            length += len(node)
+            continue
+
+        for child in reversed(node):
+            if child.tail:
+                stack.append(child.tail)
+            if isinstance(child.tag, str) and child.tag not in NON_RENDERED_TAGS:
+                stack.append(child)
+
+        if node.text:
+            parts.append(node.text)
+            length += len(node.text)
+
+    return ' '.join(''.join(parts).split())[:limit]
+
+
+def sibling_position(element, positions):
+    """1-based position of an element among its same-tag siblings, computed once per parent"""
+    parent = element.getparent()
+    if parent is None:
+        return 1
+    if parent not in positions:
+        counts = {}
+        index = positions[parent] = {}
+        for child in parent:
+            if isinstance(child.tag, str):
+                counts[child.tag] = index[child] = counts.get(child.tag, 0) + 1
+    return positions[parent][element]
+
+
+def element_xpath(element, body, cache, positions):
+    """Generate the same XPath as the in-page getXPath helper, memoizing prefixes"""
+    chain = []
+    node = element
+    prefix = ''
+
+    # Climb until an ancestor whose path is already known or anchored by id/body
+    while node is not None:
+        if node in cache:
+            prefix = cache[node]
+            break
+        if node.get('id'):
+            prefix = cache[node] = f'//*[@id="{node.get("id")}"]'
+            break
+        if node is body:
+            prefix = cache[node] = '/html/body'
+            break
+        chain.append(node)
+        node = node.getparent()
+
+    for node in reversed(chain):
+        prefix = cache[node] = f"{prefix}/{node.tag}[{sibling_position(node, positions)}]"
+
+    return prefix
+
+
+def css_selector(element):
+    """Generate the same CSS selector as DOMExtractorAgent._get_css_selector"""
+    css = element.tag
+    if element.get('id'):
+        css += f"#{element.get('id')}"
+    elif element.get('class'):
+        classes = element.get('class').split()
+        css += '.' + '.'.join(classes[:2])  # Limit to first 2 classes
+    return css
+
+
+def element_record(element, roles, body, xpath_cache, positions, base_url='', text=None):
+    """Build the interactive element dict for one lxml element and its roles
+
+    text overrides the markup-based element_text, for engines that know what is rendered.
+    """
+    href = ''
+    if element.tag == 'a':
+        href = element.get('href')
+        if href is not None and base_url:
+            href = urljoin(base_url, href.strip())
+
+    return {
+        'type': roles[0],
+        'roles': roles,
+        'tag': element.tag,
+        'id': element.get('id') or '',
+        'class': element.get('class') or '',
+        'name': element.get('name') or '',
+        'text': element_text(element) if text is None else text,
+        'href': href,
+        'xpath': element_xpath(element, body, xpath_cache, positions),
+        'css_selector': css_selector(element)
+    }
+
+
+def classify_elements(root, rules=None):
+    """Yield (element, roles) for every element matching a role rule, in document order
+
+    Same rules and union query as the in-page extraction script.
+    """
+    rules = rules or DEFAULT_ROLE_RULES
+    tests = [(role, etree.XPath(f"boolean({predicate})")) for role, predicate in rules.items()]
+    for element in root.xpath(union_query(rules)):
+        yield element, [role for role, test in tests if test(element)]
+
+
+def extract_interactive_elements_from_html(html, base_url='', rules=None):
+    """Extract interactive elements from HTML in the same shape as extract_interactive_elements"""
+    root = parse_html(html) if isinstance(html, (str, bytes)) else html
+    body = root.find('body')
+    xpath_cache = {}
+    sibling_positions = {}
+
+    return [
+        element_record(element, roles, body, xpath_cache, sibling_positions, base_url)
+        for element, roles in classify_elements(root, rules)
+    ]
+
+
+def _css_to_xpath(selector):
+    """Translate a CSS selector to XPath, with a fallback for the tag#id / tag.class form we generate"""
+    try:
+        from lxml.cssselect import CSSSelector
+        return CSSSelector(selector).path
+    except ImportError:
+        pass
+
+    match = SIMPLE_CSS.match(selector)
+    if not match:
+        raise ValueError(f"Unsupported CSS selector: {selector}")
+    tag, element_id, classes = match.groups()
+    conditions = []
+    if element_id:
+        conditions.append(f"@id='{element_id}'")
+    for name in (classes or '').split('.')[1:]:
+        conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')")
+    return f"descendant-or-self::{tag}" + ''.join(f"[{condition}]" for condition in conditions)
+
+
+def count_locator_matches(root, strategy, value):
+    """Count the elements a locator matches in a parsed document, or -1 when it is invalid"""
+    try:
+        if strategy == 'id':
+            return int(root.xpath('count(//*[@id=$value])', value=value))
+        if strategy == 'name':
+            return int(root.xpath('count(//*[@name=$value])', value=value))
+        if strategy == 'css':
+            return len(root.xpath(_css_to_xpath(value)))
+        if strategy == 'xpath':
+            return len(root.xpath(value))
+    except Exception:
+        pass
+    return -1
+
+
+class LocatorIndex:
+    """Count locator matches in a parsed document from one pass over it
+
+    Ids, names and the tag, tag#id and tag.class selectors we generate are
+    counted from tallies, and generated XPaths are followed step by step
+    from their anchor, instead of searching the whole tree per locator.
+    Anything else falls back to count_locator_matches.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.by_id = {}
+        self.names = Counter()
+        self.tags = Counter()
+        self.tag_ids = Counter()
+        self.tag_classes = {}
+        self.children = {}
+
+        for element in root.iter():
+            if not isinstance(element.tag, str):
+                continue
+            self.tags[element.tag] += 1
+            element_id = element.get('id')
+            if element_id is not None:
+                self.by_id.setdefault(element_id, []).append(element)
+                self.tag_ids[element.tag, element_id] += 1
+            name = element.get('name')
+            if name is not None:
+                self.names[name] += 1
+            classes = element.get('class')
+            if classes and classes.strip():
+                self.tag_classes.setdefault(element.tag, Counter())[frozenset(classes.split())] += 1
+
+    def count(self, strategy, value):
+        """Number of elements a locator matches, or -1 when it is invalid"""
+        if strategy == 'id':
+            return len(self.by_id.get(value, ()))
+        if strategy == 'name':
+            return self.names[value]
+        if strategy == 'css':
+            match = PLAIN_CSS.match(value)
+            if match:
+                return self._count_css(*match.groups())
+        if strategy == 'xpath':
+            match = GENERATED_XPATH.match(value)
+            if match:
+                return self._count_xpath(*match.groups())
+        return count_locator_matches(self.root, strategy, value)
+
+    def _count_css(self, tag, element_id, classes):
+        if element_id is not None:
+            return self.tag_ids[tag, element_id]
+        if classes is None:
+            return self.tags[tag]
+        wanted = set(classes[1:].split('.'))
+        return sum(count for names, count in self.tag_classes.get(tag, {}).items() if wanted <= names)
+
+    def _count_xpath(self, anchor_id, body, steps):
+        if anchor_id is not None:
+            nodes = self.by_id.get(anchor_id, [])
+        elif self.root.tag == 'html':
+            nodes = [child for child in self.root if child.tag == 'body']
+        else:
+            nodes = []
+
+        for tag, position in XPATH_STEP.findall(steps):
+            nodes = [child for child in (self._child(node, tag, int(position)) for node in nodes) if child is not None]
+        return len(nodes)
+
+    def _child(self, parent, tag, position):
+        """The position-th child of parent with a tag, or None"""
+        if parent not in self.children:
+            by_tag = self.children[parent] = {}
+            for child in parent:
+                if isinstance(child.tag, str):
+                    by_tag.setdefault(child.tag, []).append(child)
+        same_tag = self.children[parent].get(tag, ())
+        return same_tag[position - 1] if 0 < position <= len(same_tag) else None
+
+
+def validate_locators_in_tree(root, elements):
+    """Offline counterpart of DOMExtractorAgent.validate_locators"""
+    index = LocatorIndex(root)
+    memo = {}
+    candidates = [locator_candidates(elem) for elem in elements]
+    counts = []
+    for elem_candidates in candidates:
+        elem_counts = []
+        for strategy, value in elem_candidates:
+            if (strategy, value) not in memo:
+                memo[strategy, value] = index.count(strategy, value)
+            elem_counts.append(memo[strategy, value])
+        counts.append(elem_counts)
+
+    return rank_locators(elements, candidates, counts)
+
+
+def _elements_by_xpath(root):
+    """Map the XPath of every body element to the element, with the caches used to build them"""
+    body = root.find('body')
+    xpath_cache = {}
+    positions = {}
+    by_xpath = {}
+    for element in (body.iter() if body is not None else ()):
+        if isinstance(element.tag, str):
+            by_xpath.setdefault(element_xpath(element, body, xpath_cache, positions), element)
+    return body, xpath_cache, positions, by_xpath
+
+
+def measure_elements_in_tree(root, elements, drop=False):
+    """Offline counterpart of DOMExtractorAgent.measure_elements
+
+    Without layout there is no geometry; 'actionable' comes from the markup:
+    hidden (attribute, inline style, type=hidden) or disabled elements are not.
+    """
+    body, xpath_cache, positions, by_xpath = _elements_by_xpath(root)
+
+    for elem in elements:
+        element = by_xpath.get(elem['xpath'])
+        elem['geometry'] = None
+        elem['actionable'] = None if element is None else (
+            not _is_hidden(element) and element.get('disabled') is None
+        )
+
+    if drop:
+        return [elem for elem in elements if elem['actionable'] is not False]
+    return elements
+
+
+def find_components_in_tree(root, elements):
+    """Offline counterpart of DOMExtractorAgent.find_components
+
+    Subtrees are fingerprinted with incremental.subtree_hashes.
+    """
+    from .incremental import subtree_hashes
+
+    body, xpath_cache, positions, by_xpath = _elements_by_xpath(root)
+    hashes = subtree_hashes(body) if body is not None else {}
+
+    # Entries are shared by every element below the same subtree
+    entries = {}
+    for elem in elements:
+        element = by_xpath.get(elem['xpath'])
+        subtrees = []
+        for node in (element.iterancestors() if element is not None else ()):
+            if node is body:
+                break
+            if node not in entries:
+                entries[node] = [
+                    element_xpath(node, body, xpath_cache, positions), node.tag, hashes[node].hex()[:16]
+                ]
+            subtrees.append(entries[node])
+        subtrees.reverse()
+        elem['subtrees'] = subtrees
+    return elements
+
+
+def page_subtree_hashes(path, base_url=None, rules=None):
+    """Hashes of the subtrees around the interactive elements of an HTML file, for ComponentIndex.preload"""
+    try:
+        root = parse_html(Path(path).read_bytes())
+    except (OSError, ValueError):
+        return set()
+    elements = extract_interactive_elements_from_html(root, base_url or '', rules)
+    return {digest for elem in find_components_in_tree(root, elements) for _, _, digest in elem['subtrees']}
+
+
+def find_html_files(sources):
+    """Expand files and directories into a sorted list of HTML files"""
+    files = []
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob('*') if p.suffix.lower() in HTML_SUFFIXES))
+        else:
+            files.append(path)
+    return files
+
+
+def process_html(html, source, output_dir='output', base_url=None, label=None, incremental=False,
+                 **agent_options):
+    """Run the full pipeline for one HTML document without a browser
+
+    agent_options are passed to the DOMExtractorAgent that saves the results.
+    """
+    agent = DOMExtractorAgent(**agent_options)
+    with agent.metrics.phase('parse_html'):
+        root = parse_html(html)
+    title, canonical_url = page_metadata(root)
+    url = base_url or canonical_url or source
+    metrics = agent.metrics
+
+    def extract():
+        with metrics.phase('extract_interactive_elements'):
+            if incremental:
+                from .incremental import extract_incremental
+                elements = extract_incremental(root, url, output_dir, label, agent.rules)
+            else:
+                elements = extract_interactive_elements_from_html(root, url, agent.rules)
+        metrics.count('elements_interactive', len(elements))
+        if agent.geometry:
+            with metrics.phase('measure_elements'):
+                elements = measure_elements_in_tree(root, elements, agent.actionable_only)
+        if agent.validate:
+            with metrics.phase('validate_locators'):
+                elements = validate_locators_in_tree(root, elements)
+        if agent.components is not None:
+            with metrics.phase('find_components'):
+                elements = find_components_in_tree(root, elements)
+        return elements
+
+    agent.page_url = url
+    agent.page_title = title
+    elements, saved_files, cached = agent.extract_and_save(
+        extract,
+        page_source=html,
+        output_dir=output_dir,
+        label=label
+    )
+
+    result = {
+        'source': source,
+        'url': url,
+        'title': title,
+        'element_count': len(elements),
+        'files': saved_files,
+        'cached': cached,
+        'data': agent.last_data
+    }
+    if agent.components is not None:
+        result['components'] = agent.last_components
+    return result
+
+
+def process_html_file(path, output_dir='output', base_url=None, label=None, incremental=False,
+                      **agent_options):
+    """Process one HTML file; used as the process pool task"""
+    path = Path(path)
+    result = {'source': str(path), 'status': 'failed', 'error': ''}
+    try:
+        html = path.read_bytes()
+        result.update(process_html(
+            html, path.resolve().as_uri(), output_dir, base_url, label, incremental, **agent_options
+        ))
+        result['status'] = 'ok'
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _process_html_file_in_worker(path, output_dir, base_url, label, incremental, agent_options):
+    """Process pool task: process_html_file, returning the worker's metrics with the result"""
+    result = process_html_file(path, output_dir, base_url, label, incremental, **agent_options)
+    if agent_options.get('metrics') is not None:
+        result['metrics'] = agent_options['metrics'].to_dict()
+    return result
+
+
+def run_offline(sources, workers=None, output_dir='output', base_url=None, incremental=False,
+                **agent_options):
+    """Process saved HTML files, directories or stdin ('-') across a process pool
+
+    agent_options (cache, validate, script_limit, output_format, ...) are
+    passed to the DOMExtractorAgent of every document.
+    """
+    print("=" * 60)
+    print("DOM ELEMENT EXTRACTOR AGENT - OFFLINE MODE")
+    print("=" * 60)
+
+    results = []
+    start = time.time()
+
+    if list(sources) == ['-']:
+        result = {'source': '<stdin>', 'status': 'failed', 'error': ''}
+        try:
+            result.update(process_html(
+                sys.stdin.buffer.read(), base_url or '', output_dir, base_url,
+                incremental=incremental, **agent_options
+            ))
+            result['status'] = 'ok'
+        except Exception as e:
+            result['error'] = str(e)
+        results.append(result)
+    else:
+        files = find_html_files(sources)
+        workers = workers or os.cpu_count() or 1
+        print(f"\nFiles: {len(files)} | Workers: {workers}")
+
+        labels = [f"{index:05d}_{path.stem[:50]}" for index, path in enumerate(files, 1)]
+        components = agent_options.get('components')
+        if workers == 1 or len(files) <= 1:
+            if components is not None:
+                components.preload(
+                    page_subtree_hashes(path, base_url, agent_options.get('rules')) for path in files
+                )
+            results = [
+                process_html_file(path, output_dir, base_url, label, incremental, **agent_options)
+                for path, label in zip(files, labels)
+            ]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                if components is not None:
+                    # Counted here first: every task gets its own copy of the index
+                    components.preload(executor.map(
+                        partial(page_subtree_hashes, base_url=base_url, rules=agent_options.get('rules')),
+                        files, chunksize=max(1, len(files) // (4 * workers))
+                    ))
+                futures = [
+                    executor.submit(
+                        _process_html_file_in_worker, path, output_dir, base_url, label, incremental, agent_options
+                    )
+                    for path, label in zip(files, labels)
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    # Metrics collected in a worker process come back with its result
+                    worker_metrics = result.pop('metrics', None)
+                    if worker_metrics is not None:
+                        agent_options['metrics'].merge(worker_metrics)
+                    results.append(result)
+
+    for result in results:
+        mark = '✓' if result['status'] == 'ok' else '✗'
+        detail = f"{result['element_count']} elements" if result['status'] == 'ok' else result['error']
+        print(f"{mark} {result['source']} ({detail})")
+
+    elapsed = time.time() - start
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    cached = sum(1 for result in results if result.get('cached'))
+
+    report_dir = Path(output_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_file = report_dir / f"offline_report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'cached': cached,
+            'seconds': round(elapsed, 3),
+            'results': results
+        }, f, indent=2, ensure_ascii=False)
+    manifest_file = write_manifest(output_dir, results)
+
+    print(f"\n✓ Processed {succeeded}/{len(results)} documents in {elapsed:.1f}s ({cached} from cache)")
+    print(f"✓ Report saved to: {report_file}")
+    print(f"✓ Manifest saved to: {manifest_file}\n")
+
+    return results
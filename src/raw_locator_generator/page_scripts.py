@@ -0,0 +1,645 @@
+"""
+In-page JavaScript used by the DOM Element Extractor Agent
+
+Each script runs in a single execute_script call so a whole page can be
+processed in one WebDriver round-trip instead of several per element.
+"""
+
+# Shared helpers injected ahead of the page scripts below. getXPath mirrors
+# DOMExtractorAgent._get_element_xpath so both paths produce the same XPath.
+_HELPERS = r"""
+function getXPath(element) {
+    if (element.id !== '')
+        return '//*[@id="' + element.id + '"]';
+    if (element === element.ownerDocument.body)
+        return '/html/body';
+
+    var ix = 0;
+    var siblings = element.parentNode.childNodes;
+    for (var i = 0; i < siblings.length; i++) {
+        var sibling = siblings[i];
+        if (sibling === element)
+            return getXPath(element.parentNode) + '/' + element.tagName.toLowerCase() + '[' + (ix + 1) + ']';
+        if (sibling.nodeType === 1 && sibling.tagName === element.tagName)
+            ix++;
+    }
+}
+
+function getCssSelector(element, tag) {
+    var css = tag;
+    var id = element.getAttribute('id');
+    var cls = element.getAttribute('class');
+    if (id) {
+        css += '#' + id;
+    } else if (cls) {
+        var classes = cls.split(/\s+/).filter(function (c) { return c; });
+        css += '.' + classes.slice(0, 2).join('.');
+    }
+    return css;
+}
+
+function getVisibleText(element, limit) {
+    // WebElement.text is empty for elements that are not rendered
+    if (!(element.offsetWidth || element.offsetHeight || element.getClientRects().length))
+        return '';
+    var text = (element.innerText || '').replace(/\u00a0/g, ' ').trim();
+    return text.substring(0, limit);
+}
+
+function getHref(element) {
+    if (!element.hasAttribute('href'))
+        return null;
+    return typeof element.href === 'string' ? element.href : element.getAttribute('href');
+}
+
+function measureElement(element) {
+    // Page geometry and whether a user could interact with the element: it has
+    // a size, lies on the page, is rendered visibly and is not disabled
+    var view = element.ownerDocument.defaultView;
+    var page = element.ownerDocument.documentElement;
+    var rect = element.getBoundingClientRect();
+    var style = view.getComputedStyle(element);
+    var x = rect.left + view.pageXOffset;
+    var y = rect.top + view.pageYOffset;
+
+    var sized = rect.width > 0 && rect.height > 0;
+    var onPage = x + rect.width > 0 && y + rect.height > 0 &&
+        x < Math.max(page.scrollWidth, view.innerWidth) && y < Math.max(page.scrollHeight, view.innerHeight);
+    var inViewport = sized && rect.bottom > 0 && rect.right > 0 &&
+        rect.top < view.innerHeight && rect.left < view.innerWidth;
+    var visible = element.checkVisibility
+        ? element.checkVisibility({'checkOpacity': true, 'checkVisibilityCSS': true,
+                                   'opacityProperty': true, 'visibilityProperty': true})
+        : style.visibility === 'visible' && parseFloat(style.opacity) > 0;
+
+    return {
+        'geometry': {
+            'x': Math.round(x),
+            'y': Math.round(y),
+            'width': Math.round(rect.width),
+            'height': Math.round(rect.height),
+            'in_viewport': inViewport
+        },
+        'actionable': sized && onPage && visible && style.pointerEvents !== 'none' && !element.disabled
+    };
+}
+
+function getUniqueSelector(element) {
+    // CSS path that matches only this element within its document or shadow root
+    var id = element.getAttribute('id');
+    if (id && element.getRootNode().querySelectorAll('#' + CSS.escape(id)).length === 1)
+        return '#' + CSS.escape(id);
+
+    var parts = [];
+    for (var node = element; node && node.nodeType === 1; node = node.parentNode) {
+        var part = node.tagName.toLowerCase();
+        var index = 1, count = 0;
+        var siblings = node.parentNode ? node.parentNode.children : [node];
+        for (var i = 0; i < siblings.length; i++) {
+            if (siblings[i].tagName !== node.tagName)
+                continue;
+            count++;
+            if (siblings[i] === node)
+                index = count;
+        }
+        if (count > 1)
+            part += ':nth-of-type(' + index + ')';
+        parts.unshift(part);
+    }
+    return parts.join(' > ');
+}
+
+function forEachNestedRoot(root, context, callback) {
+    // Open shadow roots and same-origin frame documents below root, depth first.
+    // context lists the [kind, selector] hops from the top document to the root.
+    var elements = root.querySelectorAll('*');
+    for (var i = 0; i < elements.length; i++) {
+        var element = elements[i];
+        if (element.shadowRoot) {
+            var shadowContext = context.concat([['shadow', getUniqueSelector(element)]]);
+            callback(element.shadowRoot, shadowContext);
+            forEachNestedRoot(element.shadowRoot, shadowContext, callback);
+        }
+        if (element.tagName === 'IFRAME' || element.tagName === 'FRAME') {
+            var doc = null;
+            try {
+                doc = element.contentDocument;
+            } catch (e) {}
+            if (doc && doc.documentElement) {
+                var frameContext = context.concat([['frame', getUniqueSelector(element)]]);
+                callback(doc, frameContext);
+                forEachNestedRoot(doc, frameContext, callback);
+            }
+        }
+    }
+}
+
+function resolveContext(context) {
+    // Document or shadow root reached by following the hops of a context
+    var root = document;
+    for (var i = 0; root && i < context.length; i++) {
+        var host = root.querySelector(context[i][1]);
+        if (!host)
+            return null;
+        root = context[i][0] === 'frame' ? host.contentDocument : host.shadowRoot;
+    }
+    return root;
+}
+
+function resolveTargets(targets) {
+    // Elements of [context, xpath, css] triples: by XPath when possible, else the first CSS match
+    var roots = {};
+    var elements = [];
+    for (var i = 0; i < targets.length; i++) {
+        var scope = targets[i][0] ? JSON.stringify(targets[i][0]) : '';
+        if (!(scope in roots))
+            roots[scope] = targets[i][0] ? resolveContext(targets[i][0]) : document;
+        var root = roots[scope];
+        var element = null;
+        try {
+            if (root && targets[i][1] && root.nodeType === 9)
+                element = root.evaluate(
+                    targets[i][1], root, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+                ).singleNodeValue;
+            if (root && !element && targets[i][2])
+                element = root.querySelector(targets[i][2]);
+        } catch (e) {
+            element = null;
+        }
+        elements.push(element);
+    }
+    return elements;
+}
+"""
+
+# Rule compilation and the element record shared by the extraction and harvesting scripts
+_EXTRACTION_HELPERS = _HELPERS + r"""
+function compileRules(rules, doc, compiled) {
+    // XPath expressions belong to one document, so frames get their own
+    for (var c = 0; c < compiled.length; c++) {
+        if (compiled[c][0] === doc)
+            return compiled[c][1];
+    }
+    var tests = [];
+    var predicates = [];
+    for (var r = 0; r < rules.length; r++) {
+        tests.push([rules[r][0], doc.createExpression('boolean(' + rules[r][1] + ')', null)]);
+        predicates.push('(' + rules[r][1] + ')');
+    }
+    var result = {
+        'tests': tests,
+        'query': '//*[' + predicates.join(' or ') + ']',
+        'any': doc.createExpression('boolean(' + predicates.join(' or ') + ')', null)
+    };
+    compiled.push([doc, result]);
+    return result;
+}
+
+function elementRecord(element, rules, context, geometry) {
+    var roles = [];
+    for (var t = 0; t < rules.tests.length; t++) {
+        if (rules.tests[t][1].evaluate(element, XPathResult.BOOLEAN_TYPE, null).booleanValue)
+            roles.push(rules.tests[t][0]);
+    }
+    var inShadow = context.length > 0 && context[context.length - 1][0] === 'shadow';
+    var tag = element.tagName.toLowerCase();
+    var record = {
+        'type': roles[0],
+        'roles': roles,
+        'tag': tag,
+        'id': element.getAttribute('id') || '',
+        'class': element.getAttribute('class') || '',
+        'name': element.getAttribute('name') || '',
+        'text': getVisibleText(element, 200),
+        'href': tag === 'a' ? getHref(element) : '',
+        'xpath': inShadow ? '' : getXPath(element) || '',
+        'css_selector': getCssSelector(element, tag)
+    };
+    if (context.length)
+        record['context'] = context;
+    if (geometry) {
+        var measured = measureElement(element);
+        record['geometry'] = measured['geometry'];
+        record['actionable'] = measured['actionable'];
+    }
+    return record;
+}
+"""
+
+# Collect the interactive elements with one union query over the [role, predicate]
+# rules passed as arguments[0] and return them as one JSON string. Every element
+# is visited once and tagged with all roles whose predicate holds. Text is
+# over-fetched a little so Python can apply the same [:100] slice as the
+# per-element path. With arguments[1] the open shadow roots and same-origin
+# frames are searched in the same pass; their elements carry a 'context' and
+# have no XPath inside shadow roots, which XPath cannot address. With
+# arguments[2] every element is also measured (see measureElement).
+EXTRACT_INTERACTIVE_ELEMENTS = _EXTRACTION_HELPERS + r"""
+var rules = arguments[0];
+var pierce = arguments[1];
+var geometry = arguments[2];
+var compiled = [];
+
+function matchingElements(root, compiledRules) {
+    if (root.nodeType === 9) {
+        var snapshot = root.evaluate(
+            compiledRules.query, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+        );
+        var found = [];
+        for (var j = 0; j < snapshot.snapshotLength; j++)
+            found.push(snapshot.snapshotItem(j));
+        return found;
+    }
+    // Shadow roots: XPath cannot search them, but can test each element
+    return Array.prototype.filter.call(root.querySelectorAll('*'), function (element) {
+        return compiledRules.any.evaluate(element, XPathResult.BOOLEAN_TYPE, null).booleanValue;
+    });
+}
+
+var results = [];
+
+function extractRoot(root, context) {
+    var compiledRules = compileRules(rules, root.nodeType === 9 ? root : root.ownerDocument, compiled);
+    var elements = matchingElements(root, compiledRules);
+
+    for (var j = 0; j < elements.length; j++) {
+        try {
+            results.push(elementRecord(elements[j], compiledRules, context, geometry));
+        } catch (e) {
+            continue;
+        }
+    }
+}
+
+extractRoot(document, []);
+if (pierce)
+    forEachNestedRoot(document, [], extractRoot);
+
+return JSON.stringify(results);
+"""
+
+# Every open shadow root and same-origin frame of the page as [context, kind, html]
+# entries, where html holds the root's own markup without its nested roots.
+COLLECT_NESTED_ROOTS = _HELPERS + r"""
+var roots = [];
+forEachNestedRoot(document, [], function (root, context) {
+    var kind = context[context.length - 1][0];
+    roots.push([context, kind, kind === 'frame' ? root.documentElement.outerHTML : root.innerHTML]);
+});
+return JSON.stringify(roots);
+"""
+
+# Count how many elements each candidate locator matches. arguments[0] is a
+# list of [strategy, value] lists per element; the result has the same shape
+# with a match count per candidate (-1 when the locator is invalid). Repeated
+# candidates are only evaluated once. arguments[1], when given, holds each
+# element's context (or null), and its locators are counted within that root.
+VALIDATE_LOCATORS = _HELPERS + r"""
+var candidates = arguments[0];
+var contexts = arguments[1] || [];
+var memo = {};
+var roots = {};
+
+function quote(value) {
+    return '"' + value.replace(/["\\]/g, '\\$&') + '"';
+}
+
+function countMatches(root, strategy, value) {
+    if (!root)
+        return 0;
+    try {
+        if (strategy === 'id')
+            return root.querySelectorAll('[id=' + quote(value) + ']').length;
+        if (strategy === 'name')
+            return root.querySelectorAll('[name=' + quote(value) + ']').length;
+        if (strategy === 'css')
+            return root.querySelectorAll(value).length;
+        if (strategy === 'xpath' && root.nodeType === 9)
+            return root.evaluate(
+                value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+            ).snapshotLength;
+    } catch (e) {}
+    return -1;
+}
+
+var results = [];
+for (var i = 0; i < candidates.length; i++) {
+    var scope = contexts[i] ? JSON.stringify(contexts[i]) : '';
+    if (!(scope in roots))
+        roots[scope] = contexts[i] ? resolveContext(contexts[i]) : document;
+    var counts = [];
+    for (var j = 0; j < candidates[i].length; j++) {
+        var key = scope + '\u0000' + candidates[i][j][0] + '\u0000' + candidates[i][j][1];
+        if (!(key in memo))
+            memo[key] = countMatches(roots[scope], candidates[i][j][0], candidates[i][j][1]);
+        counts.push(memo[key]);
+    }
+    results.push(counts);
+}
+
+return JSON.stringify(results);
+"""
+
+# Measure elements extracted without element references (snapshot, incremental
+# and per-element engines) in one pass. arguments[0] holds a [context, xpath,
+# css] triple per element, resolved by XPath when possible and otherwise by the
+# first CSS match; the result has a measureElement result or null for each.
+MEASURE_ELEMENTS = _HELPERS + r"""
+var elements = resolveTargets(arguments[0]);
+var results = [];
+for (var i = 0; i < elements.length; i++) {
+    try {
+        results.push(elements[i] ? measureElement(elements[i]) : null);
+    } catch (e) {
+        results.push(null);
+    }
+}
+return JSON.stringify(results);
+"""
+
+# Subtrees around every element, resolved like MEASURE_ELEMENTS: the [xpath,
+# tag, hash] of each ancestor below the body, outermost first. The hash covers
+# the tag, attributes, text and child hashes, like incremental.subtree_hashes.
+# Returns {'subtrees': [...], 'chains': [[indices into subtrees], ...]}.
+FIND_COMPONENTS = _HELPERS + r"""
+var hashes = new Map();
+var entries = new Map();
+var subtrees = [];
+
+function hashString(text) {
+    // cyrb53: two 32-bit lanes, returned as 16 hex digits
+    var h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (var i = 0; i < text.length; i++) {
+        var ch = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return ('0000000' + (h2 >>> 0).toString(16)).slice(-8) + ('0000000' + (h1 >>> 0).toString(16)).slice(-8);
+}
+
+function subtreeHash(node) {
+    if (hashes.has(node))
+        return hashes.get(node);
+    var parts = [node.tagName.toLowerCase()];
+    var attributes = [];
+    for (var a = 0; a < node.attributes.length; a++)
+        attributes.push(node.attributes[a].name + '=' + node.attributes[a].value);
+    parts.push(attributes.sort().join('\0'));
+    for (var child = node.firstChild; child; child = child.nextSibling) {
+        if (child.nodeType === 1)
+            parts.push('\2' + subtreeHash(child));
+        else if (child.nodeType === 3)
+            parts.push('\1' + child.data);
+    }
+    var digest = hashString(parts.join('\0'));
+    hashes.set(node, digest);
+    return digest;
+}
+
+function subtreeChain(element) {
+    var chain = [];
+    for (var node = element.parentElement; node && node !== node.ownerDocument.body; node = node.parentElement) {
+        // Shadow roots cannot be addressed by XPath
+        if (node.tagName === 'HTML' || !node.ownerDocument.contains(node))
+            break;
+        if (!entries.has(node)) {
+            entries.set(node, subtrees.length);
+            subtrees.push([getXPath(node), node.tagName.toLowerCase(), subtreeHash(node)]);
+        }
+        chain.push(entries.get(node));
+    }
+    return chain.reverse();
+}
+
+var elements = resolveTargets(arguments[0]);
+var chains = [];
+for (var i = 0; i < elements.length; i++) {
+    try {
+        chains.push(elements[i] ? subtreeChain(elements[i]) : []);
+    } catch (e) {
+        chains.push([]);
+    }
+}
+return JSON.stringify({'subtrees': subtrees, 'chains': chains});
+"""
+
+# Scroll harvesting state kept on the page between steps: the compiled rules,
+# the scroll container, the elements changed since the last step (fed by a
+# MutationObserver) and the signature each element was last reported with.
+_HARVEST_HELPERS = _EXTRACTION_HELPERS + r"""
+function scrollTarget(selector) {
+    if (selector)
+        return document.querySelector(selector);
+    var page = document.scrollingElement || document.documentElement;
+    if (page.scrollHeight > page.clientHeight + 1)
+        return page;
+
+    // Virtualized lists usually scroll inside their own container
+    var best = null;
+    var elements = document.body ? document.body.querySelectorAll('*') : [];
+    for (var i = 0; i < elements.length; i++) {
+        var element = elements[i];
+        if (element.scrollHeight <= element.clientHeight + 1)
+            continue;
+        var overflow = getComputedStyle(element).overflowY;
+        if ((overflow === 'auto' || overflow === 'scroll') &&
+                (!best || element.clientHeight * element.clientWidth > best.clientHeight * best.clientWidth))
+            best = element;
+    }
+    return best || page;
+}
+
+function harvestRecords(state, candidates) {
+    // Records of the candidates that are new or changed since they were last reported
+    var records = [];
+    for (var i = 0; i < candidates.length; i++) {
+        var element = candidates[i];
+        try {
+            if (!element.isConnected)
+                continue;
+            var record = elementRecord(element, state.rules, [], state.geometry);
+            var signature = JSON.stringify([
+                record['roles'], record['tag'], record['id'], record['class'],
+                record['name'], record['text'], record['href']
+            ]);
+            if (state.reported.get(element) === signature)
+                continue;
+            state.reported.set(element, signature);
+            records.push(record);
+        } catch (e) {
+            continue;
+        }
+    }
+    return records;
+}
+
+function matches(state, element) {
+    return state.rules.any.evaluate(element, XPathResult.BOOLEAN_TYPE, null).booleanValue;
+}
+
+function changedCandidates(state) {
+    // Matching elements at, below or above the nodes changed since the last step, in document order
+    var found = new Set();
+    var visited = new Set();
+    state.changed.forEach(function (node) {
+        if (!node.isConnected)
+            return;
+        for (var up = node; up && up.nodeType === 1 && !visited.has(up); up = up.parentElement) {
+            visited.add(up);
+            if (matches(state, up))
+                found.add(up);
+        }
+        var below = node.querySelectorAll('*');
+        for (var i = 0; i < below.length; i++) {
+            if (matches(state, below[i]))
+                found.add(below[i]);
+        }
+    });
+    state.changed = new Set();
+    return Array.from(found).sort(function (a, b) {
+        return a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1;
+    });
+}
+"""
+
+# Start harvesting: observe DOM changes and return the elements already on the
+# page. arguments are the [role, predicate] rules, the geometry flag and an
+# optional CSS selector of the scroll container (detected when omitted).
+HARVEST_START = _HARVEST_HELPERS + r"""
+var state = window.__rawLocatorHarvest;
+if (state)
+    state.observer.disconnect();
+
+state = window.__rawLocatorHarvest = {
+    'rules': compileRules(arguments[0], document, []),
+    'geometry': arguments[1],
+    'target': scrollTarget(arguments[2]),
+    'changed': new Set(),
+    'reported': new WeakMap(),
+    'last': Date.now()
+};
+if (!state.target)
+    throw new Error('Scroll container not found: ' + arguments[2]);
+
+state.observer = new MutationObserver(function (mutations) {
+    state.last = Date.now();
+    for (var i = 0; i < mutations.length; i++) {
+        var mutation = mutations[i];
+        var target = mutation.type === 'characterData' ? mutation.target.parentElement : mutation.target;
+        if (mutation.type === 'childList') {
+            for (var j = 0; j < mutation.addedNodes.length; j++) {
+                if (mutation.addedNodes[j].nodeType === 1)
+                    state.changed.add(mutation.addedNodes[j]);
+                else if (target && target.nodeType === 1)
+                    state.changed.add(target);
+            }
+        } else if (target && target.nodeType === 1) {
+            state.changed.add(target);
+        }
+    }
+});
+state.observer.observe(document, {'childList': true, 'subtree': true, 'characterData': true, 'attributes': true});
+
+var snapshot = document.evaluate(state.rules.query, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var elements = [];
+for (var i = 0; i < snapshot.snapshotLength; i++)
+    elements.push(snapshot.snapshotItem(i));
+
+return JSON.stringify({
+    'records': harvestRecords(state, elements),
+    'target': state.target === (document.scrollingElement || document.documentElement)
+        ? 'page' : getUniqueSelector(state.target)
+});
+"""
+
+# Async script: scroll the harvest container by arguments[0] pixels (90% of its
+# height when 0), wait until the DOM has been quiet for arguments[1] ms or
+# arguments[2] ms have passed, then return the new and changed elements.
+HARVEST_STEP = _HARVEST_HELPERS + r"""
+var step = arguments[0];
+var quietMs = arguments[1];
+var timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var state = window.__rawLocatorHarvest;
+
+if (!state) {
+    done(JSON.stringify({'error': 'Harvesting was not started on this page'}));
+} else {
+    var target = state.target;
+    var before = target.scrollTop;
+    var start = Date.now();
+    target.scrollTop = before + (step || Math.max(target.clientHeight * 0.9, 100));
+
+    var check = function () {
+        var now = Date.now();
+        if (now - Math.max(state.last, start) < quietMs && now - start < timeoutMs) {
+            setTimeout(check, Math.min(50, quietMs));
+            return;
+        }
+        done(JSON.stringify({
+            'records': harvestRecords(state, changedCandidates(state)),
+            'moved': target.scrollTop !== before,
+            'at_end': target.scrollTop + target.clientHeight >= target.scrollHeight - 2
+        }));
+    };
+    setTimeout(check, Math.min(50, quietMs));
+}
+"""
+
+# Stop observing and drop the harvest state from the page
+HARVEST_STOP = r"""
+var state = window.__rawLocatorHarvest;
+if (state) {
+    state.observer.disconnect();
+    delete window.__rawLocatorHarvest;
+}
+"""
+
+# Absolute URLs of every link in the document, each once, in document order
+COLLECT_LINKS = r"""
+var seen = new Set();
+var links = [];
+for (var i = 0; i < document.links.length; i++) {
+    // SVG links have an SVGAnimatedString href
+    var href = document.links[i].href;
+    if (typeof href === 'string' && href && !seen.has(href)) {
+        seen.add(href);
+        links.push(href);
+    }
+}
+return links;
+"""
+
+# Async script: resolve once the DOM has seen no mutations for arguments[0] ms
+# (and the document is no longer loading), or after arguments[1] ms at most.
+WAIT_FOR_DOM_QUIET = r"""
+var quietMs = arguments[0];
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var start = Date.now();
+var last = start;
+
+var observer = new MutationObserver(function () { last = Date.now(); });
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+function check() {
+    var now = Date.now();
+    var quiet = now - last >= quietMs && document.readyState !== 'loading';
+    if (quiet || now - start >= timeoutMs) {
+        observer.disconnect();
+        done({'quiet': quiet, 'elapsed': (now - start) / 1000});
+        return;
+    }
+    setTimeout(check, Math.min(50, quietMs));
+}
+
+setTimeout(check, Math.min(50, quietMs));
+"""
+
+# Number of resource timing entries and the document state, used to detect
+# network idle when Chrome performance logs are not available.
+RESOURCE_STATE = r"""
+return [performance.getEntriesByType('resource').length, document.readyState];
+"""
@@ -0,0 +1,114 @@
+"""
+Pipelined Saving
+Overlap the browser work of a run with script generation and disk writes:
+browser workers capture pages and hand them to save workers through a
+bounded queue, so every browser moves on to its next URL right away
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from functools import partial
+
+
+class SaveStage:
+    """Save workers fed by a bounded queue of captured pages
+
+    Browser threads navigate, extract and validate (see
+    DOMExtractorAgent.capture_page); the workers here generate the scripts,
+    write the data and script files and update the cache, each with its own
+    browserless agent from agent_factory. Handing a page over blocks while
+    queue_size pages are waiting, so the browsers slow down to the pace of
+    the writers instead of holding ever more pages in memory.
+    """
+
+    def __init__(self, agent_factory, workers=2, queue_size=None, output_dir='output', profiler=None):
+        if workers < 1:
+            raise ValueError("The save stage needs at least one worker")
+        self.workers = workers
+        self.queue_size = queue_size or 2 * workers
+        self.output_dir = output_dir
+        self.profiler = profiler
+        self.pages = queue.Queue(maxsize=self.queue_size)
+        self.stats = {'saved': 0, 'failed': 0, 'blocked': 0, 'blocked_seconds': 0.0, 'save_seconds': 0.0}
+        self._lock = threading.Lock()
+        self._threads = []
+        for number in range(workers):
+            thread = threading.Thread(
+                target=self._work, args=(agent_factory(),), name=f"save-worker-{number + 1}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, executor, capture, *args):
+        """Run capture(*args) on a browser thread of executor and queue the page it captured
+
+        capture returns a result dict holding the page under 'capture' and its
+        file label under 'label' when it was loaded. Returns a Future of the
+        result once the page is saved, or right away when it failed.
+        """
+        saved = Future()
+
+        def run():
+            try:
+                result = capture(*args)
+            except BaseException as e:
+                saved.set_exception(e)
+                return
+            if 'capture' in result:
+                self._put(result, saved)
+            else:
+                saved.set_result(result)
+
+        executor.submit(run)
+        return saved
+
+    def _put(self, result, saved):
+        try:
+            self.pages.put_nowait((result, saved))
+            return
+        except queue.Full:
+            pass
+        # Backpressure: the browser thread waits for a writer to catch up
+        start = time.time()
+        self.pages.put((result, saved))
+        with self._lock:
+            self.stats['blocked'] += 1
+            self.stats['blocked_seconds'] += time.time() - start
+
+    def _work(self, agent):
+        save = partial(self.profiler.run, agent.save_capture) if self.profiler else agent.save_capture
+        while True:
+            item = self.pages.get()
+            if item is None:
+                return
+            result, saved = item
+            start = time.time()
+            try:
+                result.update(save(result.pop('capture'), self.output_dir, result.pop('label')))
+            except Exception as e:
+                result.update(status='failed', error=f"Saving failed: {e}")
+            result['save_seconds'] = round(time.time() - start, 3)
+
+            with self._lock:
+                self.stats['saved' if result['status'] == 'ok' else 'failed'] += 1
+                self.stats['save_seconds'] += result['save_seconds']
+            saved.set_result(result)
+
+    def close(self):
+        """Save the pages still queued and stop the workers"""
+        for _ in self._threads:
+            # Sentinels queue behind the waiting pages, which are saved first
+            self.pages.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def snapshot(self):
+        """Counters of the stage, for the run report"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['blocked_seconds'] = round(stats['blocked_seconds'], 3)
+        stats['save_seconds'] = round(stats['save_seconds'], 3)
+        return dict(stats, workers=self.workers, queue_size=self.queue_size)
@@ -0,0 +1,168 @@
+"""
+Profiling
+Opt-in cProfile and sampling profilers for whole command runs, including the
+worker threads of batch mode
+"""
+
+import sys
+import time
+import threading
+from collections import Counter
+
+PROFILERS = ('cprofile', 'sampling')
+
+# Python 3.12+ profiles through sys.monitoring, so only one cProfile can be active per process
+SINGLE_CPROFILE = sys.version_info >= (3, 12)
+
+
+class CProfiler:
+    """cProfile for every thread that calls run(), merged into one pstats file by save()
+
+    Calls made while another thread holds the only cProfile allowed on
+    Python 3.12+ run unprofiled and are counted in unprofiled.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self.unprofiled = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def run(self, function, *args, **kwargs):
+        """Call function with the calling thread profiled"""
+        if getattr(self._local, 'active', False):
+            return function(*args, **kwargs)
+
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process
+            with self._lock:
+                self.unprofiled += 1
+            return function(*args, **kwargs)
+
+        self._local.active = True
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._local.active = False
+            with self._lock:
+                self.profiles.append(profile)
+
+    def save(self, path, top=20):
+        """Write the merged statistics (readable with pstats or snakeviz) and print the top entries"""
+        import pstats
+        if self.unprofiled:
+            print(f"⚠ {self.unprofiled} call(s) ran unprofiled while another thread held the only cProfile "
+                  f"Python {sys.version_info[0]}.{sys.version_info[1]} allows; use --profiler sampling")
+        if not self.profiles:
+            print("⚠ Nothing was profiled")
+            return None
+        stats = pstats.Stats(*self.profiles)
+        stats.dump_stats(str(path))
+        print(f"\n✓ Profile saved to: {path}")
+        stats.sort_stats('cumulative').print_stats(top)
+        return path
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread at a fixed interval while run() calls are active
+
+    save() writes collapsed stacks ("frame;frame;frame count" lines) as read
+    by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def run(self, function, *args, **kwargs):
+        """Call function while sampling; nested and concurrent calls share one sampler thread"""
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._sample, daemon=True)
+                self._thread.start()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                thread = self._thread if self._active == 0 else None
+                if thread is not None:
+                    self._stop.set()
+                    self._thread = None
+            if thread is not None:
+                thread.join()
+
+    def save(self, path, top=20):
+        """Write the collapsed stacks and print the functions most often on top of a stack"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"\n✓ Profile saved to: {path} ({self.samples} samples every {self.interval * 1000:g}ms)")
+
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        for frame, count in leaves.most_common(top):
+            print(f"  {count / total:>6.1%}  {frame}")
+        return path
+
+
+def create_profiler(kind='cprofile', threaded=False):
+    """Profiler for a --profiler choice
+
+    threaded runs do their work on several threads at once, which cProfile
+    cannot follow on Python 3.12+; they get the sampling profiler instead.
+    """
+    if kind == 'cprofile' and threaded and SINGLE_CPROFILE:
+        print("⚠ cProfile can only profile one thread at a time on Python 3.12+, "
+              "using the sampling profiler (collapsed stacks) for the worker threads")
+        return SamplingProfiler()
+    if kind == 'cprofile':
+        return CProfiler()
+    if kind == 'sampling':
+        return SamplingProfiler()
+    raise ValueError(f"Unknown profiler: {kind}")
+
+
+def profile_call(profiler, path, function, *args, threaded=False, **kwargs):
+    """Run function under profiler and save the profile even when it fails
+
+    With threaded, function hands its work to threads that call
+    profiler.run themselves, so the calling thread, which mostly waits for
+    them, is not profiled.
+    """
+    start = time.time()
+    try:
+        if threaded:
+            return function(*args, **kwargs)
+        return profiler.run(function, *args, **kwargs)
+    finally:
+        print(f"\n→ Profiled {time.time() - start:.1f}s")
+        profiler.save(path)
@@ -0,0 +1,135 @@
+"""
+Page readiness strategies
+Decide when a freshly loaded page is complete enough to extract
+"""
+
+import json
+import time
+
+from .page_scripts import RESOURCE_STATE, WAIT_FOR_DOM_QUIET
+
+# Built-in strategies; a callable predicate(driver) can be used instead
+READY_STRATEGIES = ('body', 'dom-quiet', 'network-idle')
+
+# Chrome performance log events that open and close a network request
+REQUEST_STARTED = 'Network.requestWillBeSent'
+REQUEST_ENDED = ('Network.loadingFinished', 'Network.loadingFailed')
+
+
+def wait_for_body(driver, timeout):
+    """Wait until <body> exists (the original behaviour); raises on timeout"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    WebDriverWait(driver, timeout).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    return True
+
+
+def wait_for_dom_quiet(driver, timeout, quiet_ms):
+    """Wait until an injected MutationObserver sees no DOM changes for quiet_ms"""
+    # The async script must be allowed to run for the whole bound
+    previous = None
+    try:
+        previous = driver.timeouts.script
+        if previous < timeout + 5:
+            driver.set_script_timeout(timeout + 5)
+    except Exception:
+        previous = None
+
+    try:
+        result = driver.execute_async_script(WAIT_FOR_DOM_QUIET, quiet_ms, int(timeout * 1000))
+    finally:
+        if previous is not None:
+            driver.set_script_timeout(previous)
+
+    return bool(result and result.get('quiet'))
+
+
+def drain_performance_log(driver):
+    """Discard buffered performance log entries, returning False when logging is not enabled"""
+    try:
+        driver.get_log('performance')
+        return True
+    except Exception:
+        return False
+
+
+def wait_for_network_idle(driver, timeout, quiet_ms, max_inflight=0):
+    """Wait until no more than max_inflight requests have been open for quiet_ms
+
+    Uses Chrome performance logs (enabled by setup_driver for this strategy)
+    and falls back to polling resource timing entries when they are missing.
+    """
+    deadline = time.time() + timeout
+    quiet_seconds = quiet_ms / 1000
+    inflight = set()
+    idle_since = None
+    use_log = True
+    last_state = None
+
+    while time.time() < deadline:
+        now = time.time()
+        if use_log:
+            try:
+                entries = driver.get_log('performance')
+            except Exception:
+                use_log = False
+                continue
+            for entry in entries:
+                try:
+                    message = json.loads(entry['message'])['message']
+                except (KeyError, ValueError):
+                    continue
+                request_id = message.get('params', {}).get('requestId')
+                if message.get('method') == REQUEST_STARTED:
+                    inflight.add(request_id)
+                elif message.get('method') in REQUEST_ENDED:
+                    inflight.discard(request_id)
+            busy = len(inflight) > max_inflight
+        else:
+            state = driver.execute_script(RESOURCE_STATE)
+            busy = state != last_state or state[1] != 'complete'
+            last_state = state
+
+        if busy:
+            idle_since = None
+        elif idle_since is None:
+            idle_since = now
+        elif now - idle_since >= quiet_seconds:
+            return True
+
+        time.sleep(min(0.1, quiet_seconds))
+
+    return False
+
+
+def wait_for_predicate(driver, timeout, predicate):
+    """Wait until predicate(driver) returns a truthy value"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if predicate(driver):
+                return True
+        except Exception:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def wait_for_ready(driver, strategy='body', timeout=10, quiet_ms=500):
+    """Block until the page is ready according to a strategy, never longer than timeout
+
+    Returns True when the condition was met and False when the upper bound was hit.
+    """
+    if callable(strategy):
+        return wait_for_predicate(driver, timeout, strategy)
+    if strategy == 'body':
+        return wait_for_body(driver, timeout)
+    if strategy == 'dom-quiet':
+        return wait_for_dom_quiet(driver, timeout, quiet_ms)
+    if strategy == 'network-idle':
+        return wait_for_network_idle(driver, timeout, quiet_ms)
+    raise ValueError(f"Unknown readiness strategy: {strategy}")
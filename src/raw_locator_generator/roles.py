@@ -0,0 +1,52 @@
+"""
+Interactive Element Roles
+Rules classifying interactive elements, evaluated with one union query per page
+"""
+
+# Role name -> XPath predicate tested on each element. An element is returned
+# once with every role whose predicate holds; its 'type' is the first of them.
+DEFAULT_ROLE_RULES = {
+    'buttons': "self::button or self::input[@type='button' or @type='submit']",
+    'links': "self::a[@href]",
+    'inputs': "self::input or self::textarea or self::select",
+    'clickable': "@onclick or @role='button'"
+}
+
+# ARIA widget roles that make any element interactive
+ARIA_WIDGET_ROLES = (
+    'link', 'checkbox', 'radio', 'switch', 'tab', 'menuitem', 'menuitemcheckbox',
+    'menuitemradio', 'option', 'combobox', 'textbox', 'searchbox', 'slider',
+    'spinbutton', 'treeitem'
+)
+
+# Opt-in rules for custom widgets built from generic elements
+EXTRA_ROLE_RULES = {
+    'aria_widgets': (
+        f"@role and contains(' {' '.join(ARIA_WIDGET_ROLES)} ', concat(' ', normalize-space(@role), ' '))"
+    ),
+    'focusable': "@tabindex and not(starts-with(normalize-space(@tabindex), '-'))",
+    'editable': "@contenteditable and translate(@contenteditable, 'FALSE', 'false') != 'false'"
+}
+
+
+def role_rules(extra=False, custom=None):
+    """Build an ordered rule set: the defaults, optionally the extra rules, then custom ones"""
+    rules = dict(DEFAULT_ROLE_RULES)
+    if extra:
+        rules.update(EXTRA_ROLE_RULES)
+    if custom:
+        rules.update(custom)
+    return rules
+
+
+def union_query(rules):
+    """Single XPath selecting every element that matches at least one rule, in document order"""
+    return '//*[' + ' or '.join(f"({predicate})" for predicate in rules.values()) + ']'
+
+
+def parse_role(value):
+    """Parse a NAME=XPATH command line rule"""
+    name, sep, predicate = value.partition('=')
+    if not sep or not name.strip() or not predicate.strip():
+        raise ValueError(f"Expected NAME=XPATH, got: {value}")
+    return name.strip(), predicate.strip()
@@ -0,0 +1,375 @@
+"""
+Extraction Service
+Long-running daemon serving the extraction pipeline over local HTTP or a Unix
+socket, with a pool of pre-warmed browsers behind a bounded request queue
+
+    POST /extract   {"url": ..., "deadline": 30, "elements": true, "scripts": true, "framework": null}
+    POST /generate  {"elements": [...], "framework": "all", "url": ..., "title": ...}
+    GET  /health    200 while the service accepts requests
+    GET  /stats     queue, request and latency statistics as JSON
+    GET  /metrics   phase and WebDriver metrics in the Prometheus text format
+"""
+
+import os
+import json
+import time
+import queue
+import signal
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .batch import DriverPool, process_with_pool
+from .components import component_elements
+from .dom_extractor_agent import DOMExtractorAgent
+from .formats import iter_elements
+from .generation import EMITTERS, SCRIPT_ELEMENT_LIMIT, generate_script_texts
+from .metrics import Metrics
+
+# Largest request body accepted, elements posted to /generate included
+MAX_BODY_BYTES = 64 * 2 ** 20
+
+# Requests whose latency is kept for the /stats percentiles
+LATENCY_WINDOW = 1000
+
+
+class ServiceError(Exception):
+    """A request the service answers with an HTTP error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    """One queued extraction and the deadline its caller waits until"""
+
+    def __init__(self, url, deadline):
+        self.url = url
+        self.deadline = deadline
+        self.queued = time.time()
+        self.done = threading.Event()
+        self.result = None
+        self.abandoned = False
+
+
+class ExtractionService:
+    """Warm DriverPool, worker threads and a bounded queue of extraction jobs
+
+    Requests beyond queue_size waiting jobs are rejected at once (503) instead
+    of piling up, and a job whose deadline passes is answered with 504; if it
+    has not started by then it is skipped. agent_options are passed to every
+    DOMExtractorAgent in the pool, whose browsers are replaced after
+    recycle_after URLs.
+    """
+
+    def __init__(self, workers=2, queue_size=16, timeout=60, retries=1, output_dir='output',
+                 incremental=False, profiler=None, recycle_after=None, **agent_options):
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.output_dir = output_dir
+        self.incremental = incremental
+        self.profiler = profiler
+        self.script_limit = agent_options.get('script_limit', SCRIPT_ELEMENT_LIMIT)
+        self.metrics = agent_options.pop('metrics', None) or Metrics()
+        self.pool = DriverPool(workers, timeout=timeout, agent_factory=partial(
+            DOMExtractorAgent, metrics=self.metrics, **agent_options
+        ), max_uses=recycle_after)
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.queue_size = queue_size
+        self.started = None
+        self.accepting = False
+        self.stats = {'accepted': 0, 'succeeded': 0, 'failed': 0, 'rejected': 0, 'expired': 0, 'skipped': 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.active = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """Launch every browser up front, then start the workers"""
+        print(f"→ Warming up {self.workers} browsers...")
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            agents = list(executor.map(lambda _: self.pool.acquire(), range(self.workers)))
+        for agent in agents:
+            self.pool.release(agent)
+        print(f"✓ {self.workers} browsers ready in {time.time() - start:.1f}s")
+
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"extract-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.started = time.time()
+        self.accepting = True
+
+    def stop(self):
+        """Stop accepting jobs, let the workers finish the current ones and quit the browsers"""
+        self.accepting = False
+        for _ in self._threads:
+            # Sentinels queue behind the waiting jobs, which are finished first
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.pool.close()
+
+    def submit(self, url, deadline=None):
+        """Queue an extraction; raises ServiceError(503) when the queue is full"""
+        if not self.accepting:
+            raise ServiceError(503, "Service is not accepting requests")
+        job = Job(url, time.time() + (deadline or self.timeout))
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self._count('rejected')
+            raise ServiceError(503, f"Queue full ({self.queue_size} requests waiting), retry later")
+        self._count('accepted')
+        return job
+
+    def extract(self, url, deadline=None):
+        """Queue an extraction and wait for it; raises ServiceError(504) past the deadline"""
+        job = self.submit(url, deadline)
+        if not job.done.wait(max(0.0, job.deadline - time.time())):
+            job.abandoned = True
+            self._count('expired')
+            raise ServiceError(504, f"Deadline exceeded after {time.time() - job.queued:.1f}s")
+        return job.result
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if job.abandoned or time.time() >= job.deadline:
+                # Nobody is waiting for the result any more
+                self._count('skipped')
+                continue
+
+            with self._lock:
+                self._sequence += 1
+                index = self._sequence
+                self.active += 1
+            try:
+                task = partial(self.profiler.run, process_with_pool) if self.profiler else process_with_pool
+                result = task(
+                    self.pool, job.url, index, self.timeout, self.retries, self.output_dir, self.incremental
+                )
+            except Exception as e:
+                result = {'url': job.url, 'status': 'failed', 'error': str(e)}
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+            result['queued_seconds'] = round(max(0.0, time.time() - job.queued - result.get('seconds', 0)), 3)
+            with self._lock:
+                self.stats['succeeded' if result['status'] == 'ok' else 'failed'] += 1
+                self.latencies.append(time.time() - job.queued)
+            job.result = result
+            job.done.set()
+
+    def health(self):
+        """Whether the service accepts requests, and its browser and queue state"""
+        workers_alive = sum(1 for thread in self._threads if thread.is_alive())
+        return {
+            'status': 'ok' if self.accepting and workers_alive == self.workers else 'unavailable',
+            'workers_alive': workers_alive,
+            'idle_browsers': self.pool.idle,
+            'queued': self.jobs.qsize(),
+            'active': self.active
+        }
+
+    def snapshot(self):
+        """Request counters, queue state and latency percentiles"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = dict(self.stats)
+            active = self.active
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+
+        return {
+            'uptime_seconds': round(time.time() - self.started, 3) if self.started else 0,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'queued': self.jobs.qsize(),
+            'active': active,
+            'requests': stats,
+            'browsers_recycled': self.pool.recycled,
+            'latency_seconds': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)},
+            'metrics': self.metrics.to_dict()
+        }
+
+    def extract_response(self, request):
+        """Body of a POST /extract response
+
+        The scripts saved for the page are returned by emitter name, their
+        paths under 'script_files' and their text under 'scripts'. A
+        'framework' regenerates the scripts for it from the elements, shared
+        components included, instead.
+        """
+        url = request.get('url')
+        if not url or not isinstance(url, str):
+            raise ServiceError(400, "'url' is required")
+        result = dict(self.extract(url, request.get('deadline')))
+        if result['status'] != 'ok':
+            raise ServiceError(502, result.get('error') or 'Extraction failed')
+
+        # The data file comes first, then one script per emitter folder
+        emitters = {emitter_class.folder: name for name, emitter_class in EMITTERS.items()}
+        result['script_files'] = {
+            emitters[Path(path).parent.name]: path
+            for path in result.get('files', [])[1:] if Path(path).parent.name in emitters
+        }
+
+        framework = request.get('framework')
+        if framework is None and request.get('scripts', True):
+            result['scripts'] = {
+                name: Path(path).read_text(encoding='utf-8') for name, path in result['script_files'].items()
+            }
+        if request.get('elements', True) or framework:
+            # Shared components are stored apart from the page data
+            elements = list(iter_elements(result['data']['path']))
+            for reference in result.get('components', []):
+                elements.extend(component_elements(reference['data']['path'], reference['root']))
+            if request.get('elements', True):
+                result['elements'] = elements
+            if framework:
+                result['scripts'] = generate_script_texts(
+                    elements, framework, result.get('url', ''), result.get('title', ''), self.script_limit
+                )
+        return result
+
+    def generate_response(self, request):
+        """Body of a POST /generate response: scripts for posted elements, no browser needed"""
+        elements = request.get('elements')
+        if not isinstance(elements, list):
+            raise ServiceError(400, "'elements' must be a list")
+        return {'scripts': generate_script_texts(
+            elements, request.get('framework', 'all'), request.get('url', ''), request.get('title', ''),
+            request.get('limit', self.script_limit)
+        )}
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Routes requests to the ExtractionService of the server"""
+
+    server_version = 'raw-locator-generator'
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        # Tell queued-out clients when to come back
+        headers = {'Retry-After': '1'} if status == 503 else None
+        self._send(status, {'error': message}, headers=headers)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            health = service.health()
+            self._send(200 if health['status'] == 'ok' else 503, health)
+        elif self.path == '/stats':
+            self._send(200, service.snapshot())
+        elif self.path == '/metrics':
+            self._send(200, service.metrics.to_prometheus(), 'text/plain; version=0.0.4')
+        else:
+            self._error(404, f"Unknown endpoint: {self.path}")
+
+    def do_POST(self):
+        routes = {'/extract': self.server.service.extract_response, '/generate': self.server.service.generate_response}
+        route = routes.get(self.path)
+        if route is None:
+            self._error(404, f"Unknown endpoint: {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_BODY_BYTES:
+                raise ServiceError(413, "Request body too large")
+            try:
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError as e:
+                raise ServiceError(400, f"Invalid JSON: {e}")
+            if not isinstance(request, dict):
+                raise ServiceError(400, "Request body must be a JSON object")
+            self._send(200, route(request))
+        except ServiceError as e:
+            self._error(e.status, str(e))
+        except Exception as e:
+            self._error(500, str(e))
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP over a Unix domain socket, one thread per connection"""
+
+    daemon_threads = True
+
+
+def create_server(service, host='127.0.0.1', port=8765, socket_path=None):
+    """HTTP server for a service, on a Unix socket when socket_path is given"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(host='127.0.0.1', port=8765, socket_path=None, queue_size=16, **service_options):
+    """Run the extraction service until interrupted (Ctrl+C or SIGTERM); returns []"""
+    print("=" * 60)
+    print("DOM ELEMENT EXTRACTOR AGENT - SERVICE MODE")
+    print("=" * 60)
+
+    service = ExtractionService(queue_size=queue_size, **service_options)
+    service.start()
+    server = create_server(service, host, port, socket_path)
+    address = socket_path or f"http://{host}:{server.server_address[1]}"
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, terminate)
+
+    print(f"✓ Listening on {address} (queue: {queue_size}, workers: {service.workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n→ Shutting down...")
+    finally:
+        server.server_close()
+        service.stop()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("✓ Service stopped")
+    return []
@@ -0,0 +1,280 @@
+"""
+Locator Verification
+Re-resolve stored locators against the live pages and report which still match
+exactly one element, which match several and which match none, with a
+suggested replacement for the ones that no longer work
+"""
+
+import json
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from .batch import DriverPool, run_with_pool
+from .components import component_elements
+from .dom_extractor_agent import DOMExtractorAgent
+from .formats import iter_elements
+from .locators import locator_candidates
+
+STATUSES = ('valid', 'ambiguous', 'broken')
+
+# Weight of each field when matching a stale element to one on the current page
+MATCH_WEIGHTS = {'id': 3, 'name': 3, 'text': 2, 'href': 2, 'class': 1, 'css_selector': 1, 'xpath': 1}
+
+# Lowest score accepted as the same element
+MIN_MATCH_SCORE = 3
+
+
+def locator_status(count):
+    """valid for exactly one match, ambiguous for several, broken for none or an invalid locator"""
+    if count == 1:
+        return 'valid'
+    return 'ambiguous' if count and count > 1 else 'broken'
+
+
+def load_pages(sources, url=None):
+    """Map every URL to its most recent stored data file
+
+    sources are run manifests (manifest_*.json), output directories holding
+    them, or element data files; data files and directories without a
+    manifest need url, which all of them are then checked against. Pages
+    referring to shared components map to a list of their data file and
+    a (data file, root) pair per component.
+    """
+    pages = {}
+    loose = []
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            manifests = sorted(path.glob('manifest_*.json'))
+            if manifests:
+                for manifest in manifests:
+                    _read_manifest(manifest, pages)
+            else:
+                data_dir = path / 'json_data' if (path / 'json_data').is_dir() else path
+                # Shared components belong to several pages, not to the newest one
+                loose.extend(
+                    candidate for candidate in data_dir.glob('dom_elements_*')
+                    if not candidate.name.endswith('.idx')
+                    and not candidate.name.startswith('dom_elements_component_')
+                )
+        elif path.name.startswith('manifest_') and path.suffix == '.json':
+            _read_manifest(path, pages)
+        else:
+            loose.append(path)
+
+    if loose:
+        if not url:
+            raise ValueError(f"{len(loose)} data file(s) without a manifest need --url")
+        # Timestamps in the file names sort chronologically; the newest wins
+        pages[url] = str(max(loose, key=lambda candidate: (candidate.stat().st_mtime, candidate.name)))
+    return pages
+
+
+def _read_manifest(manifest, pages):
+    """Add the pages of one manifest; later manifests replace earlier entries"""
+    with open(manifest, encoding='utf-8') as f:
+        data = json.load(f)
+    for page in data.get('pages', []):
+        url = page.get('url') or ''
+        if not url.startswith(('http://', 'https://')):
+            continue
+        paths = [page['data']['path']] + [
+            (data['components'][component['id']]['data']['path'], component['root'])
+            for component in page.get('components', [])
+        ]
+        missing = [path for path in _data_files(paths) if not Path(path).exists()]
+        if missing:
+            print(f"⚠ Data file of {url} no longer exists: {missing[0]}")
+            continue
+        pages[url] = paths if len(paths) > 1 else paths[0]
+
+
+def _data_files(paths):
+    """Data file paths of a load_pages entry list, without the component roots"""
+    return [path[0] if isinstance(path, tuple) else path for path in paths]
+
+
+def _stored_elements(paths):
+    """Elements of a page's data files, shared components placed at their root on the page"""
+    for path in paths:
+        if isinstance(path, tuple):
+            yield from component_elements(*path)
+        else:
+            yield from iter_elements(path)
+
+
+def _stored_locator(elem, candidates):
+    """The locator scripts were generated with: the stored preferred one, else the most stable candidate"""
+    preferred = elem.get('preferred_locator')
+    if preferred:
+        return preferred['strategy'], preferred['value']
+    # Candidates come most stable first
+    return tuple(candidates[0]) if candidates else None
+
+
+def _match_score(stored, current):
+    """How likely a current element is the stored one; 0 for different tags"""
+    if stored['tag'] != current['tag']:
+        return 0
+    return sum(
+        weight for field, weight in MATCH_WEIGHTS.items()
+        if stored.get(field) and stored.get(field) == current.get(field)
+    )
+
+
+def verify_elements(agent, elements, suggest=True, batch_size=None):
+    """Re-resolve the stored elements on the agent's current page in one batched evaluation
+
+    batch_size splits very large pages into one evaluation per that many
+    elements. Returns the per-status counts, the counts per strategy and the
+    elements whose locator is not valid any more, each with a suggested
+    replacement when one was found.
+    """
+    checked = [dict(elem) for elem in elements]
+    for elem in checked:
+        elem.pop('locator_matches', None)
+    stored = [_stored_locator(elem, locator_candidates(elem)) for elem in checked]
+
+    size = batch_size or len(checked)
+    for start in range(0, len(checked), size):
+        batch = checked[start:start + size]
+        agent.validate_locators(batch, quiet=True)
+        if 'locator_matches' not in batch[0]:
+            raise RuntimeError("Locators could not be evaluated on the page")
+
+    summary = dict.fromkeys(STATUSES, 0)
+    strategies = {}
+    problems = []
+    current = None
+
+    for index, (elem, locator) in enumerate(zip(checked, stored)):
+        for strategy, count in elem['locator_matches'].items():
+            by_status = strategies.setdefault(strategy, dict.fromkeys(STATUSES, 0))
+            by_status[locator_status(count)] += 1
+
+        count = elem['locator_matches'].get(locator[0], 0) if locator else 0
+        status = locator_status(count)
+        summary[status] += 1
+        if status == 'valid':
+            continue
+
+        problem = {
+            'index': index,
+            'tag': elem['tag'],
+            'text': elem['text'],
+            'locator': {'strategy': locator[0], 'value': locator[1]} if locator else None,
+            'matches': max(count, 0),
+            'status': status,
+            'suggestion': None
+        }
+        if elem['preferred_locator']:
+            # Another stored locator of the element is still unique
+            problem['suggestion'] = dict(elem['preferred_locator'], source='stored')
+        elif suggest:
+            if current is None:
+                # Extracted once per page, and only when a replacement is needed
+                current = agent.validate_locators(agent.extract_interactive_elements(), quiet=True)
+            best = max(current, key=lambda candidate: _match_score(elem, candidate), default=None)
+            if (best is not None and best.get('preferred_locator')
+                    and _match_score(elem, best) >= MIN_MATCH_SCORE):
+                problem['suggestion'] = dict(best['preferred_locator'], source='page')
+        problems.append(problem)
+
+    return {'elements': len(checked), 'locators': summary, 'strategies': strategies, 'problems': problems}
+
+
+def verify_page(agent, url, data_path, suggest=True, batch_size=None):
+    """Load a page and verify the elements stored for it; None when it does not load
+
+    data_path is one data file or a list of them (a page and its shared
+    components, see load_pages).
+    """
+    paths = [data_path] if isinstance(data_path, (str, Path)) else data_path
+    elements = list(_stored_elements(paths))
+    if not agent.navigate_to_url(url):
+        return None
+    report = verify_elements(agent, elements, suggest, batch_size)
+    files = [str(path) for path in _data_files(paths)]
+    report['data'] = files if len(files) > 1 else files[0]
+    report['suggested'] = sum(1 for problem in report['problems'] if problem['suggestion'])
+    return report
+
+
+def run_verify(pages, workers=4, timeout=60, retries=2, output_dir='output', suggest=True, strict=False,
+               batch_size=None, profiler=None, recycle_after=None, **agent_options):
+    """Verify every page across a pool of headless browsers and write a verification report
+
+    pages maps URLs to data files (see load_pages). With strict, pages with
+    broken locators get the status 'regressed' so the command fails.
+    batch_size is as for verify_elements; browsers are replaced after
+    recycle_after pages (see DriverPool).
+    """
+    print("=" * 60)
+    print("DOM ELEMENT EXTRACTOR AGENT - VERIFY MODE")
+    print("=" * 60)
+    print(f"\nPages: {len(pages)} | Workers: {workers} | Timeout: {timeout}s")
+
+    pool = DriverPool(
+        workers, timeout=timeout, agent_factory=partial(DOMExtractorAgent, **agent_options), max_uses=recycle_after
+    )
+    results = []
+    start = time.time()
+
+    def verify(url, data_path):
+        work = lambda agent: verify_page(agent, url, data_path, suggest, batch_size)
+        result = run_with_pool(pool, url, work, timeout, retries)
+        if strict and result['status'] == 'ok' and result['locators']['broken']:
+            result['status'] = 'regressed'
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            task = partial(profiler.run, verify) if profiler else verify
+            futures = [executor.submit(task, url, data_path) for url, data_path in pages.items()]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if 'locators' in result:
+                    counts = result['locators']
+                    mark = '✓' if not counts['broken'] and not counts['ambiguous'] else '⚠'
+                    print(f"{mark} [{len(results)}/{len(pages)}] {result['url']}: {counts['valid']} valid, "
+                          f"{counts['ambiguous']} ambiguous, {counts['broken']} broken")
+                else:
+                    print(f"✗ [{len(results)}/{len(pages)}] {result['url']}: {result['error']}")
+    except KeyboardInterrupt:
+        print("\n\n✗ Verification cancelled by user")
+    finally:
+        pool.close()
+
+    totals = dict.fromkeys(STATUSES, 0)
+    for result in results:
+        for status, count in result.get('locators', {}).items():
+            totals[status] += count
+    suggested = sum(result.get('suggested', 0) for result in results)
+    failed = sum(1 for result in results if 'locators' not in result)
+
+    report_dir = Path(output_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_file = report_dir / f"verify_report_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'pages': len(pages),
+            'failed': failed,
+            'locators': totals,
+            'suggested': suggested,
+            'seconds': round(time.time() - start, 3),
+            'results': results
+        }, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'='*60}")
+    print("VERIFY SUMMARY")
+    print(f"{'='*60}")
+    print(f"Pages checked: {len(results) - failed}/{len(pages)}")
+    print(f"Valid: {totals['valid']} | Ambiguous: {totals['ambiguous']} | Broken: {totals['broken']}")
+    print(f"Replacements suggested: {suggested}")
+    print(f"✓ Report saved to: {report_file}")
+    print(f"{'='*60}\n")
+
+    return results
@@ -0,0 +1,165 @@
+"""Tests for the driver pool and the per-URL retry loop, with fake browsers"""
+
+import threading
+import time
+
+import pytest
+
+from raw_locator_generator import batch
+from raw_locator_generator.batch import DriverPool, run_with_pool
+from raw_locator_generator.dom_extractor_agent import DOMExtractorAgent, WebDriverClosedError
+
+
+class FakeDriver:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.quit_calls = 0
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise RuntimeError('browser crashed')
+        return 'about:blank'
+
+    def quit(self):
+        self.quit_calls += 1
+        self.alive = False
+
+
+class Browsers:
+    """driver_factory recording every browser it launches"""
+
+    def __init__(self):
+        self.launched = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.launched) + 1)
+        self.launched.append(driver)
+        return driver
+
+    def pool(self, size=1, **options):
+        return DriverPool(size, timeout=0.05, agent_factory=lambda: DOMExtractorAgent(driver_factory=self), **options)
+
+
+def test_cleanup_does_not_relaunch_the_browser():
+    browsers = Browsers()
+    agent = DOMExtractorAgent(driver_factory=browsers)
+    agent.driver
+    agent.cleanup()
+
+    with pytest.raises(WebDriverClosedError):
+        agent.driver
+    assert len(browsers.launched) == 1
+    assert agent.setup_driver() is browsers.launched[1]
+    assert agent.driver is browsers.launched[1]
+
+
+def test_acquire_reuses_released_agents_and_waits_when_full():
+    browsers = Browsers()
+    pool = browsers.pool(size=1)
+    agent = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+
+    assert acquired == []
+    pool.release(agent)
+    waiter.join(1)
+    assert acquired == [agent]
+    assert len(browsers.launched) == 1
+
+    pool.release(agent)
+    pool.close()
+    assert browsers.launched[0].quit_calls == 1
+
+
+def test_agents_are_recycled_after_max_uses():
+    browsers = Browsers()
+    pool = browsers.pool(size=1, max_uses=2)
+    agents = []
+    for _ in range(3):
+        agent = pool.acquire()
+        agents.append(agent)
+        pool.release(agent)
+
+    assert agents[0] is agents[1] is not agents[2]
+    assert len(browsers.launched) == 2
+    assert browsers.launched[0].quit_calls == 1
+    assert pool.recycled == 1
+
+
+def test_failed_attempts_are_retried_with_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(batch.time, 'sleep', sleeps.append)
+    pool = Browsers().pool()
+
+    result = run_with_pool(pool, 'https://a.test/', lambda agent: None, timeout=1, retries=2, backoff=0.5)
+
+    assert (result['status'], result['attempts'], result['error']) == ('failed', 3, 'navigation failed')
+    assert sleeps == [0.5, 1.0]
+    assert pool.recycled == 0
+
+
+def test_crashed_browsers_are_replaced_before_the_retry():
+    browsers = Browsers()
+    pool = browsers.pool()
+
+    def work(agent):
+        if agent.driver.number == 1:
+            agent.driver.alive = False
+            raise RuntimeError('tab crashed')
+        return {'element_count': 3}
+
+    result = run_with_pool(pool, 'https://a.test/', work, timeout=1, backoff=0)
+
+    assert (result['status'], result['attempts'], result['element_count']) == ('ok', 2, 3)
+    assert len(browsers.launched) == 2
+    assert pool.recycled == 1
+
+
+def test_a_fired_watchdog_fails_the_attempt():
+    browsers = Browsers()
+    pool = browsers.pool()
+
+    def work(agent):
+        if agent.driver.number == 1:
+            # Hangs past the deadline, then carries on like extraction does
+            deadline = time.time() + 2
+            while agent.driver_started and time.time() < deadline:
+                time.sleep(0.01)
+            # The extraction fallbacks swallow errors and return what they found
+            try:
+                agent.driver.execute_script('return 1')
+            except Exception:
+                pass
+            return {'element_count': 0}
+        return {'element_count': 3}
+
+    result = run_with_pool(pool, 'https://a.test/', work, timeout=0.05, backoff=0)
+
+    assert (result['status'], result['attempts'], result['element_count']) == ('ok', 2, 3)
+    assert len(browsers.launched) == 2
+    assert browsers.launched[0].quit_calls == 1
+    assert pool.recycled == 1
+
+
+def test_a_replaced_driver_fails_the_attempt():
+    browsers = Browsers()
+    pool = browsers.pool()
+
+    def work(agent):
+        agent.setup_driver()
+        return {'element_count': 0}
+
+    result = run_with_pool(pool, 'https://a.test/', work, timeout=1, retries=0, backoff=0)
+
+    assert (result['status'], result['error']) == ('failed', 'browser replaced during the attempt')
+    assert pool.recycled == 1
@@ -0,0 +1,89 @@
+"""Tests for the content-addressed extraction cache"""
+
+import os
+import pickle
+import time
+
+from raw_locator_generator.cache import EVICT_MARKER, ExtractionCache
+
+ELEMENTS = [{'tag': 'button', 'id': 'buy'}]
+SCRIPTS = {'raw_elements': '# script'}
+
+
+def test_key_ignores_formatting_only_differences(tmp_path):
+    cache = ExtractionCache(tmp_path)
+    key = cache.key('https://a.test/', '<html>\n  <body> <p>Hi</p></body></html>')
+
+    assert key == cache.key('https://a.test/', '<html><body><p>Hi</p></body></html>')
+    assert key == cache.key('https://a.test/', b'<html><body><p>Hi</p></body></html>')
+    assert key != cache.key('https://a.test/', '<html><body><p>Hello</p></body></html>')
+    assert key != cache.key('https://b.test/', '<html><body><p>Hi</p></body></html>')
+    assert key != cache.key('https://a.test/', '<html><body><p>Hi</p></body></html>', variant='validate=False')
+
+
+def test_put_then_get(tmp_path):
+    cache = ExtractionCache(tmp_path)
+    key = cache.key('https://a.test/', '<p>Hi</p>')
+
+    assert cache.get(key) is None
+    cache.put(key, 'https://a.test/', ELEMENTS, SCRIPTS, ['out.json'], 'output')
+    entry = cache.get(key)
+
+    assert entry['elements'] == ELEMENTS
+    assert entry['scripts'] == SCRIPTS
+    assert entry['files'] == ['out.json']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = ExtractionCache(tmp_path, max_age_hours=1)
+    key = cache.key('https://a.test/', '<p>Hi</p>')
+    cache.put(key, 'https://a.test/', ELEMENTS, SCRIPTS)
+    path = cache._path(key)
+    old = time.time() - 2 * 3600
+    os.utime(path, (old, old))
+
+    assert cache.get(key) is None
+    assert not path.exists()
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = ExtractionCache(tmp_path, max_entries=2)
+    keys = [cache.key(f'https://a.test/{n}', '<p>Hi</p>') for n in range(3)]
+    for n, key in enumerate(keys):
+        cache.put(key, f'https://a.test/{n}', ELEMENTS, SCRIPTS)
+        stamp = time.time() - 100 + n
+        os.utime(cache._path(key), (stamp, stamp))
+
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) is not None and cache.get(keys[2]) is not None
+
+
+def test_copies_do_not_scan_the_directory_on_every_put(tmp_path, monkeypatch):
+    cache = ExtractionCache(tmp_path)
+    cache.put(cache.key('https://a.test/', 'first'), 'https://a.test/', ELEMENTS, SCRIPTS)
+    assert (tmp_path / EVICT_MARKER).exists()
+
+    scans = []
+    monkeypatch.setattr(ExtractionCache, 'evict', lambda self: scans.append(1))
+    # Offline worker processes each get a pickled copy that has not put anything yet
+    for n in range(5):
+        copy = pickle.loads(pickle.dumps(cache))
+        copy._puts = 0
+        copy.put(copy.key(f'https://a.test/{n}', 'page'), 'https://a.test/', ELEMENTS, SCRIPTS)
+
+    assert scans == []
+
+
+def test_eviction_runs_when_the_last_one_is_old(tmp_path, monkeypatch):
+    cache = ExtractionCache(tmp_path, evict_period=60)
+    (tmp_path / EVICT_MARKER).touch()
+    old = time.time() - 120
+    os.utime(tmp_path / EVICT_MARKER, (old, old))
+
+    scans = []
+    monkeypatch.setattr(ExtractionCache, 'evict', lambda self: scans.append(1))
+    cache.put(cache.key('https://a.test/', 'page'), 'https://a.test/', ELEMENTS, SCRIPTS)
+
+    assert scans == [1]
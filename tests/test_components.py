@@ -0,0 +1,145 @@
+"""Tests for shared-component discovery by subtree hash"""
+
+import pytest
+
+from raw_locator_generator.components import ComponentIndex, component_elements
+from raw_locator_generator.formats import iter_elements
+from raw_locator_generator.offline import (
+    extract_interactive_elements_from_html, find_components_in_tree, parse_html, process_html, run_offline
+)
+
+HEADER = """<div class="site-header"><a href="/">Home</a><a href="/shop">Shop</a>
+  <input name="q"></div>"""
+
+
+def page(body):
+    return f"<html><head><title>T</title></head><body>{HEADER}<main>{body}</main></body></html>"
+
+
+def tagged(html, url):
+    root = parse_html(html)
+    return find_components_in_tree(root, extract_interactive_elements_from_html(root, url))
+
+
+def test_subtrees_are_listed_outermost_first():
+    html = "<html><body><div><ul><li><a href='/a'>A</a></li></ul></div></body></html>"
+    elem, = tagged(html, 'https://a.test/')
+
+    assert [(xpath, tag) for xpath, tag, _ in elem['subtrees']] == [
+        ('/html/body/div[1]', 'div'), ('/html/body/div[1]/ul[1]', 'ul'), ('/html/body/div[1]/ul[1]/li[1]', 'li')
+    ]
+
+
+def test_subtree_hash_follows_the_content():
+    first, = tagged(page("<button>Buy</button>"), 'https://a.test/1')[-1:]
+    second, = tagged(page("<button>Sell</button>"), 'https://a.test/2')[-1:]
+    header = tagged(page("<button>Buy</button>"), 'https://a.test/1')[0]
+    other = tagged(page("<button>Sell</button>"), 'https://a.test/2')[0]
+
+    assert first['subtrees'][0][2] != second['subtrees'][0][2]
+    assert header['subtrees'][0] == other['subtrees'][0]
+
+
+def test_components_are_split_out_once_seen_on_two_pages():
+    index = ComponentIndex()
+    first_page, first_groups = index.split(tagged(page("<button>Buy</button>"), 'https://a.test/1'), 'https://a.test/1')
+    second_page, second_groups = index.split(tagged(page("<button>Sell</button>"), 'https://a.test/2'), 'https://a.test/2')
+
+    assert first_groups == {}
+    assert len(first_page) == 4
+    (_, root, tag, _), members = next(iter(second_groups.items()))
+    assert (root, tag) == ('/html/body/div[1]', 'div')
+    assert [elem['tag'] for elem in members] == ['a', 'a', 'input']
+    assert all(elem['component'] == root and 'subtrees' not in elem for elem in members)
+    assert [(elem['tag'], elem['component']) for elem in second_page] == [('button', None)]
+
+
+def test_saving_the_same_page_again_is_not_another_page():
+    index = ComponentIndex()
+    html = page("<nav><a href='/a'>A</a><a href='/b'>B</a></nav>")
+    for _ in range(3):
+        page_elements, groups = index.split(tagged(html, 'https://a.test/'), 'https://a.test/')
+
+    assert groups == {}
+    assert len(page_elements) == 5
+
+
+def test_components_below_min_elements_stay_on_the_page():
+    index = ComponentIndex(min_elements=4)
+    for url in ('https://a.test/1', 'https://a.test/2'):
+        page_elements, groups = index.split(tagged(page(f"<a href='{url}'>X</a>"), url), url)
+
+    assert groups == {}
+    assert all(elem['component'] is None for elem in page_elements)
+
+
+def test_process_html_saves_a_shared_component_once(tmp_path):
+    index = ComponentIndex()
+    results = [
+        process_html(page(f"<button>{name}</button>"), f"{name}.html", output_dir=tmp_path,
+                     base_url=f"https://a.test/{name}", label=name, validate=False, components=index)
+        for name in ('one', 'two', 'three')
+    ]
+
+    assert [result['data']['count'] for result in results] == [4, 1, 1]
+    assert results[0]['components'] == []
+    assert results[1]['components'] == results[2]['components']
+    reference, = results[1]['components']
+    assert reference['id'].startswith('div-') and reference['element_count'] == 3
+    assert len(list((tmp_path / 'json_data').glob('dom_elements_component_*'))) == 1
+
+
+def test_stored_locators_are_relative_to_the_component_root(tmp_path):
+    index = ComponentIndex()
+    banner = "<div class='banner'>Sale</div>"
+    results = [
+        process_html(html.replace('<body>', f'<body>{extra}'), f"{name}.html", output_dir=tmp_path,
+                     base_url=f"https://a.test/{name}", label=name, components=index)
+        for name, extra, html in [
+            ('one', banner, page("<button>A</button>")),
+            ('two', banner, page("<button>B</button>")),
+            ('three', '', page("<button>C</button>")),
+        ]
+    ]
+
+    second, = results[1]['components']
+    third, = results[2]['components']
+    assert (second['root'], third['root']) == ('/html/body/div[2]', '/html/body/div[1]')
+    stored = list(iter_elements(third['data']['path']))
+    assert [elem['xpath'] for elem in stored] == ['./a[1]', './a[2]', './input[1]']
+    assert not any('preferred_locator' in elem or 'locator_matches' in elem for elem in stored)
+    assert [elem['xpath'] for elem in component_elements(third['data']['path'], third['root'])] == [
+        '/html/body/div[1]/a[1]', '/html/body/div[1]/a[2]', '/html/body/div[1]/input[1]'
+    ]
+
+
+def test_counting_forgets_the_least_recently_seen_hashes():
+    index = ComponentIndex(max_hashes=2)
+    index.seen(['a', 'b'], 'https://a.test/1')
+    index.seen(['c'], 'https://a.test/1')
+
+    assert list(index.pages) == ['b', 'c']
+    assert index.seen(['a', 'c'], 'https://a.test/2') == {'c'}
+
+
+def test_preload_counts_every_page_up_front():
+    index = ComponentIndex()
+    index.preload([['a', 'b', 'b'], ['a'], ['c']])
+
+    assert index.seen(['a', 'b', 'c'], 'https://a.test/1') == {'a'}
+    assert index.pages == {}
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_offline_runs_find_the_same_components_with_any_worker_count(tmp_path, workers):
+    sources = tmp_path / 'pages'
+    sources.mkdir()
+    for name in ('one', 'two', 'three', 'four'):
+        (sources / f"{name}.html").write_text(page(f"<button>{name}</button>"))
+
+    results = run_offline([sources], workers=workers, output_dir=tmp_path / 'out', validate=False,
+                          components=ComponentIndex())
+
+    assert [result['data']['count'] for result in results] == [1, 1, 1, 1]
+    assert len({reference['id'] for result in results for reference in result['components']}) == 1
+    assert len(list((tmp_path / 'out' / 'json_data').glob('dom_elements_component_*'))) == 1
@@ -0,0 +1,120 @@
+"""Tests for the crawl scope and the resumable SQLite frontier"""
+
+import pytest
+
+from raw_locator_generator import crawl
+from raw_locator_generator.crawl import CrawlScope, Frontier, normalize_url, run_crawl
+
+SITE = {
+    'https://shop.test/': ['/a', '/b', 'https://other.test/', '/files/list.pdf', 'mailto:x@shop.test'],
+    'https://shop.test/a': ['/', '/a/1', '/b#reviews'],
+    'https://shop.test/b': ['/b/1?b=2&a=1'],
+    'https://shop.test/a/1': [],
+    'https://shop.test/b/1?a=1&b=2': [],
+}
+
+
+def test_normalize_url():
+    assert normalize_url('HTTPS://Shop.Test:443/a?b=2&a=1#top') == 'https://shop.test/a?a=1&b=2'
+    assert normalize_url('http://shop.test:8080') == 'http://shop.test:8080/'
+    assert normalize_url('../c', 'https://shop.test/a/b') == 'https://shop.test/c'
+    assert normalize_url('mailto:x@shop.test') is None
+    assert normalize_url('javascript:void(0)') is None
+
+
+def test_scope():
+    scope = CrawlScope('https://shop.test/', max_depth=2, path_prefix='/a', exclude=crawl.DEFAULT_EXCLUDE + ('*/private*',))
+
+    assert scope.allows('https://shop.test/a/1', 2)
+    assert not scope.allows('https://shop.test/a/1', 3)
+    assert not scope.allows('https://other.test/a', 1)
+    assert not scope.allows('https://shop.test/b', 1)
+    assert not scope.allows('https://shop.test/a/report.pdf', 1)
+    assert not scope.allows('https://shop.test/a/private/x', 1)
+    with pytest.raises(ValueError):
+        CrawlScope('ftp://shop.test/')
+
+
+def test_frontier_deduplicates_and_claims_shallowest_first(tmp_path):
+    frontier = Frontier(tmp_path / 'frontier.sqlite')
+
+    assert frontier.add(['https://shop.test/'], 0) == 1
+    assert frontier.add(['https://shop.test/b', 'https://shop.test/a'], 1) == 2
+    assert frontier.add(['https://shop.test/a', 'https://shop.test/'], 2) == 0
+    frontier.add(['https://shop.test/a/1'], 2)
+
+    assert [url for _, url, _ in frontier.claim(2)] == ['https://shop.test/', 'https://shop.test/b']
+    assert frontier.counts() == {'active': 2, 'pending': 2}
+    frontier.finish('https://shop.test/', {'status': 'ok', 'url': 'https://shop.test/'})
+    frontier.finish('https://shop.test/b', {'status': 'failed', 'url': 'https://shop.test/b'})
+
+    assert frontier.counts() == {'done': 1, 'failed': 1, 'pending': 2}
+    assert [result['status'] for result in frontier.results()] == ['ok', 'failed']
+    frontier.close()
+
+
+def test_reopening_requeues_interrupted_urls(tmp_path):
+    path = tmp_path / 'frontier.sqlite'
+    frontier = Frontier(path)
+    frontier.add(['https://shop.test/', 'https://shop.test/a'], 0)
+    frontier.claim(2)
+    frontier.finish('https://shop.test/', {'status': 'ok'})
+    frontier.close()
+
+    frontier = Frontier(path)
+    assert frontier.resumed == 1
+    assert frontier.counts() == {'done': 1, 'pending': 1}
+    assert [url for _, url, _ in frontier.claim(5)] == ['https://shop.test/a']
+    frontier.close()
+
+
+class FakeDriver:
+    def __init__(self, url):
+        self.url = url
+
+    def execute_script(self, script, *args):
+        return [normalize_url(link, self.url) or link for link in SITE.get(self.url, [])]
+
+
+class FakeAgent:
+    def __init__(self, url):
+        self.driver = FakeDriver(url)
+
+
+class FakePool:
+    recycled = 0
+
+    def __init__(self, workers, timeout=None, agent_factory=None, max_uses=None):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_browser(monkeypatch):
+    visits = []
+
+    def process(pool, url, index, timeout, retries, output_dir, incremental, on_page):
+        visits.append(url)
+        on_page(FakeAgent(url), {'url': url})
+        return {'status': 'ok', 'url': url, 'seconds': 0.0}
+
+    monkeypatch.setattr(crawl, 'DriverPool', FakePool)
+    monkeypatch.setattr(crawl, 'process_with_pool', process)
+    return visits
+
+
+def test_interrupted_crawl_resumes_where_it_stopped(tmp_path, fake_browser):
+    frontier = tmp_path / 'frontier.sqlite'
+    first = run_crawl('https://shop.test/', frontier, CrawlScope('https://shop.test/', max_pages=2),
+                      workers=1, output_dir=tmp_path)
+    assert [result['url'] for result in first] == ['https://shop.test/', 'https://shop.test/a']
+
+    # Same frontier, no page limit: only the pages not visited yet are loaded
+    second = run_crawl('https://shop.test/', frontier, CrawlScope('https://shop.test/'), workers=1, output_dir=tmp_path)
+    assert [result['url'] for result in second] == [
+        'https://shop.test/b', 'https://shop.test/a/1', 'https://shop.test/b/1?a=1&b=2'
+    ]
+    assert len(fake_browser) == len(set(fake_browser)) == 5
+    assert [result['depth'] for result in first + second] == [0, 1, 1, 2, 2]
@@ -0,0 +1,83 @@
+"""Tests pinning the one-pass full DOM extraction to the original per-tag walk"""
+
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+
+from raw_locator_generator.dom_extractor_agent import DOMExtractorAgent
+
+TRICKY = [
+    # Identical siblings share the position of the first one
+    '<ul><li>A</li><li>A</li><li>B</li><li><b>A</b></li><li>A</li></ul>',
+    '<div><p class="x">Same</p><p class="x">Same</p><p class="y">Same</p></div><div></div><div><p>1</p></div>',
+    # Nested text, whitespace and entities
+    '<p>  Hello <b> big </b>\n\t<i>world</i> &amp; <span>  </span>more  </p>',
+    '<div>a<div>b<div>c<div>d</div>e</div>f</div>g</div>',
+    '<button>\n   Buy\n   <span> now </span>\n</button><a href="/x">  </a>',
+    # Strings get_text leaves out or keeps per tag type
+    '<div>Text<!-- a comment --><script>var x = 1;</script><style>p {}</style><template><b>T</b></template></div>',
+    '<html><head><title> Title </title></head><body><noscript>No JS</noscript></body></html>',
+    # Markup html.parser keeps nested
+    '<select><option>A<option>B<option>A</select><p>one<p>two',
+    '<table><tr><td>1</td><td>1</td></tr><tr><td>1</td><td>1</td></tr></table>',
+    '<br><br/><img src="a.png"><input value="x"><input value="x">',
+    'plain text <b>only</b> here',
+    '',
+    '<div>' + 'x' * 150 + '<span>' + 'y' * 20 + '</span></div>',
+]
+
+
+def original_elements(html):
+    """extract_all_elements as first written: get_text and a walk up the parents for every tag"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def xpath(element):
+        steps = []
+        child = element
+        for parent in child.parents:
+            siblings = parent.find_all(child.name, recursive=False)
+            steps.append(child.name if len(siblings) == 1 else f"{child.name}[{siblings.index(child) + 1}]")
+            child = parent
+        steps.reverse()
+        return '/' + '/'.join(steps) if steps else ''
+
+    return [
+        {
+            'tag': element.name,
+            'id': element.get('id', ''),
+            'classes': element.get('class', []),
+            'attributes': dict(element.attrs),
+            'text': element.get_text(strip=True)[:100] if element.get_text(strip=True) else '',
+            'xpath': xpath(element)
+        }
+        for element in soup.find_all(True)
+    ]
+
+
+def random_document(rng, depth=0):
+    """Small documents with many repeated tags, texts and whitespace"""
+    parts = []
+    for _ in range(rng.randint(0, 4)):
+        choice = rng.random()
+        if choice < 0.3:
+            parts.append(rng.choice(['A', ' A ', '\n', '  ', 'B&amp;C', '']))
+        elif choice < 0.4:
+            parts.append(rng.choice(['<br>', '<!-- c -->', '<script>s()</script>', '<input value="v">']))
+        elif depth < 4:
+            tag = rng.choice(['div', 'p', 'span', 'li', 'b'])
+            attrs = rng.choice(['', ' class="x"', ' id="i"', ' class="x y"'])
+            parts.append(f"<{tag}{attrs}>{random_document(rng, depth + 1)}</{tag}>")
+    return ''.join(parts)
+
+
+@pytest.mark.parametrize('html', TRICKY)
+def test_full_extraction_matches_the_original_walk(html):
+    assert DOMExtractorAgent().extract_all_elements(html) == original_elements(html)
+
+
+def test_full_extraction_matches_the_original_walk_on_random_documents():
+    rng = random.Random(4)
+    for _ in range(150):
+        html = f"<html><body>{random_document(rng)}{random_document(rng)}</body></html>"
+        assert DOMExtractorAgent().extract_all_elements(html) == original_elements(html), html
@@ -0,0 +1,132 @@
+"""Tests for decoding CDP DOMSnapshot captures"""
+
+from raw_locator_generator.dom_snapshot import SNAPSHOT_STYLES, capture_snapshot, extract_from_snapshot
+
+
+def snapshot(nodes, boxes, scroll_y=0):
+    """Build a captureSnapshot result from (parent, type, name, value, attributes) nodes
+
+    boxes map a node to its layout (bounds, styles dict, client rect or None).
+    """
+    strings = []
+
+    def intern(value):
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+
+    layout = {'nodeIndex': [], 'bounds': [], 'styles': [], 'clientRects': []}
+    for index, (bounds, styles, client_rect) in boxes.items():
+        layout['nodeIndex'].append(index)
+        layout['bounds'].append(bounds)
+        layout['styles'].append([intern(styles.get(name, default)) for name, default in
+                                 zip(SNAPSHOT_STYLES, ('visible', '1', 'auto'))])
+        layout['clientRects'].append(client_rect or [])
+
+    return {
+        'strings': strings,
+        'documents': [{
+            'documentURL': intern('https://shop.test/'),
+            'baseURL': intern('https://shop.test/'),
+            'title': intern('Shop'),
+            'scrollOffsetX': 0,
+            'scrollOffsetY': scroll_y,
+            'contentWidth': 800,
+            'contentHeight': 2400,
+            'nodes': {
+                'parentIndex': [node[0] for node in nodes],
+                'nodeType': [node[1] for node in nodes],
+                'nodeName': [intern(node[2]) for node in nodes],
+                'nodeValue': [intern(node[3]) if node[3] else -1 for node in nodes],
+                'attributes': [[intern(part) for pair in node[4] for part in pair] for node in nodes]
+            },
+            'layout': layout
+        }]
+    }
+
+
+NODES = [
+    (-1, 9, '#document', '', []),
+    (0, 1, 'HTML', '', []),
+    (1, 1, 'BODY', '', []),
+    (2, 1, 'BUTTON', '', [('id', 'buy')]),
+    (3, 3, '#text', 'Buy', []),
+    (2, 1, 'BUTTON', '', [('disabled', '')]),
+    (5, 3, '#text', 'Off', []),
+    (2, 1, 'DIV', '', []),
+    (7, 1, 'A', '', [('href', '/ghost')]),
+    (8, 3, '#text', 'Ghost', []),
+    (2, 1, 'INPUT', '', [('name', 'q')]),
+    (2, 1, 'BUTTON', '', [('class', 'hidden')]),
+    (11, 3, '#text', 'Hidden', []),
+]
+
+BOXES = {
+    1: ([0, 0, 800, 2400], {}, [0, 0, 784, 600]),
+    2: ([0, 0, 800, 2400], {}, None),
+    3: ([10, 20, 100, 30.4], {}, None),
+    4: ([12, 25, 30, 20], {}, None),
+    5: ([10, 60, 100, 30], {}, None),
+    6: ([12, 65, 30, 20], {}, None),
+    7: ([0, 100, 800, 40], {'opacity': '0'}, None),
+    8: ([10, 110, 50, 20], {}, None),
+    9: ([10, 110, 50, 20], {}, None),
+    10: ([10, 2000, 200, 30], {'pointer-events': 'auto'}, None),
+    11: ([10, 140, 100, 30], {'visibility': 'hidden'}, None),
+}
+
+
+def by_text(elements):
+    return {elem['text'] or elem['tag']: elem for elem in elements}
+
+
+def test_elements_and_rendered_text():
+    elements = by_text(extract_from_snapshot(snapshot(NODES, BOXES)))
+
+    assert list(elements) == ['Buy', 'Off', 'Ghost', 'input', 'button']
+    assert elements['Buy']['xpath'] == '//*[@id="buy"]'
+    assert elements['Ghost']['href'] == 'https://shop.test/ghost'
+    assert 'geometry' not in elements['Buy']
+
+
+def test_geometry_comes_from_the_layout():
+    elements = by_text(extract_from_snapshot(snapshot(NODES, BOXES), geometry=True))
+
+    assert elements['Buy']['geometry'] == {'x': 10, 'y': 20, 'width': 100, 'height': 30, 'in_viewport': True}
+    assert elements['Buy']['actionable'] is True
+    assert elements['Off']['actionable'] is False        # disabled
+    assert elements['Ghost']['actionable'] is False      # transparent ancestor
+    assert elements['button']['actionable'] is False     # visibility:hidden
+
+    # Below the 600px viewport, but on the page
+    field = elements['input']
+    assert field['geometry']['in_viewport'] is False and field['actionable'] is True
+
+
+def test_scrolling_moves_the_viewport():
+    elements = by_text(extract_from_snapshot(snapshot(NODES, BOXES, scroll_y=1800), geometry=True))
+
+    assert elements['input']['geometry']['in_viewport'] is True
+    assert elements['Buy']['geometry']['in_viewport'] is False
+
+
+def test_elements_without_a_layout_box_are_not_actionable():
+    boxes = {index: box for index, box in BOXES.items() if index not in (3, 4)}
+    buy = extract_from_snapshot(snapshot(NODES, boxes), geometry=True)[0]
+
+    assert buy['id'] == 'buy' and buy['text'] == ''
+    assert buy['geometry'] == {'x': 0, 'y': 0, 'width': 0, 'height': 0, 'in_viewport': False}
+    assert buy['actionable'] is False
+
+
+def test_capture_requests_rects_only_for_geometry():
+    class Driver:
+        def execute_cdp_cmd(self, command, params):
+            self.call = (command, params)
+            return {}
+
+    driver = Driver()
+    capture_snapshot(driver)
+    assert driver.call == ('DOMSnapshot.captureSnapshot', {'computedStyles': SNAPSHOT_STYLES, 'includeDOMRects': False})
+    capture_snapshot(driver, geometry=True)
+    assert driver.call[1]['includeDOMRects'] is True
@@ -0,0 +1,109 @@
+"""Tests for the element data writers, readers and run manifests"""
+
+import json
+
+import pytest
+
+from raw_locator_generator import formats
+from raw_locator_generator.elements import DOMElement
+from raw_locator_generator.formats import (
+    ElementWriter, compression_of, data_filename, element_writer, format_of, iter_elements, read_element,
+    write_manifest
+)
+
+ELEMENTS = [
+    {'type': 'buttons', 'tag': 'button', 'id': 'buy', 'text': 'Buy – now', 'roles': ['buttons']},
+    {'type': 'links', 'tag': 'a', 'id': '', 'text': 'Cart', 'href': 'https://shop.test/cart'},
+    {'type': 'inputs', 'tag': 'input', 'id': '', 'text': '', 'geometry': {'x': 1, 'y': 2}},
+]
+
+def write(tmp_path, output_format, compression=None, elements=ELEMENTS, stream=False):
+    path = tmp_path / data_filename('t', output_format, compression)
+    writer = element_writer(path, output_format, compression)
+    writer.write_all(iter(elements) if stream else elements)
+    return path, writer.close()
+
+
+@pytest.mark.parametrize('output_format,compression', [
+    ('json', None), ('json', 'gzip'), ('jsonl', None), ('jsonl', 'gzip')
+])
+@pytest.mark.parametrize('stream', [False, True])
+def test_round_trip(tmp_path, output_format, compression, stream):
+    path, entry = write(tmp_path, output_format, compression, stream=stream)
+
+    assert list(iter_elements(path)) == ELEMENTS
+    assert (format_of(path), compression_of(path)) == (output_format, compression)
+    assert entry['count'] == 3 and entry['format'] == output_format and entry['compression'] == compression
+
+
+@pytest.mark.parametrize('output_format,compression,module', [
+    ('msgpack', None, 'msgpack'), ('msgpack', 'zstd', 'zstandard'),
+    ('jsonl', 'zstd', 'zstandard'), ('parquet', None, 'pyarrow')
+])
+def test_round_trip_with_optional_packages(tmp_path, output_format, compression, module):
+    pytest.importorskip(module)
+    if output_format == 'msgpack':
+        pytest.importorskip('msgpack')
+    path, _ = write(tmp_path, output_format, compression)
+
+    assert list(iter_elements(path)) == ELEMENTS
+
+
+def test_parquet_keeps_value_types_and_missing_keys(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setattr(formats, 'PARQUET_BATCH_SIZE', 2)
+    elements = [
+        {'tag': 'button', 'text': 'Buy', 'actionable': True, 'preferred_locator': {'strategy': 'id', 'value': 'b'},
+         'locator_matches': {'id': 1}, 'href': None},
+        {'tag': 'a', 'text': 'null', 'actionable': False, 'preferred_locator': None, 'locator_matches': {}},
+        # Third row: a later row group with a new key and a number in a text column
+        {'tag': 'input', 'text': 42, 'actionable': None, 'preferred_locator': None, 'component': '/html/body'},
+    ]
+    path, _ = write(tmp_path, 'parquet', elements=elements)
+
+    assert list(iter_elements(path)) == elements
+
+
+def test_json_writer_matches_json_dump(tmp_path):
+    path, _ = write(tmp_path, 'json', stream=True)
+    assert path.read_text(encoding='utf-8') == json.dumps(ELEMENTS, indent=2, ensure_ascii=False)
+
+    path, _ = write(tmp_path, 'json', elements=[], stream=True)
+    assert json.loads(path.read_text(encoding='utf-8')) == []
+
+
+def test_dom_elements_are_written_as_dicts(tmp_path):
+    element = DOMElement('a', 'home', ['nav'], {'href': '/'}, 'Home', '/html/body/a[1]')
+    path, _ = write(tmp_path, 'jsonl', elements=[element])
+
+    assert list(iter_elements(path)) == [element.to_dict()]
+
+
+def test_read_element_through_the_index(tmp_path):
+    path, entry = write(tmp_path, 'jsonl', stream=True)
+
+    assert entry['index'] == str(path) + '.idx'
+    assert [read_element(path, index) for index in (2, 0, 1)] == [ELEMENTS[2], ELEMENTS[0], ELEMENTS[1]]
+    with pytest.raises(IndexError):
+        read_element(path, 3)
+
+
+def test_writers_must_implement_write(tmp_path):
+    class Incomplete(ElementWriter):
+        output_format = 'json'
+
+    with pytest.raises(TypeError):
+        Incomplete(tmp_path / 'x.json')
+
+
+def test_manifests_of_runs_in_the_same_second_do_not_collide(tmp_path):
+    results = [{'status': 'ok', 'url': 'https://shop.test/', 'title': 'Shop', 'element_count': 3,
+                'data': {'path': 'dom_elements_t.json', 'format': 'json'}, 'files': []},
+               {'status': 'failed', 'url': 'https://shop.test/broken'}]
+    first = write_manifest(tmp_path, results)
+    second = write_manifest(tmp_path, results)
+
+    assert first != second
+    assert sorted(tmp_path.glob('manifest_*.json')) == [first, second]
+    manifest = json.loads(first.read_text(encoding='utf-8'))
+    assert [page['url'] for page in manifest['pages']] == ['https://shop.test/']
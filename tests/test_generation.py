@@ -0,0 +1,87 @@
+"""Tests for one-pass script generation through the registered emitters"""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from raw_locator_generator.generation import (
+    EMITTERS, ScriptEmitter, emitters_for, generate_script_texts, generate_scripts, register_emitter
+)
+
+# Output of the per-framework generate_raw_script methods the emitters replaced, for elements.json
+GOLDEN = Path(__file__).parent / 'golden'
+URL = 'https://shop.test/cart'
+TITLE = 'Shop – Cart'
+
+
+def golden(name):
+    return (GOLDEN / f'{name}.txt').read_text(encoding='utf-8')
+
+
+@pytest.fixture
+def elements():
+    return json.loads((GOLDEN / 'elements.json').read_text(encoding='utf-8'))
+
+
+def test_scripts_are_byte_identical_to_the_old_generators(elements):
+    scripts = generate_script_texts(elements, 'all', URL, TITLE)
+
+    assert list(scripts) == ['raw_elements', 'selenium', 'playwright', 'puppeteer', 'cypress', 'robot_framework']
+    for name, text in scripts.items():
+        assert text == golden(name), name
+
+
+def test_streaming_to_files_matches(elements, tmp_path):
+    files = {emitter_class(): open(tmp_path / emitter_class.name, 'w', encoding='utf-8')
+             for emitter_class in emitters_for('all')}
+    seen = []
+    count = generate_scripts(elements, files, URL, TITLE, observe=seen.append)
+    for f in files.values():
+        f.close()
+
+    # Every element is observed and written to the raw locators, past the script limit
+    assert count == len(seen) == len(elements) == 17
+    for emitter in files:
+        assert (tmp_path / emitter.name).read_text(encoding='utf-8') == golden(emitter.name)
+
+
+def test_framework_selection(elements):
+    assert list(generate_script_texts(elements, 'robot', URL, TITLE)) == ['raw_elements', 'robot_framework']
+    assert list(generate_script_texts(elements, 'cypress', URL, TITLE)) == ['raw_elements', 'cypress']
+
+
+def test_limit_none_includes_every_element(elements):
+    limited = generate_script_texts(elements, 'selenium', URL, TITLE)['selenium']
+    unlimited = generate_script_texts(elements, 'selenium', URL, TITLE, limit=None)['selenium']
+
+    assert limited.count('# BUTTONS:') + limited.count('# LINKS:') + limited.count('# INPUTS:') == 15
+    assert unlimited.count('# BUTTONS:') + unlimited.count('# LINKS:') + unlimited.count('# INPUTS:') == 17
+
+
+def test_components_are_listed_after_the_header(elements):
+    buffers = {EMITTERS['cypress'](): io.StringIO()}
+    generate_scripts(elements[:1], buffers, URL, TITLE, components=[
+        {'id': 'nav-0123456789', 'root': '/html/body/nav[1]', 'element_count': 4}
+    ])
+    text = next(iter(buffers.values())).getvalue()
+
+    assert "// SHARED COMPONENTS (saved once per run)\n" in text
+    assert ("// nav-0123456789: 4 elements in cypress_script_component_nav-0123456789.js, "
+            "XPaths relative to /html/body/nav[1]") in text
+    assert text.index('SHARED COMPONENTS') < text.index('BUTTONS')
+
+
+def test_registered_emitters_join_every_run(elements, monkeypatch):
+    monkeypatch.setattr('raw_locator_generator.generation.EMITTERS', dict(EMITTERS))
+
+    @register_emitter
+    class CountEmitter(ScriptEmitter):
+        name = 'count'
+        limited = False
+
+        def element(self, write, index, elem, preferred):
+            write(str(index))
+
+    assert generate_script_texts(elements, 'count')['count'] == '\n'.join(str(n) for n in range(1, 18))
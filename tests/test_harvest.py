@@ -0,0 +1,122 @@
+"""Tests for scroll harvesting, with a fake driver replaying scroll steps"""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from raw_locator_generator import harvest
+from raw_locator_generator.dom_extractor_agent import DOMExtractorAgent
+from raw_locator_generator.harvest import FingerprintIndex, HarvestProfile, harvest_elements
+from raw_locator_generator.page_scripts import HARVEST_START, HARVEST_STEP, HARVEST_STOP
+
+
+def row(n, **fields):
+    return dict({'type': 'links', 'tag': 'a', 'text': f"Row {n}", 'xpath': f"/html/body/ul[1]/li[{n}]/a[1]"}, **fields)
+
+
+class ScrollingDriver:
+    """Answers the harvest scripts: the first records, then one (records, moved) pair per step"""
+
+    def __init__(self, first, steps):
+        self.first = first
+        self.steps = list(steps)
+        self.stopped = False
+        self.timeouts = SimpleNamespace(script=30)
+
+    def execute_script(self, script, *args):
+        if script == HARVEST_START:
+            return json.dumps({'target': 'html', 'records': self.first})
+        if script == HARVEST_STOP:
+            self.stopped = True
+            return None
+        raise AssertionError('unexpected script')
+
+    def execute_async_script(self, script, *args):
+        assert script == HARVEST_STEP
+        if not self.steps:
+            return json.dumps({'error': 'no more steps'})
+        records, moved = self.steps.pop(0)
+        return json.dumps({'records': records, 'moved': moved, 'at_end': not moved})
+
+    def set_script_timeout(self, seconds):
+        self.timeouts.script = seconds
+
+
+def run(driver, profile):
+    stats = {}
+    agent = DOMExtractorAgent(driver=driver, validate=False)
+    return list(harvest_elements(agent, profile, stats)), stats
+
+
+def test_fingerprint_index_drops_records_already_seen():
+    index = FingerprintIndex()
+
+    assert index.add(row(1)) is True
+    assert index.add(row(1, geometry={'y': 500})) is False
+    assert index.add(row(1, text='Row 1 (edited)')) is True
+    assert index.add(row(2)) is True
+    assert len(index) == 3
+
+
+def test_budgets():
+    stats = {'elements': 10, 'steps': 3}
+    started = time.time()
+
+    assert HarvestProfile().budget_exceeded(stats, started) is None
+    assert HarvestProfile(max_elements=10).budget_exceeded(stats, started) == 'element budget'
+    assert HarvestProfile(max_steps=3).budget_exceeded(stats, started) == 'step budget'
+    assert HarvestProfile(max_seconds=5).budget_exceeded(stats, started - 10) == 'time budget'
+    assert HarvestProfile(max_seconds=None).budget_exceeded(stats, started - 10**6) is None
+
+
+def test_memory_budget(monkeypatch):
+    monkeypatch.setattr(harvest, 'current_memory_bytes', lambda: 300 * 2 ** 20)
+    stats = {'elements': 0, 'steps': 0}
+
+    assert HarvestProfile(max_memory_mb=256).budget_exceeded(stats, time.time()) == 'memory budget'
+    assert HarvestProfile(max_memory_mb=512).budget_exceeded(stats, time.time()) is None
+
+
+def test_idle_profile_needs_a_step():
+    with pytest.raises(ValueError):
+        HarvestProfile(idle_steps=0)
+
+
+def test_stops_after_idle_steps_at_the_end():
+    driver = ScrollingDriver([row(1), row(2)], [
+        ([row(2), row(3)], True),
+        # Still scrolling: repeated rows do not count as idle yet
+        ([row(3)], True),
+        ([row(3)], False),
+        # Late rows at the end start the count again
+        ([row(4)], False),
+        ([], False),
+        ([row(4)], False),
+        ([row(5)], False),
+    ])
+    elements, stats = run(driver, HarvestProfile(idle_steps=2))
+
+    assert [elem['text'] for elem in elements] == ['Row 1', 'Row 2', 'Row 3', 'Row 4']
+    assert (stats['steps'], stats['duplicates'], stats['stop_reason']) == (6, 4, 'no new content')
+    assert len(driver.steps) == 1
+    assert driver.stopped
+
+
+def test_max_elements_ends_the_harvest_mid_step():
+    driver = ScrollingDriver([row(1), row(2), row(3)], [([row(4), row(5), row(6)], True)] * 3)
+    elements, stats = run(driver, HarvestProfile(max_elements=4))
+
+    assert [elem['text'] for elem in elements] == ['Row 1', 'Row 2', 'Row 3', 'Row 4']
+    assert (stats['steps'], stats['elements'], stats['stop_reason']) == (1, 4, 'element budget')
+    assert driver.stopped
+
+
+def test_a_failed_step_keeps_what_was_harvested():
+    driver = ScrollingDriver([row(1)], [([row(2)], True)])
+    elements, stats = run(driver, HarvestProfile())
+
+    assert [elem['text'] for elem in elements] == ['Row 1', 'Row 2']
+    assert (stats['steps'], stats['stop_reason']) == (1, 'error')
+    assert driver.timeouts.script == 30
@@ -0,0 +1,91 @@
+"""Tests for incremental re-extraction against the previous snapshot"""
+
+import json
+
+from raw_locator_generator import incremental
+from raw_locator_generator.incremental import IncrementalExtractor, extract_incremental, load_snapshot
+from raw_locator_generator.offline import extract_interactive_elements_from_html
+
+URL = 'https://shop.test/'
+
+BEFORE = """<html><body>
+  <header><a href="/">Home</a><a href="/cart">Cart</a></header>
+  <main>
+    <section><button>Buy now</button><input name="qty"></section>
+    <section id="reviews"><button>Load more</button></section>
+  </main>
+</body></html>"""
+
+EDITS = {
+    'unchanged': BEFORE,
+    'text edited': BEFORE.replace('Load more', 'Show more'),
+    'element added': BEFORE.replace('<a href="/cart">', '<a href="/login">Login</a><a href="/cart">'),
+    'element removed': BEFORE.replace('<input name="qty">', ''),
+    'subtree moved': BEFORE.replace('<main>', '<main><div><a href="/help">Help</a></div>'),
+    'ancestor hidden': BEFORE.replace('<section><button>', '<div style="display:none"><section><button>')
+                             .replace('</section>\n    <section id', '</section></div>\n    <section id'),
+}
+
+
+def incremental_run(before, after):
+    _, snapshot, _ = IncrementalExtractor(before, URL).extract()
+    snapshot = json.loads(json.dumps(snapshot))
+    return IncrementalExtractor(after, URL, snapshot).extract()
+
+
+def test_matches_a_full_extraction_after_each_edit():
+    for name, after in EDITS.items():
+        elements, _, _ = incremental_run(BEFORE, after)
+        assert elements == extract_interactive_elements_from_html(after, URL), name
+
+
+def test_hiding_an_ancestor_drops_the_text_of_a_reused_subtree():
+    before = '<html><body><div><section><button>Buy now</button></section></div></body></html>'
+    after = '<html><body><div style="display:none"><section><button>Buy now</button></section></div></body></html>'
+
+    elements, _, report = incremental_run(before, after)
+    assert [elem['text'] for elem in elements] == ['']
+    assert len(report['modified']) == 1
+
+    # And showing it again brings the text back
+    _, snapshot, _ = IncrementalExtractor(after, URL).extract()
+    elements, _, _ = IncrementalExtractor(before, URL, json.loads(json.dumps(snapshot))).extract()
+    assert [elem['text'] for elem in elements] == ['Buy now']
+
+
+def test_report_sorts_changes():
+    _, _, report = incremental_run(BEFORE, EDITS['element added'])
+    assert [elem['href'] for elem in report['added']] == ['https://shop.test/login']
+    assert [move['to'] for move in report['moved']] == ['/html/body/header[1]/a[3]']
+
+    _, _, report = incremental_run(BEFORE, EDITS['element removed'])
+    assert [elem['name'] for elem in report['removed']] == ['qty']
+
+    _, _, report = incremental_run(BEFORE, EDITS['text edited'])
+    assert [change['after']['text'] for change in report['modified']] == ['Show more']
+
+
+def test_reused_subtrees_are_not_walked(monkeypatch):
+    _, snapshot, _ = IncrementalExtractor(BEFORE, URL).extract()
+    snapshot = json.loads(json.dumps(snapshot))
+    after = EDITS['subtree moved']
+
+    visited = []
+    element_xpath = incremental.element_xpath
+    monkeypatch.setattr(incremental, 'element_xpath', lambda node, *args: visited.append(node.tag) or element_xpath(node, *args))
+    _, new_snapshot, report = IncrementalExtractor(after, URL, snapshot).extract()
+
+    # Only the changed <main> chain and the roots of the reused subtrees get an XPath
+    assert 'button' not in visited and 'input' not in visited
+    assert report['reused_subtrees'] >= 3
+    assert new_snapshot['subtrees'] == IncrementalExtractor(after, URL).extract()[1]['subtrees']
+
+
+def test_extract_incremental_writes_the_snapshot(tmp_path):
+    extract_incremental(BEFORE, URL, output_dir=tmp_path)
+    assert load_snapshot(tmp_path, URL) is not None
+    assert load_snapshot(tmp_path, URL, rules={'buttons': ['//button']}) is None
+
+    elements = extract_incremental(EDITS['text edited'], URL, output_dir=tmp_path)
+    assert elements == extract_interactive_elements_from_html(EDITS['text edited'], URL)
+    assert len(list((tmp_path / 'json_data').glob('changes_*.json'))) >= 1
@@ -0,0 +1,64 @@
+"""Tests for locator ranking and the selectors built from validated locators"""
+
+from raw_locator_generator.generation import generate_script_texts
+from raw_locator_generator.locators import css_locator, locator_candidates, rank_locators
+
+
+def element(**fields):
+    elem = {'type': 'buttons', 'tag': 'button', 'id': '', 'name': '', 'class': '', 'text': 'Go',
+            'href': '', 'xpath': '', 'css_selector': ''}
+    elem.update(fields)
+    return elem
+
+
+def test_candidates_in_stability_order():
+    elem = element(id='go', name='go-name', css_selector='button#go', xpath='//*[@id="go"]')
+
+    assert locator_candidates(elem) == [
+        ['id', 'go'], ['name', 'go-name'], ['css', 'button#go'], ['xpath', '//*[@id="go"]']
+    ]
+    assert locator_candidates(element(xpath='/html/body/button[1]')) == [['xpath', '/html/body/button[1]']]
+
+
+def test_most_stable_unique_locator_wins():
+    elements = [
+        element(id='go', name='go', css_selector='button#go', xpath='//*[@id="go"]'),
+        element(id='dup', name='q', css_selector='button#dup', xpath='//*[@id="dup"]'),
+        element(css_selector='button.btn', xpath='/html/body/button[3]'),
+        element(css_selector='button', xpath='/html/body/button[4]'),
+    ]
+    candidates = [locator_candidates(elem) for elem in elements]
+    counts = [[1, 1, 1, 1], [2, 1, 2, 2], [3, 1], [4, -1]]
+    rank_locators(elements, candidates, counts)
+
+    assert [elem['preferred_locator'] for elem in elements] == [
+        {'strategy': 'id', 'value': 'go'},
+        {'strategy': 'name', 'value': 'q'},
+        {'strategy': 'xpath', 'value': '/html/body/button[3]'},
+        None
+    ]
+    assert elements[1]['locator_matches'] == {'id': 2, 'name': 1, 'css': 2, 'xpath': 2}
+
+
+def test_shorter_locator_wins_within_a_strategy():
+    elements = [element(xpath='/html/body/button[1]')]
+    rank_locators(elements, [[['xpath', '/html/body/div[1]/button[1]'], ['xpath', '//*[@id="a"]/button[1]']]], [[1, 1]])
+
+    assert elements[0]['preferred_locator'] == {'strategy': 'xpath', 'value': '//*[@id="a"]/button[1]'}
+
+
+def test_css_locator_emits_the_validated_attribute_selector():
+    assert css_locator('id', '1abc') == '[id="1abc"]'
+    assert css_locator('id', 'a.b') == '[id="a.b"]'
+    assert css_locator('name', 'say "hi"') == '[name="say \\"hi\\""]'
+    assert css_locator('name', 'a\\b') == '[name="a\\\\b"]'
+    assert css_locator('css', 'button.btn') == 'button.btn'
+
+
+def test_scripts_quote_validated_selectors():
+    elem = element(id="it's", preferred_locator={'strategy': 'id', 'value': "it's"})
+    scripts = generate_script_texts([elem])
+
+    assert "page.locator('[id=\"it\\'s\"]')" in scripts['playwright']
+    assert "find_element(By.ID, 'it\\'s')" in scripts['selenium']
+    assert "cy.get('[id=\"it\\'s\"]')" in scripts['cypress']
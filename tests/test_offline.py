@@ -0,0 +1,116 @@
+"""Tests for the browserless offline engine"""
+
+import json
+
+from raw_locator_generator.dom_extractor_agent import DOMExtractorAgent
+from raw_locator_generator.offline import (
+    LocatorIndex, count_locator_matches, element_text, extract_interactive_elements_from_html, find_html_files,
+    page_metadata, parse_html, process_html
+)
+
+PAGE = """<html><head><title>Shop</title><link rel="canonical" href="https://shop.test/"></head>
+<body>
+  <div id="main">
+    <button id="buy">Buy <b>now</b></button>
+    <a href="/cart">Cart</a>
+    <form><input name="q" type="text"><input type="hidden" name="token"></form>
+  </div>
+  <div><button class="btn primary large">First</button><button class="btn">Second</button></div>
+  <div style="display: none"><a href="/secret">Secret</a></div>
+</body></html>"""
+
+
+def by_text(elements):
+    return {elem['text'] or elem['name']: elem for elem in elements}
+
+
+def test_extracts_interactive_elements_in_document_order():
+    elements = extract_interactive_elements_from_html(PAGE, 'https://shop.test/')
+
+    assert [elem['tag'] for elem in elements] == ['button', 'a', 'input', 'input', 'button', 'button', 'a']
+    assert [elem['type'] for elem in elements][:3] == ['buttons', 'links', 'inputs']
+
+
+def test_records_match_the_in_page_script():
+    elements = by_text(extract_interactive_elements_from_html(PAGE, 'https://shop.test/'))
+
+    buy = elements['Buy now']
+    assert buy['id'] == 'buy'
+    assert buy['xpath'] == '//*[@id="buy"]'
+    assert buy['css_selector'] == 'button#buy'
+
+    cart = elements['Cart']
+    assert cart['xpath'] == '//*[@id="main"]/a[1]'
+    assert cart['href'] == 'https://shop.test/cart'
+
+    first = elements['First']
+    assert first['xpath'] == '/html/body/div[2]/button[1]'
+    assert first['css_selector'] == 'button.btn.primary'
+    assert elements['Second']['xpath'] == '/html/body/div[2]/button[2]'
+
+
+def test_hidden_elements_have_no_text():
+    root = parse_html(PAGE)
+
+    assert element_text(root.xpath('//a[@href="/secret"]')[0]) == ''
+    assert element_text(root.xpath('//input[@type="hidden"]')[0]) == ''
+    assert element_text(root.xpath('//*[@id="buy"]')[0]) == 'Buy now'
+
+
+def test_page_metadata():
+    assert page_metadata(parse_html(PAGE)) == ('Shop', 'https://shop.test/')
+    assert page_metadata(parse_html('')) == ('', '')
+
+
+def test_process_html_saves_data_and_scripts(tmp_path):
+    result = process_html(PAGE, 'page.html', output_dir=tmp_path, label='t', validate=False)
+
+    assert result['url'] == 'https://shop.test/'
+    assert result['title'] == 'Shop'
+    assert result['element_count'] == 7
+    with open(result['data']['path'], encoding='utf-8') as f:
+        assert len(json.load(f)) == 7
+    assert {path.split('/')[-2] for path in result['files'][1:]} == {
+        'raw_elements', 'selenium', 'playwright', 'puppeteer', 'cypress', 'robot_framework'
+    }
+
+
+def test_find_html_files(tmp_path):
+    (tmp_path / 'a.html').write_text(PAGE)
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'b.htm').write_text(PAGE)
+    (tmp_path / 'notes.txt').write_text('')
+
+    assert [path.name for path in find_html_files([tmp_path])] == ['a.html', 'b.htm']
+
+
+def test_full_dom_extraction_keeps_html_parser_paths():
+    # html.parser keeps unclosed <option> tags nested; lxml would make them siblings
+    html = '<html><body><select><option>A<option>B</select></body></html>'
+    elements = DOMExtractorAgent().extract_all_elements(html)
+
+    assert [elem['xpath'] for elem in elements if elem['tag'] == 'option'] == [
+        '/html/body/select/option', '/html/body/select/option/option'
+    ]
+
+
+def test_locator_index_counts_like_the_tree():
+    html = """<html><body>
+      <div id="a"><button class="btn primary">1</button><button class="primary btn x">2</button></div>
+      <div id="a"><button name="q">3</button><a id="1abc">4</a><a id="a.b">5</a></div>
+      <section><p><button>6</button></p></section>
+    </body></html>"""
+    root = parse_html(html)
+    index = LocatorIndex(root)
+    locators = [
+        ('id', 'a'), ('id', 'missing'), ('id', '1abc'), ('name', 'q'),
+        ('css', 'button'), ('css', 'button.btn.primary'), ('css', 'button.x'), ('css', 'div#a'),
+        ('css', 'a#1abc'), ('css', 'a#a.b'), ('css', 'button:first-child'),
+        ('xpath', '//*[@id="a"]'), ('xpath', '//*[@id="a"]/button[2]'), ('xpath', '//*[@id="a"]/button[3]'),
+        ('xpath', '/html/body'), ('xpath', '/html/body/section[1]/p[1]/button[1]'),
+        ('xpath', '/html/body/div[3]'), ('xpath', '//button['),
+    ]
+
+    assert [index.count(*locator) for locator in locators] == [
+        count_locator_matches(root, *locator) for locator in locators
+    ]
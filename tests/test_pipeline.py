@@ -0,0 +1,107 @@
+"""Tests for the save stage between the browsers and the writers"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from raw_locator_generator.pipeline import SaveStage
+
+
+class FakeSaver:
+    """Browserless agent whose save_capture records the page it saved"""
+
+    def __init__(self, gate=None, error=None, jitter=0):
+        self.gate = gate
+        self.error = error
+        self.jitter = jitter
+
+    def save_capture(self, capture, output_dir='output', label=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.jitter:
+            time.sleep(random.random() * self.jitter)
+        if self.error is not None:
+            raise self.error
+        return {'saved_url': capture['url'], 'label_saved': label, 'output_dir': output_dir}
+
+
+def capture(url):
+    return {'url': url, 'status': 'ok', 'capture': {'url': url}, 'label': url.rsplit('/', 1)[-1]}
+
+
+def test_a_full_queue_holds_the_browsers_back():
+    gate = threading.Event()
+    stage = SaveStage(lambda: FakeSaver(gate), workers=1, queue_size=1)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [stage.submit(executor, capture, f"https://a.test/{n}") for n in range(3)]
+        # One page is being saved, one waits in the queue and the third browser is blocked
+        deadline = time.time() + 2
+        while stage.pages.qsize() < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        assert stage.pages.qsize() == 1
+        assert not any(future.done() for future in futures)
+        gate.set()
+        results = [future.result(2) for future in futures]
+    stage.close()
+
+    assert [result['status'] for result in results] == ['ok'] * 3
+    stats = stage.snapshot()
+    assert stats['blocked'] == 1 and stats['blocked_seconds'] > 0
+    assert (stats['saved'], stats['queue_size']) == (3, 1)
+
+
+def test_close_saves_the_pages_still_queued():
+    gate = threading.Event()
+    stage = SaveStage(lambda: FakeSaver(gate), workers=1, queue_size=10)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [stage.submit(executor, capture, f"https://a.test/{n}") for n in range(5)]
+    gate.set()
+    stage.close()
+
+    assert all(future.done() for future in futures)
+    assert [future.result()['saved_url'] for future in futures] == [f"https://a.test/{n}" for n in range(5)]
+    assert stage.snapshot()['saved'] == 5
+
+
+def test_save_errors_reach_the_result_of_their_url():
+    stage = SaveStage(lambda: FakeSaver(error=OSError('disk full')), workers=2, output_dir='out')
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        saved = stage.submit(executor, capture, 'https://a.test/1')
+        failed = stage.submit(executor, lambda url: {'url': url, 'status': 'failed'}, 'https://a.test/2')
+
+        def crash(url):
+            raise RuntimeError('browser gone')
+
+        crashed = stage.submit(executor, crash, 'https://a.test/3')
+        result = saved.result(2)
+        assert failed.result(2) == {'url': 'https://a.test/2', 'status': 'failed'}
+        with pytest.raises(RuntimeError, match='browser gone'):
+            crashed.result(2)
+    stage.close()
+
+    assert (result['url'], result['status'], result['error']) == ('https://a.test/1', 'failed', 'Saving failed: disk full')
+    assert 'capture' not in result and 'save_seconds' in result
+    assert (stage.snapshot()['saved'], stage.snapshot()['failed']) == (0, 1)
+
+
+def test_results_line_up_with_their_urls_across_save_workers():
+    stage = SaveStage(lambda: FakeSaver(jitter=0.01), workers=3, queue_size=2, output_dir='out')
+    urls = [f"https://a.test/{n}" for n in range(30)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [stage.submit(executor, capture, url) for url in urls]
+        results = [future.result(5) for future in futures]
+    stage.close()
+
+    assert [result['url'] for result in results] == urls
+    assert all(result['saved_url'] == result['url'] for result in results)
+    assert all(result['label_saved'] == result['url'].rsplit('/', 1)[-1] for result in results)
+    assert stage.snapshot()['saved'] == 30
+
+
+def test_the_stage_needs_a_worker():
+    with pytest.raises(ValueError):
+        SaveStage(FakeSaver, workers=0)
@@ -0,0 +1,71 @@
+"""Tests for the cProfile and sampling profilers"""
+
+import cProfile
+import threading
+
+from raw_locator_generator import profiling
+from raw_locator_generator.profiling import CProfiler, SamplingProfiler, create_profiler, profile_call
+
+
+def work(n=2000):
+    return sum(i * i for i in range(n))
+
+
+def test_cprofiler_merges_the_profiles_of_every_thread(tmp_path):
+    profiler = CProfiler()
+    threads = [threading.Thread(target=profiler.run, args=(work,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # On Python 3.12+ a thread can find the other one's cProfile still active
+    assert len(profiler.profiles) + profiler.unprofiled == 2
+    assert profiler.save(tmp_path / 'run.prof') == tmp_path / 'run.prof'
+
+
+def test_calls_that_cannot_be_profiled_are_reported(tmp_path, monkeypatch, capsys):
+    class Busy(cProfile.Profile):
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile, 'Profile', Busy)
+    profiler = CProfiler()
+
+    assert profiler.run(work, 10) == work(10)
+    assert profiler.unprofiled == 1
+    profiler.save(tmp_path / 'run.prof')
+    assert '1 call(s) ran unprofiled' in capsys.readouterr().out
+
+
+def test_threaded_runs_use_the_sampler_when_cprofile_is_single(monkeypatch):
+    monkeypatch.setattr(profiling, 'SINGLE_CPROFILE', True)
+    assert isinstance(create_profiler('cprofile', threaded=True), SamplingProfiler)
+    assert isinstance(create_profiler('cprofile'), CProfiler)
+
+    monkeypatch.setattr(profiling, 'SINGLE_CPROFILE', False)
+    assert isinstance(create_profiler('cprofile', threaded=True), CProfiler)
+
+
+def test_threaded_profile_call_leaves_the_calling_thread_to_its_workers(tmp_path):
+    profiler = CProfiler()
+
+    def command():
+        thread = threading.Thread(target=profiler.run, args=(work,))
+        thread.start()
+        thread.join()
+        return 'done'
+
+    assert profile_call(profiler, tmp_path / 'run.prof', command, threaded=True) == 'done'
+    # Only the worker was profiled, so its cProfile was never blocked by the caller's
+    assert (len(profiler.profiles), profiler.unprofiled) == (1, 0)
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.run(lambda: [work(20000) for _ in range(20)])
+    profiler.save(tmp_path / 'run.folded')
+
+    lines = (tmp_path / 'run.folded').read_text(encoding='utf-8').splitlines()
+    assert profiler.samples > 0 and lines
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
@@ -0,0 +1,86 @@
+"""Tests for the extraction service's request handling, without browsers"""
+
+import json
+
+import pytest
+
+from raw_locator_generator.dom_extractor_agent import DOMExtractorAgent
+from raw_locator_generator.service import ExtractionService, ServiceError
+
+URL = 'https://shop.test/'
+ELEMENTS = [
+    {'type': 'buttons', 'tag': 'button', 'id': 'buy', 'class': '', 'name': '', 'text': 'Buy', 'href': '',
+     'xpath': '//*[@id="buy"]', 'css_selector': 'button#buy'},
+    {'type': 'links', 'tag': 'a', 'id': '', 'class': '', 'name': '', 'text': 'Cart',
+     'href': 'https://shop.test/cart', 'xpath': '/html/body/a[1]', 'css_selector': 'a'},
+]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """A service whose extractions are pages saved by a browserless agent"""
+    service = ExtractionService(workers=1, queue_size=1, output_dir=tmp_path)
+    agent = DOMExtractorAgent()
+    agent.page_url, agent.page_title = URL, 'Shop'
+    files = agent.save_results(list(ELEMENTS), output_dir=tmp_path)
+    result = {'url': URL, 'title': 'Shop', 'status': 'ok', 'element_count': 2, 'files': files, 'data': agent.last_data}
+    monkeypatch.setattr(service, 'extract', lambda url, deadline=None: dict(result, url=url))
+    return service
+
+
+def test_extract_returns_the_saved_scripts(service, monkeypatch):
+    import raw_locator_generator.service as module
+
+    def regenerate(*args, **kwargs):
+        raise AssertionError("scripts regenerated")
+
+    monkeypatch.setattr(module, 'generate_script_texts', regenerate)
+    response = service.extract_response({'url': URL})
+
+    assert response['elements'] == ELEMENTS
+    assert set(response['script_files']) == {
+        'raw_elements', 'selenium', 'playwright', 'puppeteer', 'cypress', 'robot_framework'
+    }
+    for name, path in response['script_files'].items():
+        with open(path, encoding='utf-8') as f:
+            assert response['scripts'][name] == f.read()
+    json.dumps(response)
+
+
+def test_extract_regenerates_only_on_request(service):
+    response = service.extract_response({'url': URL, 'framework': 'cypress', 'elements': False})
+
+    assert list(response['scripts']) == ['raw_elements', 'cypress']
+    assert "cy.get('#buy')" in response['scripts']['cypress']
+    assert 'elements' not in response
+
+    response = service.extract_response({'url': URL, 'scripts': False, 'elements': False})
+    assert 'scripts' not in response and len(response['script_files']) == 6
+
+
+def test_bad_requests(service):
+    with pytest.raises(ServiceError) as error:
+        service.extract_response({})
+    assert error.value.status == 400
+    with pytest.raises(ServiceError) as error:
+        service.generate_response({'elements': 'nope'})
+    assert error.value.status == 400
+
+
+def test_generate_needs_no_browser(service):
+    scripts = service.generate_response({'elements': ELEMENTS, 'framework': 'selenium', 'url': URL})['scripts']
+    assert "driver.get('https://shop.test/')" in scripts['selenium']
+
+
+def test_full_queue_is_rejected():
+    service = ExtractionService(workers=1, queue_size=1)
+    with pytest.raises(ServiceError) as error:
+        service.submit(URL)
+    assert error.value.status == 503
+
+    service.accepting = True
+    service.submit(URL)
+    with pytest.raises(ServiceError) as error:
+        service.submit(URL)
+    assert error.value.status == 503
+    assert service.snapshot()['requests']['rejected'] == 1
@@ -0,0 +1,101 @@
+"""Tests for verifying stored locators, with a browserless agent"""
+
+import pytest
+
+from raw_locator_generator import dom_extractor_agent, verify
+from raw_locator_generator.dom_extractor_agent import build_arg_parser
+from raw_locator_generator.formats import write_manifest
+from raw_locator_generator.offline import LocatorIndex, parse_html
+from raw_locator_generator.verify import load_pages, locator_status, verify_elements
+
+PAGE = """<html><body>
+  <button id="buy">Buy</button>
+  <a class="nav">Home</a><a class="nav">Cart</a>
+  <input name="q">
+</body></html>"""
+
+
+def element(tag, text, **fields):
+    elem = {'type': 'buttons', 'tag': tag, 'id': '', 'class': '', 'name': '', 'text': text, 'href': '',
+            'xpath': '', 'css_selector': ''}
+    elem.update(fields)
+    return elem
+
+
+STORED = [
+    element('button', 'Buy', id='buy', xpath='//*[@id="buy"]', css_selector='button#buy'),
+    element('a', 'Home', css_selector='a.nav', preferred_locator={'strategy': 'css', 'value': 'a.nav'}),
+    element('input', '', name='query', xpath='/html/body/input[1]'),
+    element('button', 'Gone', id='checkout', css_selector='button#checkout'),
+]
+
+
+class PageAgent:
+    """Resolves locators against a parsed page, counting the evaluations"""
+
+    def __init__(self, html):
+        self.index = LocatorIndex(parse_html(html))
+        self.batches = []
+
+    def validate_locators(self, elements, quiet=False):
+        self.batches.append(len(elements))
+        for elem in elements:
+            candidates = verify.locator_candidates(elem)
+            elem['locator_matches'] = {strategy: self.index.count(strategy, value) for strategy, value in candidates}
+            unique = [(strategy, value) for strategy, value in candidates if elem['locator_matches'][strategy] == 1]
+            elem['preferred_locator'] = {'strategy': unique[0][0], 'value': unique[0][1]} if unique else None
+        return elements
+
+    def extract_interactive_elements(self):
+        return []
+
+
+def test_locator_status():
+    assert [locator_status(count) for count in (1, 2, 0, -1)] == ['valid', 'ambiguous', 'broken', 'broken']
+
+
+def test_verify_elements_counts_and_suggests():
+    report = verify_elements(PageAgent(PAGE), STORED)
+
+    assert report['locators'] == {'valid': 1, 'ambiguous': 1, 'broken': 2}
+    problems = {problem['text']: problem for problem in report['problems']}
+    assert problems['Home']['status'] == 'ambiguous' and problems['Home']['matches'] == 2
+    # The stored name no longer matches, but its XPath still does
+    assert problems['']['suggestion'] == {'strategy': 'xpath', 'value': '/html/body/input[1]', 'source': 'stored'}
+    assert problems['Gone']['suggestion'] is None
+
+
+def test_batch_size_splits_the_evaluation():
+    agent = PageAgent(PAGE)
+    batched = verify_elements(agent, STORED, suggest=False, batch_size=3)
+
+    assert agent.batches == [3, 1]
+    assert batched == verify_elements(PageAgent(PAGE), STORED, suggest=False)
+
+
+def test_load_pages_reads_manifests(tmp_path):
+    data = tmp_path / 'dom_elements_1.json'
+    data.write_text('[]')
+    write_manifest(tmp_path, [{'status': 'ok', 'url': 'https://shop.test/', 'data': {'path': str(data)}}])
+
+    assert load_pages([tmp_path]) == {'https://shop.test/': str(data)}
+    with pytest.raises(ValueError):
+        load_pages([data])
+    assert load_pages([data], url='https://shop.test/x') == {'https://shop.test/x': str(data)}
+
+
+def test_verify_takes_only_its_own_options(tmp_path, monkeypatch):
+    parser = build_arg_parser()
+    for option in ('--incremental', '--format', '--cache-dir', '--harvest', '--components', '--engine'):
+        with pytest.raises(SystemExit):
+            parser.parse_args(['verify', str(tmp_path), option])
+
+    calls = []
+    monkeypatch.setattr(verify, 'load_pages', lambda sources, url=None: {'https://shop.test/': 'data.json'})
+    monkeypatch.setattr(verify, 'run_verify', lambda pages, **options: calls.append(options) or [])
+    args = parser.parse_args(['verify', str(tmp_path), '--strict', '--batch-size', '500', '--wait', 'dom-quiet'])
+    dom_extractor_agent.run_command(args)
+
+    options = calls[0]
+    assert options['strict'] and options['batch_size'] == 500 and options['readiness'] == 'dom-quiet'
+    assert 'cache' not in options and 'output_format' not in options